@@ -0,0 +1,95 @@
+"""
+Attachment Store
+Content-addressed blob store for image attachments.
+
+Messages keep a short reference ("sha256:<hex>") instead of the base64
+image; the base64 form is only produced when a request payload is built.
+"""
+
+import base64
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+REF_PREFIX = "sha256:"
+CACHE_BYTES = 64 * 1024 * 1024   # base64 strings kept in memory for reuse
+
+
+def is_ref(value):
+    return isinstance(value, str) and value.startswith(REF_PREFIX)
+
+
+class AttachmentStore:
+    """Blobs stored once under root/<first two hex digits>/<sha256>.
+
+    Identical images attached in different chats share one file. Base64
+    strings handed out by get_base64 are kept in an LRU bounded by
+    cache_bytes, so resending the latest images does not re-read or
+    re-encode them.
+    """
+
+    def __init__(self, root="attachments", cache_bytes=CACHE_BYTES):
+        self.root = root
+        self.cache_bytes = cache_bytes
+        self.cache = OrderedDict()
+        self.cached_bytes = 0
+        self.lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def path_for(self, ref):
+        digest = ref[len(REF_PREFIX):]
+        return os.path.join(self.root, digest[:2], digest)
+
+    def put(self, data):
+        """Store raw bytes or a base64 string; returns the reference"""
+        raw = base64.b64decode(data) if isinstance(data, str) else bytes(data)
+        ref = REF_PREFIX + hashlib.sha256(raw).hexdigest()
+        path = self.path_for(ref)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temporary file first so a crash never leaves a
+            # truncated blob under a valid hash
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, "wb") as f:
+                f.write(raw)
+            os.replace(tmp, path)
+        return ref
+
+    def get_bytes(self, ref):
+        with open(self.path_for(ref), "rb") as f:
+            return f.read()
+
+    def get_base64(self, ref):
+        """Return the base64 form of a reference; other values are returned unchanged"""
+        if not is_ref(ref):
+            return ref   # legacy inline base64
+        with self.lock:
+            data = self.cache.get(ref)
+            if data is not None:
+                self.cache.move_to_end(ref)
+                return data
+        data = base64.b64encode(self.get_bytes(ref)).decode("utf-8")
+        with self.lock:
+            if ref not in self.cache:
+                self.cache[ref] = data
+                self.cached_bytes += len(data)
+                while self.cached_bytes > self.cache_bytes and len(self.cache) > 1:
+                    _, evicted = self.cache.popitem(last=False)
+                    self.cached_bytes -= len(evicted)
+        return data
+
+    def materialize(self, messages):
+        """Return messages ready to send, with image references replaced by base64.
+
+        Messages without images are passed through; the stored history is
+        never modified.
+        """
+        payload = []
+        for message in messages:
+            images = message.get("images")
+            if images:
+                message = dict(message, images=[self.get_base64(ref) for ref in images])
+            payload.append(message)
+        return payload
@@ -0,0 +1,255 @@
+"""
+Batch Chat
+Answers a JSONL file of prompts without the GUI, several at a time, and
+writes one result line per prompt as each one finishes.
+
+    python batch_chat.py prompts.jsonl -o results.jsonl --concurrency 4
+
+Each input line is a JSON object with "messages" (chat messages, an
+optional system message first) or "prompt" (a single user message), and
+optionally "model", "options" and "id". Run the same command again to
+resume: prompts that already have a successful result are skipped.
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from chat_engine import ChatEngine, TurnListener, DEFAULT_SYSTEM_PROMPT, DONE, CACHED, ERROR
+from generation_queue import ollama_num_parallel
+from host_pool import OllamaHostPool, configured_hosts
+from ollama_client import CancelToken
+
+DEFAULT_MODEL = "llama2"
+
+
+def read_prompts(path):
+    """Yield (line number, prompt dict or None, error) for each non-blank line, counting from 1"""
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                prompt = json.loads(line)
+            except ValueError as e:
+                yield number, None, f"Invalid JSON: {e}"
+                continue
+            if not isinstance(prompt, dict) or not (prompt.get("messages") or prompt.get("prompt")):
+                yield number, None, "Expected an object with 'messages' or 'prompt'"
+                continue
+            yield number, prompt, None
+
+
+def read_results(path):
+    """Yield the result records of an output file, if it exists"""
+    if not os.path.exists(path):
+        return
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue   # torn last line from an interrupted run
+
+
+def completed_lines(path):
+    """Input line numbers that already have a successful result in the output file"""
+    return {result["line"] for result in read_results(path) if result.get("outcome") in (DONE, CACHED)}
+
+
+def recorded_errors(path):
+    """{input line number: error} for the errors already written to the output file"""
+    return {result["line"]: result.get("error") for result in read_results(path) if result.get("outcome") == ERROR}
+
+
+def ends_with_newline(path):
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def split_messages(prompt):
+    """Return (system prompt, history) for a prompt line"""
+    messages = prompt.get("messages") or [{"role": "user", "content": prompt["prompt"]}]
+    if messages[0].get("role") == "system":
+        return messages[0].get("content", ""), list(messages[1:])
+    return DEFAULT_SYSTEM_PROMPT, list(messages)
+
+
+def turn_stats(result, started, first_token):
+    """Latency and token statistics for a finished turn"""
+    stats = result.stats
+    eval_count = stats.get("eval_count")
+    eval_seconds = stats.get("eval_duration", 0) / 1e9
+    return {
+        "latency_s": round(time.perf_counter() - started, 4),
+        "ttft_s": round(first_token - started, 4) if first_token else None,
+        "prompt_tokens": stats.get("prompt_eval_count"),
+        "completion_tokens": eval_count,
+        "tokens_per_s": round(eval_count / eval_seconds, 2) if eval_count and eval_seconds else None,
+        "load_s": round(stats["load_duration"] / 1e9, 4) if "load_duration" in stats else None,
+    }
+
+
+class BatchRunner:
+    """Runs prompts through a ChatEngine on a bounded pool of workers.
+
+    At most concurrency prompts are in flight, and only twice that many
+    are read ahead, so arbitrarily large input files stream through in
+    constant memory. Results are written in completion order and flushed
+    line by line, so an interrupted run loses at most the prompts in
+    flight.
+    """
+
+    def __init__(self, engine, model=DEFAULT_MODEL, concurrency=None):
+        self.engine = engine
+        self.model = model
+        self.concurrency = concurrency or ollama_num_parallel()
+        self.cancel = CancelToken()
+        self.tokens = set()
+        self.lock = threading.Lock()
+
+    def answer(self, number, prompt):
+        """Run one prompt; returns its result record"""
+        token = CancelToken()
+        with self.lock:
+            if self.cancel.cancelled:
+                token.cancel()
+            self.tokens.add(token)
+        system_prompt, history = split_messages(prompt)
+        model = prompt.get("model") or self.model
+        first_token = []
+
+        def mark(*args):
+            if not first_token:
+                first_token.append(time.perf_counter())
+
+        started = time.perf_counter()
+        try:
+            result = self.engine.run_turn(
+                history,
+                model,
+                system_prompt=system_prompt,
+                options=prompt.get("options"),
+                key=prompt.get("id", number),
+                cancel=token,
+                listener=TurnListener(begin=mark, message=mark),
+            )
+        finally:
+            with self.lock:
+                self.tokens.discard(token)
+        record = {
+            "line": number,
+            "id": prompt.get("id"),
+            "model": model,
+            "outcome": result.outcome,
+            "response": result.text,
+            "error": result.error,
+        }
+        record.update(turn_stats(result, started, first_token[0] if first_token else None))
+        return record
+
+    def stop(self):
+        """Abort every prompt in flight; the rest are not started"""
+        with self.lock:
+            self.cancel.cancel()
+            tokens = list(self.tokens)
+        for token in tokens:
+            token.cancel()
+
+    def run(self, input_path, output_path, resume=True, progress=None):
+        """Answer every prompt of input_path not yet completed in output_path; returns counts"""
+        skip = completed_lines(output_path) if resume else set()
+        # Invalid lines fail the same way every run; record them only once
+        recorded = recorded_errors(output_path) if resume else {}
+        counts = {"done": 0, "failed": 0, "skipped": 0}
+        with open(output_path, "a" if resume else "w", encoding="utf-8") as out, \
+                ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="batch") as executor:
+            if out.tell() and not ends_with_newline(output_path):
+                out.write("\n")   # keep new results off a torn last line
+
+            def write(record):
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                counts["done" if record["outcome"] in (DONE, CACHED) else "failed"] += 1
+                if progress:
+                    progress(record, counts)
+
+            pending = set()
+            try:
+                for number, prompt, error in read_prompts(input_path):
+                    if number in skip:
+                        counts["skipped"] += 1
+                        continue
+                    if error and recorded.get(number) == error:
+                        counts["skipped"] += 1
+                        continue
+                    if error:
+                        write({"line": number, "id": None, "outcome": ERROR, "response": None, "error": error})
+                        continue
+                    if self.cancel.cancelled:
+                        break
+                    pending.add(executor.submit(self.answer, number, prompt))
+                    if len(pending) >= self.concurrency * 2:
+                        finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in finished:
+                            write(future.result())
+                while pending:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        write(future.result())
+            except KeyboardInterrupt:
+                self.stop()
+                for future in pending:
+                    future.cancel()
+                raise
+        return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of prompts with Ollama")
+    parser.add_argument("input", help="JSONL file with one prompt per line")
+    parser.add_argument("-o", "--output", help="JSONL results file (default: <input>.results.jsonl)")
+    parser.add_argument("-m", "--model", default=DEFAULT_MODEL, help="Model for prompts that name none")
+    parser.add_argument("-c", "--concurrency", type=int, default=None,
+                        help="Prompts in flight (default: OLLAMA_NUM_PARALLEL per host)")
+    parser.add_argument("--hosts", help="Comma-separated Ollama hosts (default: OLLAMA_HOSTS or OLLAMA_HOST)")
+    parser.add_argument("--no-resume", action="store_true", help="Overwrite the output instead of resuming")
+    parser.add_argument("--no-stream", action="store_true", help="Request whole answers (no time to first token)")
+    parser.add_argument("--quiet", action="store_true", help="Only print the summary")
+    args = parser.parse_args(argv)
+
+    output = args.output or os.path.splitext(args.input)[0] + ".results.jsonl"
+    concurrency = args.concurrency or ollama_num_parallel() * len(configured_hosts(args.hosts))
+    client = OllamaHostPool(args.hosts, pool_size=max(4, concurrency))
+    runner = BatchRunner(ChatEngine(client, stream=not args.no_stream), args.model, concurrency)
+
+    def progress(record, counts):
+        if args.quiet:
+            return
+        if record["outcome"] == ERROR:
+            print(f"✗ line {record['line']}: {record['error']}")
+        else:
+            rate = f", {record['tokens_per_s']} tok/s" if record.get("tokens_per_s") else ""
+            print(f"✓ line {record['line']}: {record['latency_s']:.2f} s{rate}")
+
+    started = time.perf_counter()
+    try:
+        counts = runner.run(args.input, output, resume=not args.no_resume, progress=progress)
+    except KeyboardInterrupt:
+        print(f"\nInterrupted. Run the same command again to resume; results so far are in {output}")
+        return 130
+    finally:
+        client.close()
+    elapsed = time.perf_counter() - started
+    print(f"{counts['done']} answered, {counts['failed']} failed, {counts['skipped']} already done "
+          f"in {elapsed:.1f} s -> {output}")
+    return 0 if not counts["failed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
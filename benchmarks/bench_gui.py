@@ -0,0 +1,309 @@
+"""
+GUI rendering benchmark
+Drives the v3 window (OllamaChatbotBlue) on a virtual display with
+synthetic chats of growing size and times its hot paths:
+
+  history   display_chat_history when a chat is opened (cold from the
+            store, then re-rendered from the session cache)
+  message   display_message appended to an open chat
+  thinking  show_thinking_indicator, one animation frame, hide
+  sidebar   refresh_chat_list with every chat in the store
+  stream    a whole answer from the mock Ollama server: event-loop
+            latency while tokens arrive and time from send to the end
+
+Widget, text line, mark and pending timer counts are recorded next to
+the timings; leaks show up there before they show up as slowness.
+Results are JSON and compared with a stored baseline like
+bench_latency.py.
+
+Starts its own Xvfb when there is no DISPLAY (or run it under xvfb-run):
+
+    python benchmarks/bench_gui.py --sizes 100 1000 10000 --chats 5000
+    python benchmarks/bench_gui.py --save-baseline
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tkinter as tk
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_latency import add_report_arguments, report
+from bench_transcript_render import make_history
+from mock_ollama import MockOllamaServer
+from session_store import SessionStore
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gui_baseline.json")
+TICK_SECONDS = 0.01   # event-loop probe interval
+
+
+@contextmanager
+def virtual_display(screen="1400x900x24"):
+    """Use $DISPLAY when set, otherwise run an Xvfb server for the duration"""
+    if os.environ.get("DISPLAY"):
+        yield os.environ["DISPLAY"]
+        return
+    if not shutil.which("Xvfb"):
+        raise RuntimeError("no DISPLAY and no Xvfb found; install xvfb or run under xvfb-run")
+    read_fd, write_fd = os.pipe()
+    # -displayfd makes Xvfb pick a free display and write its number back
+    server = subprocess.Popen(
+        ["Xvfb", "-displayfd", str(write_fd), "-screen", "0", screen, "-nolisten", "tcp"],
+        pass_fds=(write_fd,), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    os.close(write_fd)
+    with os.fdopen(read_fd) as f:
+        number = f.readline().strip()
+    if not number:
+        server.kill()
+        raise RuntimeError("Xvfb did not start")
+    os.environ["DISPLAY"] = f":{number}"
+    try:
+        yield os.environ["DISPLAY"]
+    finally:
+        del os.environ["DISPLAY"]
+        server.terminate()
+        server.wait()
+
+
+def populate(path, sizes, chats):
+    """Create one chat per history size plus filler chats for the sidebar; returns {size: chat id}"""
+    from chatbot_v3 import ChatSession
+
+    store = SessionStore(path)
+    started = datetime.now() - timedelta(days=1)
+    ids = {}
+    with store.conn:
+        for n in range(chats):
+            session = ChatSession(name=f"Chat {n}", chat_id=f"filler{n}")
+            session.created_at = session.updated_at = started + timedelta(seconds=n)
+            store.create_session(session)
+            now = session.created_at.isoformat()
+            store.insert_message(session.id, {"role": "user", "content": f"Question {n}"}, now)
+            store.insert_message(session.id, {"role": "assistant", "content": f"Answer {n}"}, now)
+        for k, size in enumerate(sizes):
+            session = ChatSession(name=f"{size} messages", chat_id=f"size{size}")
+            session.created_at = session.updated_at = started + timedelta(seconds=chats + k)
+            store.create_session(session)
+            now = session.created_at.isoformat()
+            for message in make_history(size):
+                store.insert_message(session.id, message, now)
+            ids[size] = session.id
+    store.close()
+    return ids
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] if values else None
+
+
+def timed(app, func, *args):
+    """Seconds for func(*args) including the redraw it causes"""
+    started = time.perf_counter()
+    func(*args)
+    app.update_idletasks()
+    return time.perf_counter() - started
+
+
+def run_loop(app, done, timeout):
+    """Run the Tk main loop until done() or timeout; returns how late each probe tick fired (s)"""
+    lateness = []
+    deadline = time.perf_counter() + timeout
+    expected = [time.perf_counter() + TICK_SECONDS]
+
+    def tick():
+        now = time.perf_counter()
+        lateness.append(max(0.0, now - expected[0]))
+        if done() or now > deadline:
+            app.quit()
+            return
+        expected[0] = now + TICK_SECONDS
+        app.after(int(TICK_SECONDS * 1000), tick)
+
+    app.after(int(TICK_SECONDS * 1000), tick)
+    app.mainloop()
+    return lateness
+
+
+def loop_stats(lateness):
+    return {
+        "loop_p50_ms": percentile(lateness, 0.5) * 1000,
+        "loop_p99_ms": percentile(lateness, 0.99) * 1000,
+        "loop_max_ms": max(lateness) * 1000,
+    }
+
+
+def widget_count(widget):
+    return 1 + sum(widget_count(child) for child in widget.winfo_children())
+
+
+def counts(app):
+    """Sizes that grow when something leaks"""
+    display = app.chat_display
+    return {
+        "widgets": widget_count(app),
+        "text_lines": int(display.index("end-1c").split(".")[0]),
+        "marks": len(display.mark_names()),
+        "pending_after": len(app.tk.splitlist(app.tk.call("after", "info"))),
+    }
+
+
+def bench_history(app, sid, repeat):
+    cold = timed(app, app.load_chat, sid)
+    warm = min(timed(app, app.display_chat_history) for _ in range(repeat))
+    return {"open_cold_ms": cold * 1000, "render_ms": warm * 1000}
+
+
+def bench_messages(app, sid, count):
+    app.load_chat(sid)
+    app.update_idletasks()
+    timings = [timed(app, app.display_message, f"Appended message {i}\nwith a second line.", "assistant")
+               for i in range(count)]
+    app.display_chat_history()   # drop the appended messages again
+    return {"display_message_ms": statistics.median(timings) * 1000}
+
+
+def bench_thinking(app, sid, repeat):
+    app.load_chat(sid)
+    app.update_idletasks()
+    show, frame, hide = [], [], []
+    app.is_generating = True   # the animation only runs while an answer is pending
+    try:
+        for _ in range(repeat):
+            show.append(timed(app, app.show_thinking_indicator))
+            app.after_cancel(app.thinking_animation_id)
+            frame.append(timed(app, app.animate_thinking))
+            hide.append(timed(app, app.hide_thinking_indicator))
+    finally:
+        app.is_generating = False
+    return {
+        "thinking_show_ms": min(show) * 1000,
+        "thinking_frame_ms": min(frame) * 1000,
+        "thinking_hide_ms": min(hide) * 1000,
+    }
+
+
+def bench_stream(app, sid, timeout):
+    app.load_chat(sid)
+    app.update_idletasks()
+    app.input_box.insert(0, "Explain the last answer again, step by step.")
+    started = time.perf_counter()
+    app.send_message()
+    lateness = run_loop(app, lambda: not app.scheduler.busy(sid) and not app.is_generating, timeout)
+    result = {"answer_ms": (time.perf_counter() - started) * 1000}
+    result.update(loop_stats(lateness))
+    return result
+
+
+def run(args):
+    """Create the window over synthetic chats and run every scenario; returns the flat metrics dict"""
+    metrics = {}
+    workdir = tempfile.mkdtemp()
+    cwd = os.getcwd()
+    server = MockOllamaServer(
+        token_rate=args.token_rate, first_token_delay=args.first_token_delay, tokens=args.tokens,
+    ).start()
+    saved_env = {name: os.environ.pop(name, None) for name in ("OLLAMA_HOST", "OLLAMA_HOSTS")}
+    os.environ["OLLAMA_HOST"] = server.url
+    app = None
+    try:
+        # The window keeps its database, settings and attachments in the working directory
+        os.chdir(workdir)
+        ids = populate("chat_sessions.db", args.sizes, args.chats)
+
+        from chatbot_v3 import OllamaChatbotBlue
+        started = time.perf_counter()
+        app = OllamaChatbotBlue()
+        app.update()
+        metrics["gui.startup_ms"] = (time.perf_counter() - started) * 1000
+        app.engine.debug = False
+        # Let the startup connection check and model warm-up finish, timing the idle loop meanwhile
+        for name, value in loop_stats(run_loop(app, lambda: False, args.idle)).items():
+            metrics[f"gui.idle.{name}"] = value
+        for name, value in counts(app).items():
+            metrics[f"gui.startup.{name}"] = value
+
+        sidebar = min(timed(app, app.refresh_chat_list) for _ in range(args.repeat))
+        metrics[f"gui.sidebar.{len(app.chat_sessions)}.refresh_ms"] = sidebar * 1000
+        print(f"startup {metrics['gui.startup_ms']:8.1f} ms   sidebar of {len(app.chat_sessions):,} chats "
+              f"{sidebar * 1000:7.2f} ms   idle loop p99 {metrics['gui.idle.loop_p99_ms']:5.1f} ms")
+        print("=" * 100)
+
+        for size in args.sizes:
+            sid = ids[size]
+            result = bench_history(app, sid, args.repeat)
+            result.update(counts(app))
+            result.update(bench_messages(app, sid, args.messages))
+            result.update(bench_thinking(app, sid, args.repeat))
+            if args.stream:
+                result.update(bench_stream(app, sid, args.timeout))
+            for name, value in result.items():
+                metrics[f"gui.{size}.{name}"] = value
+            print(f"{size:>7,} msgs  open {result['open_cold_ms']:8.1f} ms  render {result['render_ms']:7.1f} ms  "
+                  f"message {result['display_message_ms']:6.2f} ms  thinking show/frame/hide "
+                  f"{result['thinking_show_ms']:.2f}/{result['thinking_frame_ms']:.2f}/"
+                  f"{result['thinking_hide_ms']:.2f} ms  ({result['text_lines']:,} lines)")
+            if args.stream:
+                print(f"{'':14}answer {result['answer_ms']:8.1f} ms  event loop p50 {result['loop_p50_ms']:5.1f} "
+                      f"p99 {result['loop_p99_ms']:5.1f} max {result['loop_max_ms']:6.1f} ms")
+
+        for name, value in counts(app).items():
+            metrics[f"gui.end.{name}"] = value
+    finally:
+        if app is not None:
+            app.destroy()
+        server.stop()
+        os.chdir(cwd)
+        for name, value in saved_env.items():
+            os.environ.pop(name, None)
+            if value is not None:
+                os.environ[name] = value
+        shutil.rmtree(workdir, ignore_errors=True)
+    return metrics
+
+
+def settings(args):
+    keys = ("sizes", "chats", "repeat", "messages", "stream", "token_rate", "first_token_delay", "tokens")
+    return {key: getattr(args, key) for key in keys}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the v3 window's rendering on a virtual display")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000],
+                        help="messages in each replayed chat")
+    parser.add_argument("--chats", type=int, default=2000, help="extra two-message chats in the sidebar")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per timing (best is reported)")
+    parser.add_argument("--messages", type=int, default=50, help="display_message calls per chat (median)")
+    parser.add_argument("--no-stream", dest="stream", action="store_false",
+                        help="skip the streamed answer from the mock server")
+    parser.add_argument("--token-rate", type=float, default=100.0, help="mock tokens per second")
+    parser.add_argument("--first-token-delay", type=float, default=0.6,
+                        help="mock seconds before the first token (the thinking indicator animates meanwhile)")
+    parser.add_argument("--tokens", type=int, default=200, help="mock tokens per answer")
+    parser.add_argument("--idle", type=float, default=1.0, help="seconds of idle loop measured after startup")
+    parser.add_argument("--timeout", type=float, default=30.0, help="seconds to wait for a streamed answer")
+    add_report_arguments(parser, BASELINE)
+    args = parser.parse_args(argv)
+
+    try:
+        with virtual_display() as display:
+            print(f"v3 window rendering on display {display}")
+            print("=" * 100)
+            metrics = run(args)
+    except (RuntimeError, tk.TclError) as e:
+        print(f"Cannot open a display ({e}).")
+        return 1
+    return report("gui", args, settings(args), metrics)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,328 @@
+"""
+Request latency benchmark
+Times where a turn spends its time on the v1, v2 and v3 request paths
+(each ChatEngine configured the way that window configures it):
+
+  payload   building the request for histories of 10 to 100k messages,
+            cold (first turn of a loaded chat) and warm (the next turn),
+            plus the JSON size and serialization time of the body
+  turn      time to first token, tokens/s, end-to-end latency and client
+            overhead (latency minus the server's own total_duration)
+            against the mock Ollama server, or a real one with --url
+
+Results are written as JSON and compared with a stored baseline; metrics
+that got worse by more than --tolerance are reported and the exit code
+is 1. Refresh the baseline on your own machine with --save-baseline.
+
+    python benchmarks/bench_latency.py
+    python benchmarks/bench_latency.py --quick --output latency.json
+    python benchmarks/bench_latency.py --save-baseline
+"""
+
+import argparse
+import base64
+import gc
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from attachment_store import AttachmentStore
+from batch_chat import turn_stats
+from chat_engine import ChatEngine, TurnListener
+from context_window import ContextWindow, DROP_OLD_IMAGES
+from file_retrieval import FileRetriever
+from host_pool import OllamaHostPool
+from image_memory import ImageDescriber, ImagePolicy, KEEP_IMAGE_TURNS
+from mock_ollama import MockOllamaServer
+from ollama_client import OllamaClient
+from response_cache import ResponseCache
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "latency_baseline.json")
+VARIANTS = ("v1", "v2", "v3")
+NOISE_FLOOR_MS = 1.0   # differences below this are timer noise, whatever the ratio
+IMAGE_EVERY = 25       # one message in this many carries an image (v2 and v3)
+
+
+def make_history(count, image=None):
+    """Alternate user/assistant messages of varied length, the newest a question"""
+    messages = []
+    for i in range(count):
+        if i % 2 == 0:
+            message = {"role": "user", "content": f"Question {i}: how do I fix the error in this snippet?"}
+            if image is not None and i % IMAGE_EVERY == 0:
+                message["images"] = [image]
+            messages.append(message)
+        else:
+            body = " ".join(f"Step {j} of answer {i} explains one more detail." for j in range(1 + i % 12))
+            messages.append({"role": "assistant", "content": body})
+    if not messages or messages[-1]["role"] != "user":
+        messages.append({"role": "user", "content": "And one more question?"})
+    if image is not None:
+        messages[-1] = dict(messages[-1], images=[image])   # the question comes with a picture
+    return messages
+
+
+def make_engine(variant, client_url, workdir):
+    """Return (engine, image) configured like the window of variant; image is what its history stores"""
+    if variant == "v1":
+        return ChatEngine(OllamaClient(client_url), ContextWindow()), None
+
+    picture = base64.b64encode(os.urandom(48 * 1024)).decode("ascii")
+    if variant == "v2":
+        client = OllamaClient(client_url)
+        describer = ImageDescriber(client)
+        engine = ChatEngine(
+            client,
+            ContextWindow(strategy=DROP_OLD_IMAGES),
+            image_policy=ImagePolicy(keep_turns=KEEP_IMAGE_TURNS, describe=describer.get),
+            retriever=FileRetriever(client),
+            response_cache=ResponseCache(os.path.join(workdir, "v2_cache.db")),
+            describer=describer,
+        )
+        return engine, picture
+
+    client = OllamaHostPool([client_url])
+    attachments = AttachmentStore(os.path.join(workdir, "attachments"))
+    describer = ImageDescriber(client, resolve=attachments.get_base64)
+    engine = ChatEngine(
+        client,
+        ContextWindow(strategy=DROP_OLD_IMAGES),
+        image_policy=ImagePolicy(keep_turns=KEEP_IMAGE_TURNS, describe=describer.get),
+        retriever=FileRetriever(client, root=os.path.join(workdir, "retrieval")),
+        response_cache=ResponseCache(os.path.join(workdir, "v3_cache.db"), allow_sampled=True),
+        describer=describer,
+        materialize=attachments.materialize,
+    )
+    return engine, attachments.put(base64.b64decode(picture))
+
+
+def close_engine(engine):
+    engine.client.close()
+    if engine.response_cache is not None:
+        engine.response_cache.close()
+
+
+def median(values):
+    return statistics.median(values) if values else None
+
+
+def build(engine, history, model):
+    messages = engine.build_messages(history, model, question=history[-1]["content"], key="bench")
+    return engine.build_payload(messages, model, engine.options(model))
+
+
+def bench_payload(engine, image, size, model, repeat):
+    """Best cold and warm build times, body size and serialization time for one history size"""
+    history = make_history(size, image)
+    cold, warm, dumps = [], [], []
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()   # a collection of the big history would land on whichever timing triggers it
+        fresh = list(history)   # a new list, as if the chat had just been opened
+        started = time.perf_counter()
+        build(engine, fresh, model)
+        cold.append(time.perf_counter() - started)
+
+        fresh.append({"role": "assistant", "content": "Sure."})
+        fresh.append({"role": "user", "content": "Next question?"})
+        started = time.perf_counter()
+        payload = build(engine, fresh, model)
+        warm.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        body = json.dumps(payload, allow_nan=False)
+        dumps.append(time.perf_counter() - started)
+        gc.enable()
+    return {
+        "build_cold_ms": min(cold) * 1000,
+        "build_warm_ms": min(warm) * 1000,
+        "serialize_ms": min(dumps) * 1000,
+        "body_bytes": len(body.encode("utf-8")),
+        "messages_sent": len(payload["messages"]),
+    }
+
+
+def bench_turns(engine, model, turns, history_size):
+    """Median time to first token, throughput, latency and client overhead over turns"""
+    ttft, rates, latency, overhead, failures = [], [], [], [], 0
+    for n in range(turns):
+        history = make_history(history_size)
+        first_token = []
+
+        def mark(*args):
+            if not first_token:
+                first_token.append(time.perf_counter())
+
+        started = time.perf_counter()
+        result = engine.run_turn(history, model, key=f"bench{n}", listener=TurnListener(begin=mark, message=mark))
+        if result.error:
+            failures += 1
+            continue
+        stats = turn_stats(result, started, first_token[0] if first_token else None)
+        latency.append(stats["latency_s"] * 1000)
+        if stats["ttft_s"] is not None:
+            ttft.append(stats["ttft_s"] * 1000)
+        if stats["tokens_per_s"]:
+            rates.append(stats["tokens_per_s"])
+        if "total_duration" in result.stats:
+            overhead.append(stats["latency_s"] * 1000 - result.stats["total_duration"] / 1e6)
+    return {
+        "ttft_ms": median(ttft),
+        "tokens_per_s": median(rates),
+        "latency_ms": median(latency),
+        "overhead_ms": median(overhead),
+        "failures": failures,
+    }
+
+
+def run(args):
+    """Run every benchmark; returns the flat metrics dict"""
+    metrics = {}
+    workdir = tempfile.mkdtemp()
+    server = None
+    url = args.url
+    if not url:
+        server = MockOllamaServer(
+            token_rate=args.token_rate, first_token_delay=args.first_token_delay,
+            tokens=args.tokens, slots=1,
+        ).start()
+        url = server.url
+    try:
+        for variant in VARIANTS:
+            engine, image = make_engine(variant, url, workdir)
+            try:
+                for size in args.sizes:
+                    result = bench_payload(engine, image, size, args.model, args.repeat)
+                    for name, value in result.items():
+                        metrics[f"payload.{variant}.{size}.{name}"] = value
+                    print(f"{variant}  {size:>7,} msgs  build cold {result['build_cold_ms']:8.2f} ms  "
+                          f"warm {result['build_warm_ms']:7.2f} ms  "
+                          f"json {result['serialize_ms']:6.2f} ms  {result['body_bytes']:>9,} B  "
+                          f"({result['messages_sent']} sent)")
+                if args.turns:
+                    result = bench_turns(engine, args.model, args.turns, args.turn_history)
+                    for name, value in result.items():
+                        metrics[f"turn.{variant}.{name}"] = value
+                    print(f"{variant}  turn  ttft {fmt(result['ttft_ms'])} ms  "
+                          f"{fmt(result['tokens_per_s'])} tok/s  latency {fmt(result['latency_ms'])} ms  "
+                          f"overhead {fmt(result['overhead_ms'])} ms  failures {result['failures']}")
+            finally:
+                close_engine(engine)
+            print("-" * 100)
+    finally:
+        if server is not None:
+            server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+    return metrics
+
+
+def fmt(value):
+    return "   n/a" if value is None else f"{value:6.1f}"
+
+
+def higher_is_better(name):
+    return name.endswith("_per_s")
+
+
+def regressions(metrics, baseline, tolerance):
+    """(name, baseline, current) for metrics worse than the baseline by more than tolerance"""
+    worse = []
+    for name, current in sorted(metrics.items()):
+        before = baseline.get(name)
+        if before is None or current is None or name.endswith(".messages_sent"):
+            continue
+        if name.endswith("_ms") and abs(current - before) < NOISE_FLOOR_MS:
+            continue
+        if higher_is_better(name):
+            if current < before * (1 - tolerance):
+                worse.append((name, before, current))
+        elif current > before * (1 + tolerance) and current > before:
+            worse.append((name, before, current))
+    return worse
+
+
+def settings(args):
+    keys = ("sizes", "repeat", "turns", "turn_history", "model", "token_rate", "first_token_delay", "tokens")
+    return dict({key: getattr(args, key) for key in keys}, server=args.url or "mock")
+
+
+def add_report_arguments(parser, baseline):
+    """The --output, --baseline, --save-baseline and --tolerance options used by report()"""
+    parser.add_argument("--output", help="write the results JSON here")
+    parser.add_argument("--baseline", default=baseline, help="baseline JSON to compare with")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="allowed slowdown before a metric counts as a regression (0.5 = 50%%); "
+                             "timings vary by about a quarter between runs on a busy machine")
+
+
+def report(benchmark, args, settings, metrics):
+    """Write the results, store them as baseline or compare with it; returns the exit code"""
+    results = {
+        "benchmark": benchmark,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": settings,
+        "metrics": metrics,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one.")
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("settings") != settings:
+        print("Note: the baseline was recorded with different settings; only shared metrics are compared.")
+    worse = regressions(metrics, baseline.get("metrics", {}), args.tolerance)
+    if not worse:
+        print(f"No regressions against the baseline from {baseline.get('created', 'unknown')}.")
+        return 0
+    print(f"{len(worse)} regression(s) beyond {args.tolerance:.0%} against {args.baseline}:")
+    for name, before, current in worse:
+        print(f"  {name:<40} {before:12.2f} -> {current:12.2f}")
+    return 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark request building and turn latency")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000, 100000],
+                        help="history lengths for the payload benchmark")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per payload timing (best is reported)")
+    parser.add_argument("--turns", type=int, default=10, help="turns per variant (0 skips the turn benchmark)")
+    parser.add_argument("--turn-history", type=int, default=20, help="history length of each timed turn")
+    parser.add_argument("--model", default="llama2")
+    parser.add_argument("--url", help="benchmark a running Ollama instead of the mock server")
+    parser.add_argument("--token-rate", type=float, default=200.0, help="mock tokens per second")
+    parser.add_argument("--first-token-delay", type=float, default=0.05, help="mock seconds before the first token")
+    parser.add_argument("--tokens", type=int, default=64, help="mock tokens per answer")
+    parser.add_argument("--quick", action="store_true", help="fewer sizes and runs, for a check next to the tests")
+    add_report_arguments(parser, BASELINE)
+    args = parser.parse_args(argv)
+    if args.quick:
+        args.sizes, args.turns = [10, 1000, 100000], 5
+
+    print(f"Request latency on {args.url or 'the mock server'}, model {args.model}")
+    print("=" * 100)
+    return report("latency", args, settings(args), run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
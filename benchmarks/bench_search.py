@@ -0,0 +1,77 @@
+"""
+Search benchmark
+Fills a throwaway session store with synthetic chats and times full-text
+queries against it.
+
+    python benchmarks/bench_search.py --messages 200000
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from session_store import SessionStore
+
+WORDS = (
+    "python tkinter model prompt image vision token stream server client cache window "
+    "history search index sqlite thread queue latency memory render scroll widget llama "
+    "mistral answer question error config install network request response message"
+).split()
+
+QUERIES = ("sqlite index", "render", "llama stream", "laten", "quokka", "token cache window")
+
+
+def populate(store, messages, per_session):
+    """Insert messages in bulk, spread over sessions of per_session messages"""
+    rng = random.Random(0)
+    now = datetime.now().isoformat()
+    with store.conn:
+        for n in range(messages):
+            if n % per_session == 0:
+                sid = f"bench{n // per_session}"
+                store.conn.execute(
+                    "INSERT INTO sessions (id, name, created_at, updated_at) VALUES (?, ?, ?, ?)",
+                    (sid, f"Chat {n // per_session}", now, now),
+                )
+            content = " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 60)))
+            store.insert_message(sid, {"role": "user" if n % 2 == 0 else "assistant", "content": content}, now)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark full-text search over chat history")
+    parser.add_argument("--messages", type=int, default=200000, help="messages to index")
+    parser.add_argument("--per-session", type=int, default=200, help="messages per chat")
+    parser.add_argument("--repeat", type=int, default=20, help="runs per query")
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        store = SessionStore(os.path.join(tmpdir, "bench.db"))
+        started = time.perf_counter()
+        populate(store, args.messages, args.per_session)
+        print(f"Indexed {args.messages} messages in {time.perf_counter() - started:.1f} s "
+              f"(FTS5: {'yes' if store.has_fts else 'no, LIKE fallback'})")
+        print("=" * 52)
+        for query in QUERIES:
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                hits = store.search(query)
+                timings.append(time.perf_counter() - started)
+            timings.sort()
+            print(f"{query!r:<22} {len(hits):3d} hits   median {timings[len(timings) // 2] * 1000:7.2f} ms")
+        store.close()
+    finally:
+        shutil.rmtree(tmpdir)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""
+Transcript rendering benchmark
+Replays a long chat into the v3 chat display three ways:
+
+  legacy    one insert per piece plus tag_configure on every message
+            (how display_message worked before the style registry)
+  registry  display_message per message with tags configured once
+  bulk      render_history_messages, one insert call for the whole replay
+
+Needs a display (use xvfb-run on a headless machine):
+
+    python benchmarks/bench_transcript_render.py --messages 5000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tkinter as tk
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def make_history(count):
+    """Alternate user/assistant messages of realistic, varied length"""
+    messages = []
+    for i in range(count):
+        if i % 2 == 0:
+            messages.append({"role": "user", "content": f"Question {i}: how do I fix this?"})
+        else:
+            body = "\n".join(f"Line {j} of answer {i} with some explanation." for j in range(1 + i % 6))
+            messages.append({"role": "assistant", "content": body})
+    return messages
+
+
+def clear(app):
+    app.chat_display.config(state=tk.NORMAL)
+    app.chat_display.delete("1.0", tk.END)
+    app.clear_message_marks()
+
+
+def render_legacy(app, messages):
+    text = app.chat_display
+    for msg in messages:
+        role = msg["role"]
+        avatar, label, bg_color, text_color = app.get_role_visuals(role)
+        text.config(state=tk.NORMAL)
+        text.insert(tk.END, "\n")
+        text.insert(tk.END, f"{avatar}  {label}\n", "header")
+        text.insert(tk.END, f"{msg['content']}\n", f"content_{role}")
+        text.tag_configure(
+            "header", font=("Segoe UI", 10, "bold"), foreground=app.colors["text_alt"],
+            lmargin1=20, lmargin2=20, spacing1=10, spacing3=5,
+        )
+        text.tag_configure(
+            f"content_{role}", font=("Segoe UI", 11), foreground=text_color, background=bg_color,
+            lmargin1=55, lmargin2=55, rmargin=20, spacing3=15, wrap="word",
+        )
+        text.config(state=tk.DISABLED)
+        text.see(tk.END)
+
+
+def render_registry(app, messages):
+    for msg in messages:
+        app.display_message(msg["content"], msg["role"], add_to_history=False)
+
+
+def render_bulk(app, messages):
+    app.chat_display.config(state=tk.NORMAL)
+    app.render_history_messages(0, messages)
+    app.chat_display.config(state=tk.DISABLED)
+    app.chat_display.see(tk.END)
+
+
+def timed(app, render, messages, repeat):
+    best = None
+    for _ in range(repeat):
+        clear(app)
+        app.update_idletasks()
+        started = time.perf_counter()
+        render(app, messages)
+        app.update_idletasks()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark chat transcript rendering")
+    parser.add_argument("--messages", type=int, default=5000, help="messages to replay")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per variant (best is reported)")
+    args = parser.parse_args()
+
+    # Run in a scratch directory so the app's session database is throwaway
+    os.chdir(tempfile.mkdtemp())
+    try:
+        from chatbot_v3 import OllamaChatbotBlue
+        app = OllamaChatbotBlue()
+    except tk.TclError as e:
+        print(f"Cannot open a display ({e}); run under xvfb-run.")
+        return 1
+    app.withdraw()
+    messages = make_history(args.messages)
+
+    results = [
+        ("legacy", timed(app, render_legacy, messages, args.repeat)),
+        ("registry", timed(app, render_registry, messages, args.repeat)),
+        ("bulk", timed(app, render_bulk, messages, args.repeat)),
+    ]
+    app.destroy()
+
+    baseline = results[0][1]
+    print(f"Replaying {args.messages} messages (best of {args.repeat})")
+    print("=" * 44)
+    for name, seconds in results:
+        print(f"{name:<10} {seconds * 1000:10.1f} ms   {baseline / seconds:5.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""
+Vector index benchmark
+Builds indexes of random unit vectors and times appends, single and
+batched top-k queries, deletes with compaction, and reopening from disk.
+
+    python benchmarks/bench_vector_index.py --sizes 100000 300000 1000000 --dim 384
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vector_index import VectorIndex
+
+
+def median_ms(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return timings[len(timings) // 2] * 1000
+
+
+def bench(size, dim, batch, k, repeat, path):
+    rng = np.random.default_rng(size)
+    index = VectorIndex(path)
+    started = time.perf_counter()
+    for start in range(0, size, batch):
+        index.add(rng.standard_normal((min(batch, size - start), dim), dtype=np.float32))
+    add_s = time.perf_counter() - started
+
+    query = rng.standard_normal(dim, dtype=np.float32)
+    queries = rng.standard_normal((32, dim), dtype=np.float32)
+    single = median_ms(lambda: index.search(query, k), repeat)
+    batched = median_ms(lambda: index.search_batch(queries, k), max(1, repeat // 4)) / len(queries)
+
+    started = time.perf_counter()
+    index.delete(range(0, size, 3))   # a third of the rows, which triggers compaction
+    delete_s = time.perf_counter() - started
+    after_delete = median_ms(lambda: index.search(query, k), repeat)
+    index.close()
+
+    reopen_s = None
+    if path:
+        started = time.perf_counter()
+        VectorIndex(path).close()
+        reopen_s = time.perf_counter() - started
+
+    print(f"{size:>9,}  add {size / add_s:>10,.0f}/s  "
+          f"query {single:7.2f} ms  batched {batched:6.2f} ms/q  "
+          f"delete+compact {delete_s:6.2f} s  query after {after_delete:7.2f} ms"
+          + (f"  reopen {reopen_s:5.2f} s" if reopen_s is not None else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the NumPy vector index")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100000, 300000, 1000000],
+                        help="index sizes to test")
+    parser.add_argument("--dim", type=int, default=384, help="embedding dimension")
+    parser.add_argument("--batch", type=int, default=10000, help="vectors per add() call")
+    parser.add_argument("--k", type=int, default=5, help="results per query")
+    parser.add_argument("--repeat", type=int, default=20, help="runs per query timing")
+    parser.add_argument("--memory", action="store_true", help="keep the index in memory instead of on disk")
+    args = parser.parse_args()
+
+    print(f"dim={args.dim} k={args.k} storage={'memory' if args.memory else 'memory-mapped file'}")
+    print("=" * 100)
+    tmpdir = tempfile.mkdtemp()
+    try:
+        for size in args.sizes:
+            path = None if args.memory else os.path.join(tmpdir, str(size))
+            bench(size, args.dim, args.batch, args.k, args.repeat, path)
+            if path:
+                shutil.rmtree(path)
+    finally:
+        shutil.rmtree(tmpdir)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
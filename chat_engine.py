@@ -0,0 +1,270 @@
+"""
+Chat Engine
+The chat logic shared by every front end, without any UI: builds the
+request for a turn, talks to Ollama, streams the answer and extends the
+history. GUIs, batch jobs and benchmarks drive it through a TurnListener.
+"""
+
+from contextlib import nullcontext
+
+from context_window import ContextWindow
+from file_retrieval import with_context
+from ollama_client import OllamaClient, OllamaError, CancelToken, iter_chat_stream, chunk_text
+from response_cache import cache_key
+
+STOPPED_NOTE = "[Response stopped]"
+NO_RESPONSE = "No response."
+DEFAULT_SYSTEM_PROMPT = "You are a helpful AI assistant."
+
+# How a turn ended
+DONE = "done"
+CACHED = "cached"
+STOPPED = "stopped"
+ERROR = "error"
+
+
+class TurnListener:
+    """Receives the progress of a turn; every callback is optional.
+
+    Callbacks run on the thread that runs the turn, so a GUI should hand
+    them to its UI queue.
+        status(text)          progress for a status bar
+        notice(text)          a system message, e.g. a file that could not be indexed
+        begin()               the first streamed fragment is about to arrive
+        text(fragment)        a streamed fragment of the answer
+        end(note)             the streamed answer is complete (note is STOPPED_NOTE when stopped)
+        message(text, role)   a whole message: a non-streamed or cached answer,
+                              or an error with role "system"
+    """
+
+    def __init__(self, status=None, notice=None, begin=None, text=None, end=None, message=None):
+        self.callbacks = {
+            "status": status, "notice": notice, "begin": begin,
+            "text": text, "end": end, "message": message,
+        }
+
+    def emit(self, event, *args):
+        callback = self.callbacks[event]
+        if callback is not None:
+            callback(*args)
+
+
+class TurnResult:
+    """Outcome of a turn: outcome is DONE, CACHED, STOPPED or ERROR.
+
+    text is the answer added to the history (None when nothing was added),
+    stats the final chunk of a streamed answer with Ollama's timings.
+    """
+
+    def __init__(self, outcome, text=None, error=None, stats=None):
+        self.outcome = outcome
+        self.text = text
+        self.error = error
+        self.stats = stats or {}
+
+    def __repr__(self):
+        return f"TurnResult({self.outcome!r}, {self.text!r})"
+
+
+class ChatEngine:
+    """Runs chat turns against Ollama on the caller's thread.
+
+    A history is a plain list of {"role", "content"[, "images"]} messages,
+    oldest first, without the system prompt. run_turn() answers its last
+    message and appends the reply; record(message) is called for every
+    message the engine appends, which is where a front end persists it.
+
+    The optional collaborators add the features of the newer windows:
+    image_policy (older images replaced by descriptions), retriever
+    (relevant chunks of attached files), response_cache, describer
+    (describes images in the background) and materialize (turns image
+    references into base64 just before sending). client may be an
+    OllamaClient or an OllamaHostPool; with a pool the history key pins
+    the chat to one host.
+    """
+
+    def __init__(self, client=None, context_window=None, image_policy=None, retriever=None,
+                 response_cache=None, describer=None, materialize=None, stream=True, debug=False):
+        self.client = client or OllamaClient()
+        self.context_window = context_window or ContextWindow()
+        self.image_policy = image_policy
+        self.retriever = retriever
+        self.response_cache = response_cache
+        self.describer = describer
+        self.materialize = materialize
+        self.stream = stream
+        self.debug = debug
+
+    # ======================================
+    # Request building
+    # ======================================
+    def options(self, model, temperature=None, extra=None):
+        """Request options: temperature, the context size for model, then any extra options"""
+        options = {"num_ctx": self.context_window.num_ctx(model)}
+        if temperature is not None:
+            options = {"temperature": temperature, **options}
+        return {**options, **(extra or {})}
+
+    def build_messages(self, history, model, system_prompt=DEFAULT_SYSTEM_PROMPT, question="", key=None):
+        """The messages to send for history: system prompt, retrieved context and the turns that fit"""
+        if self.retriever is not None and key is not None and self.retriever.has_files(key):
+            system_prompt = with_context(system_prompt, self.retriever.retrieve(key, question))
+        messages = self.context_window.build_messages(system_prompt, history, model)
+        if self.image_policy is not None:
+            messages = self.image_policy.apply(messages)
+        return messages
+
+    def build_payload(self, messages, model, options):
+        if self.materialize is not None:
+            messages = self.materialize(messages)
+        return {"model": model, "messages": messages, "stream": self.stream, "options": options}
+
+    def index_files(self, key, files, listener):
+        """Chunk and embed newly attached files ({"name", "content"}) for retrieval under key"""
+        for f in files:
+            listener.emit("status", f"📄 Indexing {f['name']}...")
+            try:
+                count = self.retriever.add_file(key, f["name"], f["content"])
+                listener.emit("status", f"📄 {f['name']}: {count} chunk(s) indexed")
+            except (OllamaError, OSError, ValueError, KeyError) as e:
+                listener.emit(
+                    "notice",
+                    f"Could not index {f['name']}: {e}\n"
+                    f"Pull the embedding model with: ollama pull {self.retriever.model}",
+                )
+
+    # ======================================
+    # Turns
+    # ======================================
+    def ask(self, history, text, model, **kwargs):
+        """Append a user message to history and answer it; see run_turn for kwargs"""
+        message = {"role": "user", "content": text}
+        history.append(message)
+        record = kwargs.get("record")
+        if record is not None:
+            record(message)
+        return self.run_turn(history, model, question=text, **kwargs)
+
+    def run_turn(self, history, model, system_prompt=DEFAULT_SYSTEM_PROMPT, temperature=None,
+                 question="", files=(), key=None, use_cache=False, cancel=None, listener=None, record=None,
+                 options=None):
+        """Answer the last message of history and append the reply.
+
+        key identifies the chat for file retrieval and host affinity;
+        options are extra Ollama options such as seed or num_predict.
+        Errors are reported to the listener and returned, not raised.
+        """
+        listener = listener or TurnListener()
+        cancel = cancel or CancelToken()
+        try:
+            if files and self.retriever is not None and key is not None:
+                self.index_files(key, files, listener)
+            messages = self.build_messages(history, model, system_prompt, question, key)
+            options = self.options(model, temperature, options)
+
+            response_key = None
+            if use_cache and self.response_cache is not None and self.response_cache.cacheable(options):
+                response_key = cache_key(model, messages, options)
+                cached = self.response_cache.get(response_key)
+                if cached is not None:
+                    listener.emit("message", cached, "assistant")
+                    self.add_reply(history, cached, record)
+                    return TurnResult(CACHED, cached)
+
+            payload = self.build_payload(messages, model, options)
+            if self.debug:
+                self.print_payload(payload, history)
+            if cancel.cancelled:
+                return TurnResult(STOPPED)
+            with self.open_chat(payload, key, cancel) as response:
+                cancel.attach(response)
+                if self.debug:
+                    print(f"✅ Response status: {response.status_code} from {response.url}")
+                if cancel.cancelled:
+                    return TurnResult(STOPPED)
+                if response.status_code != 200:
+                    error = f"Error {response.status_code}: {response.text}"
+                    if self.debug:
+                        print(f"❌ {error}")
+                    listener.emit("message", error, "system")
+                    return TurnResult(ERROR, error=error)
+                if self.stream:
+                    text, stats = self.read_stream(response, cancel, listener)
+                else:
+                    text = response.json().get("message", {}).get("content", NO_RESPONSE)
+                    stats = {}
+                    listener.emit("message", text, "assistant")
+            if text is None:
+                return TurnResult(STOPPED)   # stopped before any text arrived
+            self.add_reply(history, text, record)
+            if self.describer is not None:
+                self.describer.describe_later(history, model)
+            if cancel.cancelled:
+                return TurnResult(STOPPED, text, stats=stats)
+            if response_key and text != NO_RESPONSE:
+                self.response_cache.put(response_key, model, text)
+            return TurnResult(DONE, text, stats=stats)
+        except Exception as e:
+            if cancel.cancelled:
+                return TurnResult(STOPPED)
+            if self.debug:
+                import traceback
+                traceback.print_exc()
+            error = f"Error: {str(e)}"
+            listener.emit("message", error, "system")
+            return TurnResult(ERROR, error=error)
+
+    def open_chat(self, payload, key=None, cancel=None):
+        """Context manager around the /api/chat response; a host pool keeps the host busy until it ends.
+
+        cancel can abort the request before the response arrives, i.e.
+        during prompt evaluation.
+        """
+        if hasattr(self.client, "request"):
+            return self.client.request("chat", payload, stream=self.stream, affinity=key, cancel=cancel)
+        return nullcontext(self.client.chat(payload, stream=self.stream, cancel=cancel))
+
+    def read_stream(self, response, cancel, listener):
+        """Pass streamed fragments to the listener; returns (text, final chunk).
+
+        A stopped answer is the partial text marked with STOPPED_NOTE, or
+        None when nothing had arrived yet.
+        """
+        parts = []
+        stats = {}
+        for chunk in iter_chat_stream(response, cancel):
+            if chunk.get("done"):
+                stats = chunk
+            piece = chunk_text(chunk)
+            if not piece:
+                continue
+            if not parts:
+                listener.emit("begin")
+            parts.append(piece)
+            listener.emit("text", piece)
+
+        if cancel.cancelled:
+            if not parts:
+                return None, stats
+            listener.emit("end", STOPPED_NOTE)
+            return "".join(parts) + f"\n\n{STOPPED_NOTE}", stats
+        if not parts:
+            listener.emit("message", NO_RESPONSE, "assistant")
+            return NO_RESPONSE, stats
+        listener.emit("end", None)
+        return "".join(parts), stats
+
+    def add_reply(self, history, text, record=None):
+        reply = {"role": "assistant", "content": text}
+        history.append(reply)
+        if record is not None:
+            record(reply)
+
+    def print_payload(self, payload, history):
+        print(f"\n🔍 DEBUG: Sending request to {getattr(self.client, 'base_url', 'Ollama')}")
+        print(f"📦 Model: {payload['model']}")
+        print(f"📝 Messages count: {len(payload['messages'])} of {len(history) + 1}")
+        for i, msg in enumerate(payload['messages']):
+            has_images = "images" in msg
+            img_count = len(msg.get("images", []))
+            print(f"  Message {i}: role={msg['role']}, has_images={has_images}, image_count={img_count}")
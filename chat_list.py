@@ -0,0 +1,212 @@
+"""
+Chat List
+Sidebar list of chats drawn with a fixed pool of recycled row widgets.
+"""
+
+import tkinter as tk
+
+VISIBLE_ROWS = 12
+
+
+class ChatListModel:
+    """Entries shown in the sidebar and the scroll offset into them.
+
+    Entries are any objects with id and name attributes, in display order
+    (newest first). Only rows offset .. offset + rows - 1 are ever drawn.
+    """
+
+    def __init__(self, rows=VISIBLE_ROWS):
+        self.rows = max(1, rows)
+        self.entries = []
+        self.offset = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def set_entries(self, entries):
+        self.entries = list(entries)
+        self.offset = 0
+
+    def index_of(self, entry_id):
+        for i, entry in enumerate(self.entries):
+            if entry.id == entry_id:
+                return i
+        return -1
+
+    def insert(self, entry, index=0):
+        """Insert an entry; keeps the rows being looked at in place when inserting above them"""
+        index = max(0, min(index, len(self.entries)))
+        self.entries.insert(index, entry)
+        if index < self.offset:
+            self.offset += 1
+
+    def remove(self, entry_id):
+        """Remove an entry by id; returns False if it is not listed"""
+        index = self.index_of(entry_id)
+        if index < 0:
+            return False
+        del self.entries[index]
+        if index < self.offset:
+            self.offset -= 1
+        self.clamp()
+        return True
+
+    def max_offset(self):
+        return max(0, len(self.entries) - self.rows)
+
+    def clamp(self):
+        self.offset = max(0, min(self.offset, self.max_offset()))
+
+    def scroll_to(self, offset):
+        self.offset = offset
+        self.clamp()
+
+    def scroll_by(self, rows):
+        self.scroll_to(self.offset + rows)
+
+    def visible(self):
+        """Return the entries currently drawn, top to bottom"""
+        return self.entries[self.offset:self.offset + self.rows]
+
+    def fractions(self):
+        """Scrollbar (first, last) fractions for the visible rows"""
+        total = len(self.entries)
+        if total <= self.rows:
+            return 0.0, 1.0
+        return self.offset / total, (self.offset + self.rows) / total
+
+
+class ChatListView(tk.Frame):
+    """A ChatListModel drawn with a fixed pool of row buttons.
+
+    Rows are created and bound once; scrolling, inserting, renaming or
+    removing a chat only reconfigures the pool, so the cost of an update
+    does not depend on how many chats exist.
+    """
+
+    def __init__(self, parent, on_select, on_context=None, rows=VISIBLE_ROWS, bg="#182033",
+                 row_bg="#f3f4f6", row_hover="#e5e7eb", row_fg="#1f2937", format_row=None):
+        super().__init__(parent, bg=bg)
+        self.model = ChatListModel(rows)
+        self.on_select = on_select
+        self.on_context = on_context
+        self.format_row = format_row or (lambda entry: f"💬 {entry.name[:25]}")
+        self.row_bg, self.row_hover = row_bg, row_hover
+        self.row_texts = [None] * self.model.rows
+
+        self.scrollbar = tk.Scrollbar(self, orient="vertical", command=self.yview)
+        self.rows_frame = tk.Frame(self, bg=bg)
+        self.rows_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.row_buttons = []
+        for k in range(self.model.rows):
+            btn = tk.Button(
+                self.rows_frame,
+                text="",
+                bg=row_bg,
+                fg=row_fg,
+                activebackground=row_hover,
+                activeforeground=row_fg,
+                relief=tk.FLAT,
+                anchor="w",
+                justify=tk.LEFT,
+                font=("Segoe UI", 10),
+                padx=10,
+                pady=8,
+                cursor="hand2",
+                command=lambda k=k: self.select_row(k),
+            )
+            btn.bind("<Enter>", lambda e, b=btn: b.config(bg=self.row_hover))
+            btn.bind("<Leave>", lambda e, b=btn: b.config(bg=self.row_bg))
+            btn.bind("<Button-3>", lambda e, k=k: self.context_row(k, e))
+            btn.bind("<MouseWheel>", self.on_mousewheel)
+            btn.bind("<Button-4>", lambda e: self.scroll_by(-1))
+            btn.bind("<Button-5>", lambda e: self.scroll_by(1))
+            self.row_buttons.append(btn)
+
+    # ======================================
+    # Entry updates
+    # ======================================
+    def set_entries(self, entries):
+        self.model.set_entries(entries)
+        self.render()
+
+    def insert(self, entry, index=0):
+        self.model.insert(entry, index)
+        self.render()
+
+    def remove(self, entry_id):
+        if self.model.remove(entry_id):
+            self.render()
+
+    def refresh_entry(self, entry_id):
+        """Redraw one entry after its name changed; no-op when it is scrolled out of view"""
+        index = self.model.index_of(entry_id) - self.model.offset
+        if 0 <= index < self.model.rows:
+            self.render_row(index, self.model.entries[index + self.model.offset])
+
+    # ======================================
+    # Drawing and scrolling
+    # ======================================
+    def render_row(self, k, entry):
+        text = self.format_row(entry) if entry is not None else None
+        if text == self.row_texts[k]:
+            return
+        btn = self.row_buttons[k]
+        if text is None:
+            btn.pack_forget()
+        else:
+            btn.config(text=text)
+            if self.row_texts[k] is None:
+                btn.pack(fill=tk.X, pady=3, padx=5)
+        self.row_texts[k] = text
+
+    def render(self):
+        visible = self.model.visible()
+        # Visible rows are always a prefix of the pool, so rows that come
+        # back are packed after the ones already shown, in order
+        for k in range(self.model.rows):
+            self.render_row(k, visible[k] if k < len(visible) else None)
+        self.update_scrollbar()
+
+    def update_scrollbar(self):
+        first, last = self.model.fractions()
+        self.scrollbar.set(first, last)
+        if last - first < 1.0:
+            self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        else:
+            self.scrollbar.pack_forget()
+
+    def scroll_by(self, rows):
+        self.model.scroll_by(rows)
+        self.render()
+
+    def yview(self, *args):
+        """Scrollbar command: ('moveto', fraction) or ('scroll', n, 'units'|'pages')"""
+        if not args:
+            return
+        if args[0] == "moveto":
+            self.model.scroll_to(round(float(args[1]) * len(self.model)))
+        elif args[0] == "scroll":
+            step = self.model.rows if args[2] == "pages" else 1
+            self.model.scroll_by(int(args[1]) * step)
+        self.render()
+
+    def on_mousewheel(self, event):
+        self.scroll_by(-1 if event.delta > 0 else 1)
+
+    def entry_at(self, k):
+        index = self.model.offset + k
+        if index < len(self.model):
+            return self.model.entries[index]
+        return None
+
+    def select_row(self, k):
+        entry = self.entry_at(k)
+        if entry is not None:
+            self.on_select(entry.id)
+
+    def context_row(self, k, event):
+        entry = self.entry_at(k)
+        if entry is not None and self.on_context:
+            self.on_context(entry.id, event)
@@ -5,12 +5,16 @@ A professional chatbot application using Ollama with a sleek, customizable inter
 
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox
-import requests
 import json
 import threading
 from datetime import datetime
 import os
 
+from chat_engine import ChatEngine, TurnListener, ERROR
+from context_window import ContextWindow
+from ollama_client import OllamaClient, model_names
+from ui_queue import UIUpdateQueue
+
 
 class OllamaChatbot:
     def __init__(self, root):
@@ -37,16 +41,22 @@ class OllamaChatbot:
         self.root.configure(bg=self.colors['bg_primary'])
         
         # Configuration
-        self.ollama_url = "http://localhost:11434/api/chat"
+        self.client = OllamaClient()
         self.current_model = tk.StringVar(value="llama2")
         self.temperature = tk.DoubleVar(value=0.7)
         self.system_prompt = "You are a helpful AI assistant."
         self.chat_history = []
         self.is_generating = False
+        self.context_window = ContextWindow()
+        self.engine = ChatEngine(self.client, self.context_window)
         
         # Setup GUI
         self.setup_gui()
         
+        # Worker threads hand UI work to the Tk loop through this queue
+        self.ui_queue = UIUpdateQueue(self.root.after, self.root.after_cancel)
+        self.ui_queue.start()
+        
         # Check Ollama connection on startup
         self.root.after(100, self.check_ollama_connection)
     
@@ -286,14 +296,14 @@ class OllamaChatbot:
         """Create model selection dropdown"""
         models = ["llama2", "mistral", "codellama", "llama3", "phi", "gemma"]
         
-        model_menu = ttk.Combobox(
+        self.model_menu = ttk.Combobox(
             parent,
             textvariable=self.current_model,
             values=models,
             state="readonly",
             font=("Arial", 10)
         )
-        model_menu.pack(fill=tk.X)
+        self.model_menu.pack(fill=tk.X)
         
         # Style the combobox
         style = ttk.Style()
@@ -419,28 +429,42 @@ class OllamaChatbot:
         """Check if Ollama is running and accessible"""
         def check():
             try:
-                response = requests.get("http://localhost:11434/api/tags", timeout=2)
+                response = self.client.tags()
                 if response.status_code == 200:
-                    self.connection_indicator.config(
-                        text="● Connected",
-                        fg=self.colors['success']
+                    self.ui_queue.post(self.update_model_list, model_names(response))
+                    self.ui_queue.post(
+                        self.show_connection_state,
+                        "● Connected",
+                        self.colors['success'],
+                        "Connected to Ollama"
                     )
-                    self.update_status("Connected to Ollama")
                 else:
-                    self.connection_indicator.config(
-                        text="● Error",
-                        fg=self.colors['accent']
+                    self.ui_queue.post(
+                        self.show_connection_state,
+                        "● Error",
+                        self.colors['accent'],
+                        "Ollama connection error"
                     )
-                    self.update_status("Ollama connection error")
             except Exception:
-                self.connection_indicator.config(
-                    text="● Disconnected",
-                    fg=self.colors['accent']
+                self.ui_queue.post(
+                    self.show_connection_state,
+                    "● Disconnected",
+                    self.colors['accent'],
+                    "Ollama not running - Please start Ollama"
                 )
-                self.update_status("Ollama not running - Please start Ollama")
         
         threading.Thread(target=check, daemon=True).start()
     
+    def update_model_list(self, models):
+        """Offer the models installed on the Ollama server in the model selector"""
+        if models:
+            self.model_menu.config(values=models)
+    
+    def show_connection_state(self, indicator_text, color, status):
+        """Update the connection indicator and status bar together"""
+        self.connection_indicator.config(text=indicator_text, fg=color)
+        self.update_status(status)
+    
     def update_status(self, message):
         """Update status bar message"""
         self.status_bar.config(text=message)
@@ -487,46 +511,28 @@ class OllamaChatbot:
     def get_bot_response(self):
         """Get response from Ollama"""
         try:
-            payload = {
-                "model": self.current_model.get(),
-                "messages": [
-                    {"role": "system", "content": self.system_prompt}
-                ] + self.chat_history,
-                "stream": False,
-                "options": {
-                    "temperature": self.temperature.get()
-                }
-            }
-            
-            response = requests.post(
-                self.ollama_url,
-                json=payload,
-                timeout=120
+            result = self.engine.run_turn(
+                self.chat_history,
+                self.current_model.get(),
+                system_prompt=self.system_prompt,
+                temperature=self.temperature.get(),
+                listener=self.turn_listener(),
             )
-            
-            if response.status_code == 200:
-                result = response.json()
-                bot_message = result.get("message", {}).get("content", "No response")
-                
-                # Add to history
-                self.chat_history.append({"role": "assistant", "content": bot_message})
-                
-                # Display bot message
-                self.root.after(0, lambda: self.display_message(bot_message, "bot"))
-                self.root.after(0, lambda: self.update_status("Ready"))
-            else:
-                error_msg = f"Error: {response.status_code} - {response.text}"
-                self.root.after(0, lambda: self.display_message(error_msg, "system"))
-                self.root.after(0, lambda: self.update_status("Error occurred"))
-        
-        except Exception as e:
-            error_msg = f"Error: {str(e)}"
-            self.root.after(0, lambda: self.display_message(error_msg, "system"))
-            self.root.after(0, lambda: self.update_status("Error occurred"))
-        
+            self.ui_queue.post(self.update_status, "Error occurred" if result.outcome == ERROR else "Ready")
         finally:
             self.is_generating = False
-            self.root.after(0, lambda: self.send_button.config(state=tk.NORMAL, text="Send\n→"))
+            self.ui_queue.post(lambda: self.send_button.config(state=tk.NORMAL, text="Send\n→"))
+    
+    def turn_listener(self):
+        """Route the engine's progress to the chat display through the UI queue"""
+        return TurnListener(
+            begin=lambda: self.ui_queue.post(self.begin_stream_message),
+            text=lambda piece: self.ui_queue.append_text(self.append_stream_text, piece),
+            end=lambda note: self.ui_queue.post(self.end_stream_message),
+            message=lambda text, role: self.ui_queue.post(
+                self.display_message, text, "bot" if role == "assistant" else role
+            ),
+        )
     
     def display_message(self, message, sender):
         """Display a message in the chat"""
@@ -557,6 +563,28 @@ class OllamaChatbot:
         self.chat_display.config(state=tk.DISABLED)
         self.chat_display.see(tk.END)
     
+    def begin_stream_message(self):
+        """Open an AI message that is filled in as tokens arrive"""
+        self.chat_display.config(state=tk.NORMAL)
+        
+        timestamp = datetime.now().strftime("%H:%M")
+        self.chat_display.insert(tk.END, "\n")
+        self.chat_display.insert(tk.END, f"[{timestamp}] AI:\n", "timestamp")
+        
+        self.chat_display.config(state=tk.DISABLED)
+        self.chat_display.see(tk.END)
+    
+    def append_stream_text(self, text):
+        """Append a streamed fragment to the open AI message"""
+        self.chat_display.config(state=tk.NORMAL)
+        self.chat_display.insert(tk.END, text, "bot")
+        self.chat_display.config(state=tk.DISABLED)
+        self.chat_display.see(tk.END)
+    
+    def end_stream_message(self):
+        """Close the streamed AI message"""
+        self.append_stream_text("\n")
+    
     def clear_chat(self):
         """Clear the chat history"""
         if messagebox.askyesno("Clear Chat", "Are you sure you want to clear the chat?"):
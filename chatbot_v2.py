@@ -5,15 +5,24 @@ A professional chatbot application with file/image input capabilities.
 
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox, filedialog
-import requests
 import json
 import threading
 from datetime import datetime
 import os
-import base64
 from PIL import Image, ImageTk
 import io
 
+from chat_engine import ChatEngine, TurnListener, CACHED, ERROR, STOPPED
+from context_window import ContextWindow, DROP_OLD_IMAGES
+from file_retrieval import FileRetriever
+from generation_queue import GenerationScheduler
+from image_memory import ImageDescriber, ImagePolicy, KEEP_IMAGE_TURNS
+from image_pipeline import ImagePreprocessor, savings_text
+from response_cache import ResponseCache
+from model_warmup import ModelWarmer
+from ollama_client import OllamaClient, model_names
+from ui_queue import UIUpdateQueue
+
 class OllamaChatbotV2:
     def __init__(self, root):
         self.root = root
@@ -40,23 +49,54 @@ class OllamaChatbotV2:
         self.root.configure(bg=self.colors['bg_primary'])
         
         # Configuration
-        self.ollama_url = "http://localhost:11434/api/chat"
+        self.client = OllamaClient()
+        self.model_warmer = ModelWarmer(
+            self.client,
+            on_done=lambda *result: self.ui_queue.post(self.on_model_warmed, *result),
+            options=lambda model: self.engine.options(model),   # same num_ctx as the chats
+        )
         self.current_model = tk.StringVar(value="llama2")
         self.temperature = tk.DoubleVar(value=0.7)
         self.system_prompt = "You are a helpful AI assistant that can analyze files and images."
         self.chat_history = []
         self.is_generating = False
+        self.generation = None   # CancelToken of the answer being generated
+        # Runs the answers, and image descriptions when no answer is waiting
+        self.scheduler = GenerationScheduler()
+        self.context_window = ContextWindow(strategy=DROP_OLD_IMAGES)
+        self.image_describer = ImageDescriber(self.client, scheduler=self.scheduler)
+        self.image_policy = ImagePolicy(keep_turns=KEEP_IMAGE_TURNS, describe=self.image_describer.get)
+        self.retriever = FileRetriever(self.client)
+        self.retrieval_key = "chat"
+        # Answers at temperature 0 are reused for identical prompts when enabled
+        self.cache_responses = tk.BooleanVar(value=False)
+        self.response_cache = ResponseCache("response_cache.db")
+        self.engine = ChatEngine(
+            self.client,
+            self.context_window,
+            image_policy=self.image_policy,
+            retriever=self.retriever,
+            response_cache=self.response_cache,
+            describer=self.image_describer,
+        )
         
         # File/Image handling
         self.attached_files = []
         self.attached_images = []
         self.current_image_data = None
+        self.image_preprocessor = ImagePreprocessor()
+        self.pending_images = 0
         
         # Setup GUI
         self.setup_gui()
         
-        # Check Ollama connection
+        # Worker threads hand UI work to the Tk loop through this queue
+        self.ui_queue = UIUpdateQueue(self.root.after, self.root.after_cancel)
+        self.ui_queue.start()
+        
+        # Check Ollama connection; the selected model is loaded once it is up
         self.root.after(100, self.check_ollama_connection)
+        self.current_model.trace_add("write", lambda *args: self.warm_current_model())
     
     def setup_gui(self):
         """Setup the main GUI layout"""
@@ -374,14 +414,14 @@ class OllamaChatbotV2:
         """Create model selection dropdown"""
         models = ["llama2", "llava", "mistral", "codellama", "llama3", "phi", "gemma"]
         
-        model_menu = ttk.Combobox(
+        self.model_menu = ttk.Combobox(
             parent,
             textvariable=self.current_model,
             values=models,
             state="readonly",
             font=("Arial", 10)
         )
-        model_menu.pack(fill=tk.X)
+        self.model_menu.pack(fill=tk.X)
         
         style = ttk.Style()
         style.theme_use('clam')
@@ -423,6 +463,19 @@ class OllamaChatbotV2:
             showvalue=0
         )
         slider.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        
+        tk.Checkbutton(
+            parent,
+            text="Reuse answers at temperature 0",
+            variable=self.cache_responses,
+            bg=self.colors['bg_secondary'],
+            fg=self.colors['text_primary'],
+            selectcolor=self.colors['bg_tertiary'],
+            activebackground=self.colors['bg_secondary'],
+            activeforeground=self.colors['text_primary'],
+            font=("Arial", 9),
+            anchor=tk.W
+        ).pack(fill=tk.X, pady=(5, 0))
     
     def create_system_prompt_input(self, parent):
         """Create system prompt text area"""
@@ -549,34 +602,42 @@ class OllamaChatbotV2:
         )
         
         if file_path:
-            try:
-                file_name = os.path.basename(file_path)
-                
-                # Read and encode image
-                with open(file_path, 'rb') as f:
-                    image_data = base64.b64encode(f.read()).decode('utf-8')
-                
-                self.attached_images.append({
-                    'name': file_name,
-                    'path': file_path,
-                    'data': image_data
-                })
-                
-                self.current_image_data = image_data
-                
-                self.update_attachment_preview()
-                self.update_status(f"Attached image: {file_name}")
-                
-                # Suggest using llava if not already
-                if self.current_model.get() != "llava":
-                    response = messagebox.askyesno(
-                        "Switch to Vision Model?",
-                        "For image analysis, 'llava' model is recommended. Switch now?"
-                    )
-                    if response:
-                        self.current_model.set("llava")
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to read image: {str(e)}")
+            # Suggest using llava if not already
+            if self.current_model.get() != "llava":
+                response = messagebox.askyesno(
+                    "Switch to Vision Model?",
+                    "For image analysis, 'llava' model is recommended. Switch now?"
+                )
+                if response:
+                    self.current_model.set("llava")
+
+            # Resize and recompress for the selected model off the Tk thread
+            self.pending_images += 1
+            self.update_status(f"Preparing image: {os.path.basename(file_path)}")
+            self.image_preprocessor.submit(
+                file_path,
+                self.current_model.get(),
+                lambda future: self.ui_queue.post(self.add_prepared_image, future, file_path),
+            )
+
+    def add_prepared_image(self, future, file_path):
+        """Attach an image once the preprocessor has finished with it"""
+        self.pending_images -= 1
+        try:
+            prepared = future.result()
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to read image: {str(e)}")
+            return
+
+        self.attached_images.append({
+            'name': prepared['name'],
+            'path': file_path,
+            'data': prepared['data']
+        })
+        self.current_image_data = prepared['data']
+
+        self.update_attachment_preview()
+        self.update_status(f"Attached image: {prepared['name']} ({savings_text(prepared)})")
     
     def update_attachment_preview(self):
         """Update the attachment preview display"""
@@ -628,28 +689,58 @@ class OllamaChatbotV2:
         """Check if Ollama is running"""
         def check():
             try:
-                response = requests.get("http://localhost:11434/api/tags", timeout=2)
+                response = self.client.tags()
                 if response.status_code == 200:
-                    self.connection_indicator.config(
-                        text="● Connected",
-                        fg=self.colors['success']
+                    self.ui_queue.post(self.update_model_list, model_names(response))
+                    self.ui_queue.post(
+                        self.show_connection_state,
+                        "● Connected",
+                        self.colors['success'],
+                        "Connected to Ollama | v2.0"
                     )
-                    self.update_status("Connected to Ollama | v2.0")
+                    self.ui_queue.post(self.warm_current_model)
                 else:
-                    self.connection_indicator.config(
-                        text="● Error",
-                        fg=self.colors['accent']
+                    self.ui_queue.post(
+                        self.show_connection_state,
+                        "● Error",
+                        self.colors['accent'],
+                        "Ollama connection error"
                     )
-                    self.update_status("Ollama connection error")
             except Exception:
-                self.connection_indicator.config(
-                    text="● Disconnected",
-                    fg=self.colors['accent']
+                self.ui_queue.post(
+                    self.show_connection_state,
+                    "● Disconnected",
+                    self.colors['accent'],
+                    "Ollama not running"
                 )
-                self.update_status("Ollama not running")
         
         threading.Thread(target=check, daemon=True).start()
     
+    def update_model_list(self, models):
+        """Offer the models installed on the Ollama server in the model selector"""
+        if models:
+            self.model_menu.config(values=models)
+    
+    def show_connection_state(self, indicator_text, color, status):
+        """Update the connection indicator and status bar together"""
+        self.connection_indicator.config(text=indicator_text, fg=color)
+        self.update_status(status)
+    
+    def warm_current_model(self):
+        """Load the selected model in the background"""
+        model = self.current_model.get()
+        if self.model_warmer.warm(model):
+            self.update_status(f"Loading {model}...")
+    
+    def on_model_warmed(self, model, seconds, error):
+        """Report the result of a background model load"""
+        if model != self.current_model.get():
+            return
+        if error:
+            self.update_status(f"Could not load {model}: {error}")
+        else:
+            self.update_status(f"{model} ready ({seconds:.1f} s)")
+    
     def update_status(self, message):
         """Update status bar message"""
         self.status_bar.config(text=f"{message} | v2.0 with File & Image Support")
@@ -671,17 +762,19 @@ class OllamaChatbotV2:
         if self.is_generating:
             messagebox.showwarning("Please Wait", "Please wait for the current response to complete.")
             return
+
+        if self.pending_images:
+            messagebox.showwarning("Please Wait", "Please wait until the attached image is ready.")
+            return
         
-        # Build message with file context
+        # Files are indexed for retrieval instead of being pasted into the
+        # message; only their names are kept in the history
         full_message = message
+        files = list(self.attached_files)
         
-        if self.attached_files:
-            full_message += "\n\n--- Attached Files ---\n"
-            for file_info in self.attached_files:
-                full_message += f"\nFile: {file_info['name']}\n"
-                full_message += f"Content:\n{file_info['content'][:5000]}\n"  # Limit to 5000 chars per file
-                if len(file_info['content']) > 5000:
-                    full_message += "... (truncated)\n"
+        if files:
+            names = ", ".join(file_info['name'] for file_info in files)
+            full_message += f"\n\n[Attached files: {names}]"
         
         # Clear input
         self.message_input.delete("1.0", tk.END)
@@ -710,54 +803,74 @@ class OllamaChatbotV2:
         # Clear attachments after sending
         self.clear_attachments()
         
-        # Get bot response
+        # Get bot response; the send button becomes a stop button meanwhile
         self.is_generating = True
-        self.send_button.config(state=tk.DISABLED, text="...")
+        self.generation = self.scheduler.submit("chat", self.get_bot_response, files, message).cancel
+        self.send_button.config(text="Stop\n■", command=self.stop_generation)
         self.update_status("Generating response...")
-        
-        threading.Thread(target=self.get_bot_response, daemon=True).start()
     
-    def get_bot_response(self):
+    def stop_generation(self):
+        """Abort the answer being generated; the text received so far is kept.
+
+        The input stays locked until the worker has returned and posted
+        finish_generation, so a late part of the stopped reply cannot land
+        after a newer message.
+        """
+        token = self.generation
+        if token is None or token.cancelled:
+            return
+        token.cancel()
+        self.send_button.config(state=tk.DISABLED, text="Stopping...")
+        self.update_status("Stopping...")
+    
+    def finish_generation(self, token):
+        """Give the input back once a generation has ended or was stopped"""
+        if self.generation is token:
+            self.generation = None
+            self.is_generating = False
+            self.send_button.config(state=tk.NORMAL, text="Send\n→", command=self.send_message)
+    
+    def get_bot_response(self, files=(), question="", cancel=None):
         """Get response from Ollama"""
         try:
-            payload = {
-                "model": self.current_model.get(),
-                "messages": [
-                    {"role": "system", "content": self.system_prompt}
-                ] + self.chat_history,
-                "stream": False,
-                "options": {
-                    "temperature": self.temperature.get()
-                }
-            }
-            
-            response = requests.post(
-                self.ollama_url,
-                json=payload,
-                timeout=120
+            result = self.engine.run_turn(
+                self.chat_history,
+                self.current_model.get(),
+                system_prompt=self.system_prompt,
+                temperature=self.temperature.get(),
+                question=question,
+                files=files,
+                key=self.retrieval_key,
+                use_cache=self.cache_responses.get(),
+                cancel=cancel,
+                listener=self.turn_listener(),
             )
-            
-            if response.status_code == 200:
-                result = response.json()
-                bot_message = result.get("message", {}).get("content", "No response")
-                
-                self.chat_history.append({"role": "assistant", "content": bot_message})
-                
-                self.root.after(0, lambda: self.display_message(bot_message, "bot"))
-                self.root.after(0, lambda: self.update_status("Ready"))
+            if result.outcome == ERROR:
+                self.ui_queue.post(self.update_status, "Error occurred")
+            elif result.outcome == CACHED:
+                self.ui_queue.post(self.update_status, f"Answered from cache | {self.response_cache.stats_text()}")
+            elif result.outcome == STOPPED:
+                self.ui_queue.post(self.update_status, "Stopped")
             else:
-                error_msg = f"Error: {response.status_code} - {response.text}"
-                self.root.after(0, lambda: self.display_message(error_msg, "system"))
-                self.root.after(0, lambda: self.update_status("Error occurred"))
-        
-        except Exception as e:
-            error_msg = f"Error: {str(e)}"
-            self.root.after(0, lambda: self.display_message(error_msg, "system"))
-            self.root.after(0, lambda: self.update_status("Error occurred"))
-        
+                status = "Ready"
+                if self.cache_responses.get():
+                    status += f" | {self.response_cache.stats_text()}"
+                self.ui_queue.post(self.update_status, status)
         finally:
-            self.is_generating = False
-            self.root.after(0, lambda: self.send_button.config(state=tk.NORMAL, text="Send\n→"))
+            self.ui_queue.post(self.finish_generation, cancel)
+    
+    def turn_listener(self):
+        """Route the engine's progress to the chat display through the UI queue"""
+        return TurnListener(
+            status=lambda text: self.ui_queue.post(self.update_status, text),
+            notice=lambda text: self.ui_queue.post(self.display_message, text, "system"),
+            begin=lambda: self.ui_queue.post(self.begin_stream_message),
+            text=lambda piece: self.ui_queue.append_text(self.append_stream_text, piece),
+            end=lambda note: self.ui_queue.post(self.end_stream_message, note),
+            message=lambda text, role: self.ui_queue.post(
+                self.display_message, text, "bot" if role == "assistant" else role
+            ),
+        )
     
     def display_message(self, message, sender):
         """Display a message in the chat"""
@@ -783,10 +896,33 @@ class OllamaChatbotV2:
         self.chat_display.config(state=tk.DISABLED)
         self.chat_display.see(tk.END)
     
+    def begin_stream_message(self):
+        """Open an AI message that is filled in as tokens arrive"""
+        self.chat_display.config(state=tk.NORMAL)
+        
+        timestamp = datetime.now().strftime("%H:%M")
+        self.chat_display.insert(tk.END, "\n")
+        self.chat_display.insert(tk.END, f"[{timestamp}] AI:\n", "timestamp")
+        
+        self.chat_display.config(state=tk.DISABLED)
+        self.chat_display.see(tk.END)
+    
+    def append_stream_text(self, text):
+        """Append a streamed fragment to the open AI message"""
+        self.chat_display.config(state=tk.NORMAL)
+        self.chat_display.insert(tk.END, text, "bot")
+        self.chat_display.config(state=tk.DISABLED)
+        self.chat_display.see(tk.END)
+    
+    def end_stream_message(self, note=None):
+        """Close the streamed AI message, optionally with a note such as STOPPED_NOTE"""
+        self.append_stream_text(f"\n\n{note}\n" if note else "\n")
+    
     def clear_chat(self):
         """Clear the chat history"""
         if messagebox.askyesno("Clear Chat", "Are you sure you want to clear the chat?"):
             self.chat_history = []
+            self.retriever.discard(self.retrieval_key)
             self.chat_display.config(state=tk.NORMAL)
             self.chat_display.delete("1.0", tk.END)
             self.chat_display.config(state=tk.DISABLED)
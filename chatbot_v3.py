@@ -1,9 +1,26 @@
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
-import requests, threading, os, pickle, base64
+from tkinter import ttk, filedialog, messagebox, simpledialog
+import threading, os, pickle
+import functools
 from datetime import datetime
 import platform
 
+from chat_engine import ChatEngine, TurnListener, CACHED
+from context_window import ContextWindow, DROP_OLD_IMAGES
+from file_retrieval import FileRetriever
+from generation_queue import GenerationScheduler, ollama_num_parallel
+from image_memory import ImageDescriber, ImagePolicy, KEEP_IMAGE_TURNS
+from response_cache import ResponseCache
+from model_warmup import ModelWarmer, KEEP_ALIVE_CHOICES, keep_alive_label
+from host_pool import OllamaHostPool
+from ollama_client import CancelToken, DEFAULT_KEEP_ALIVE, model_names
+from session_store import SessionStore, SessionCache
+from attachment_store import AttachmentStore
+from transcript_window import TranscriptWindow
+from chat_list import ChatListView
+from image_pipeline import ImagePreprocessor, savings_text
+from ui_queue import UIUpdateQueue
+
 # ======================================
 # Platform-specific font configuration
 # ======================================
@@ -25,13 +42,35 @@ SYSTEM_FONT = get_system_font()
 # ======================================
 class ChatSession:
     def __init__(self, name="New Chat", chat_id=None):
-        self.id = chat_id or datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.id = chat_id or datetime.now().strftime("%Y%m%d_%H%M%S_%f")
         self.name = name
         self.messages = []
         self.created_at = datetime.now()
         self.updated_at = datetime.now()
 
 
+class SessionInfo:
+    """Sidebar entry for a chat: metadata only, messages stay in the store"""
+
+    def __init__(self, chat_id, name, created_at=None, updated_at=None, message_count=0):
+        self.id = chat_id
+        self.name = name
+        self.created_at = created_at or datetime.now()
+        self.updated_at = updated_at or self.created_at
+        self.message_count = message_count
+
+
+class SearchHit:
+    """Sidebar entry for a message found by full-text search"""
+
+    def __init__(self, hit):
+        self.id = hit["message_id"]
+        self.name = hit["session_name"]
+        self.session_id = hit["session_id"]
+        self.seq = hit["seq"]
+        self.snippet = hit["snippet"]
+
+
 # ======================================
 # Avatar Selection Dialog
 # ======================================
@@ -166,14 +205,68 @@ class OllamaChatbotBlue(tk.Tk):
         self.geometry("1400x900")
         self.minsize(1200, 800)
 
-        # Session state
+        # Session state: chat_sessions is the metadata index shown in the
+        # sidebar; only the sessions in session_cache hold their messages
         self.chat_sessions = []
+        self.session_index = {}
         self.current_session = None
-        self.sessions_file = "chat_sessions.pkl"
+        self.sessions_file = "chat_sessions.pkl"  # legacy format, migrated on first start
+        self.sessions_db = "chat_sessions.db"
+        self.store = SessionStore(self.sessions_db)
+        self.attachments = AttachmentStore("attachments")
+        # Chats with answers running or queued stay loaded, so the reply is
+        # appended to the session the chat shows when it is reopened. The
+        # token estimates of evicted chats are dropped with them
+        self.session_cache = SessionCache(
+            self.open_session, capacity=8, pinned=lambda sid: self.scheduler.busy(sid),
+            on_evict=lambda session: self.context_window.invalidate(session.messages),
+        )
+        self.transcript = TranscriptWindow()
+        self.transcript_loading = False
         self.attached_files, self.attached_images = [], []
-        self.is_generating = False
+        self.image_preprocessor = ImagePreprocessor()
+        self.pending_images = 0
+        self.is_generating = False   # the current chat has answers running or queued
+        self.generation = None       # CancelToken of the answer shown live in the chat display
         self.system_prompt = "You are a helpful AI assistant."
-        self.ollama_url = "http://localhost:11434/api/chat"
+        # Requests are spread over the hosts in OLLAMA_HOSTS (or the single
+        # OLLAMA_HOST), each chat sticking to one host
+        self.client = OllamaHostPool(pool_size=max(4, ollama_num_parallel()))
+        # One answer at a time per chat, follow-ups queued behind it; chats
+        # share as many concurrent requests as the hosts run in parallel
+        self.scheduler = GenerationScheduler(
+            max_concurrent=ollama_num_parallel() * len(self.client),
+            on_change=lambda *counts: self.ui_queue.post(self.update_queue_status, *counts)
+        )
+        self.model_warmer = ModelWarmer(
+            self.client,
+            on_done=lambda *result: self.ui_queue.post(self.on_model_warmed, *result),
+            options=lambda model: self.engine.options(model),   # same num_ctx as the chats
+        )
+        self.context_window = ContextWindow(strategy=DROP_OLD_IMAGES)
+        # Older turns carry a cached description instead of the image itself
+        self.image_describer = ImageDescriber(
+            self.client, resolve=self.attachments.get_base64, store=self.store, scheduler=self.scheduler
+        )
+        self.image_policy = ImagePolicy(keep_turns=KEEP_IMAGE_TURNS, describe=self.image_describer.get)
+        # Attached files are chunked and embedded per chat; each question
+        # only sends the most relevant chunks
+        self.retriever = FileRetriever(self.client, root="retrieval")
+        # Opt-in reuse of answers to repeated prompts. There is no
+        # temperature control in this window, so turning the cache on is
+        # the explicit permission to reuse sampled answers
+        self.cache_enabled = False
+        self.response_cache = ResponseCache("response_cache.db", allow_sampled=True)
+        self.engine = ChatEngine(
+            self.client,
+            self.context_window,
+            image_policy=self.image_policy,
+            retriever=self.retriever,
+            response_cache=self.response_cache,
+            describer=self.image_describer,
+            materialize=self.attachments.materialize,
+            debug=True,
+        )
         
         # Avatar settings
         self.user_avatar = "👤"
@@ -216,9 +309,16 @@ class OllamaChatbotBlue(tk.Tk):
         self.create_main_layout()
         self.create_status_bar()
 
+        # Worker threads hand UI work to the Tk loop through this queue
+        self.ui_queue = UIUpdateQueue(self.after, self.after_cancel)
+        self.ui_queue.start()
+
         # Load history + check connection
         self.load_sessions()
         self.check_ollama_connection()
+        # Load the newly selected model right away, including when
+        # attaching an image switches to llava
+        self.current_model.trace_add("write", lambda *args: self.warm_current_model())
 
     # ======================================
     # Favicon Setup
@@ -243,6 +343,8 @@ class OllamaChatbotBlue(tk.Tk):
                     settings = pickle.load(f)
                     self.user_avatar = settings.get("user_avatar", "👤")
                     self.bot_avatar = settings.get("bot_avatar", "🤖")
+                    self.cache_enabled = settings.get("cache_responses", False)
+                    self.client.keep_alive = settings.get("keep_alive", DEFAULT_KEEP_ALIVE)
             except Exception:
                 pass
     
@@ -251,7 +353,9 @@ class OllamaChatbotBlue(tk.Tk):
             with open(self.settings_file, "wb") as f:
                 settings = {
                     "user_avatar": self.user_avatar,
-                    "bot_avatar": self.bot_avatar
+                    "bot_avatar": self.bot_avatar,
+                    "cache_responses": self.cache_enabled,
+                    "keep_alive": self.client.keep_alive,
                 }
                 pickle.dump(settings, f)
         except Exception as e:
@@ -440,6 +544,41 @@ class OllamaChatbotBlue(tk.Tk):
         self.bot_avatar_btn.bind("<Enter>", lambda e: self.bot_avatar_btn.config(bg="#e5e7eb"))
         self.bot_avatar_btn.bind("<Leave>", lambda e: self.bot_avatar_btn.config(bg="#f3f4f6"))
 
+        self.cache_var = tk.BooleanVar(value=self.cache_enabled)
+        tk.Checkbutton(
+            avatar_section,
+            text="⚡ Reuse answers to repeated prompts",
+            variable=self.cache_var,
+            command=self.toggle_response_cache,
+            bg=self.colors["sidebar"],
+            fg="white",
+            selectcolor=self.colors["sidebar"],
+            activebackground=self.colors["sidebar"],
+            activeforeground="white",
+            font=("Segoe UI", 9),
+            anchor="w",
+        ).pack(fill=tk.X, pady=(6, 0))
+
+        keep_alive_row = tk.Frame(avatar_section, bg=self.colors["sidebar"])
+        keep_alive_row.pack(fill=tk.X, pady=(6, 0))
+        tk.Label(
+            keep_alive_row,
+            text="Keep model loaded:",
+            bg=self.colors["sidebar"],
+            fg="white",
+            font=("Segoe UI", 9),
+        ).pack(side=tk.LEFT)
+        self.keep_alive_var = tk.StringVar(value=keep_alive_label(self.client.keep_alive))
+        keep_alive_box = ttk.Combobox(
+            keep_alive_row,
+            textvariable=self.keep_alive_var,
+            values=list(KEEP_ALIVE_CHOICES),
+            state="readonly",
+            width=11,
+        )
+        keep_alive_box.pack(side=tk.RIGHT)
+        keep_alive_box.bind("<<ComboboxSelected>>", self.on_keep_alive_changed)
+
         # Chat list
         tk.Label(
             scrollable_frame,
@@ -451,8 +590,35 @@ class OllamaChatbotBlue(tk.Tk):
             padx=20
         ).pack(fill=tk.X, pady=(10, 5))
         
-        self.chat_list = tk.Frame(scrollable_frame, bg=self.colors["sidebar"])
+        # Search box: results replace the chat list while there is a query
+        self.search_var = tk.StringVar()
+        self.search_after_id = None
+        self.showing_search_results = False
+        search_entry = tk.Entry(
+            scrollable_frame,
+            textvariable=self.search_var,
+            font=("Segoe UI", 10),
+            relief=tk.FLAT,
+            bg="#f3f4f6",
+            fg="#1f2937",
+        )
+        search_entry.pack(fill=tk.X, padx=15, pady=(0, 5), ipady=6)
+        search_entry.bind("<KeyRelease>", self.on_search_changed)
+        search_entry.bind("<Escape>", lambda e: self.clear_search())
+
+        self.chat_list = ChatListView(
+            scrollable_frame,
+            on_select=self.load_chat,
+            on_context=self.show_chat_menu,
+            bg=self.colors["sidebar"],
+        )
         self.chat_list.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        self.search_results = ChatListView(
+            scrollable_frame,
+            on_select=self.open_search_hit,
+            bg=self.colors["sidebar"],
+            format_row=lambda hit: f"🔎 {hit.name[:25]}\n{hit.snippet[:40]}",
+        )
         self.refresh_chat_list()
 
     def create_chat_display(self, parent):
@@ -466,8 +632,10 @@ class OllamaChatbotBlue(tk.Tk):
             padx=20,
             pady=20,
             state=tk.DISABLED,
+            yscrollcommand=self.on_transcript_scroll,
         )
         self.chat_display.pack(fill=tk.BOTH, expand=True, padx=10, pady=(10, 0))
+        self.build_message_styles()
 
     def create_input_area(self, parent):
         frame = tk.Frame(parent, bg="#eef2f7")
@@ -510,7 +678,7 @@ class OllamaChatbotBlue(tk.Tk):
         self.input_box.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, ipady=10, padx=(10, 10))
         self.input_box.bind("<Return>", self.send_message)
 
-        send_btn = tk.Button(
+        self.send_btn = tk.Button(
             frame,
             text="⬆️",
             command=self.send_message,
@@ -521,7 +689,7 @@ class OllamaChatbotBlue(tk.Tk):
             cursor="hand2",
             width=3,
         )
-        send_btn.pack(side=tk.RIGHT, padx=10)
+        self.send_btn.pack(side=tk.RIGHT, padx=10)
 
     def create_status_bar(self):
         frame = tk.Frame(self, bg=self.colors["bg"], height=30)
@@ -537,6 +705,24 @@ class OllamaChatbotBlue(tk.Tk):
             anchor="w",
         )
         self.status_label.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=10)
+
+        self.cache_label = tk.Label(
+            frame,
+            text=self.response_cache.stats_text() if self.cache_enabled else "",
+            bg=self.colors["bg"],
+            fg=self.colors["text_alt"],
+            font=("Segoe UI", 9),
+        )
+        self.cache_label.pack(side=tk.RIGHT, padx=10)
+
+        self.queue_label = tk.Label(
+            frame,
+            text="",
+            bg=self.colors["bg"],
+            fg=self.colors["text_alt"],
+            font=("Segoe UI", 9),
+        )
+        self.queue_label.pack(side=tk.RIGHT, padx=10)
         
         # Model selector on the right
         model_frame = tk.Frame(frame, bg=self.colors["bg"])
@@ -566,6 +752,7 @@ class OllamaChatbotBlue(tk.Tk):
     # ======================================
     def show_thinking_indicator(self):
         """Display animated thinking indicator like Claude"""
+        self.show_transcript_tail()
         self.chat_display.config(state=tk.NORMAL)
         
         # Add spacing
@@ -579,16 +766,6 @@ class OllamaChatbotBlue(tk.Tk):
         self.chat_display.insert(tk.END, "● Thinking...", "thinking")
         self.chat_display.insert(tk.END, "\n")
         
-        # Configure thinking style
-        self.chat_display.tag_configure(
-            "thinking",
-            font=("Segoe UI", 11, "italic"),
-            foreground=self.colors["thinking"],
-            lmargin1=55,
-            lmargin2=55,
-            spacing3=15,
-        )
-        
         self.chat_display.config(state=tk.DISABLED)
         self.chat_display.see(tk.END)
         
@@ -661,6 +838,7 @@ class OllamaChatbotBlue(tk.Tk):
             except:
                 pass
             self.save_settings()
+            self.build_message_styles()
             self.refresh_chat_display()
     
     def change_bot_avatar(self):
@@ -674,6 +852,7 @@ class OllamaChatbotBlue(tk.Tk):
             except:
                 pass
             self.save_settings()
+            self.build_message_styles()
             self.refresh_chat_display()
     
     def refresh_chat_display(self):
@@ -685,82 +864,321 @@ class OllamaChatbotBlue(tk.Tk):
     # Core chat logic
     # ======================================
     def refresh_chat_list(self):
-        for w in self.chat_list.winfo_children():
-            w.destroy()
-        for s in reversed(self.chat_sessions):
-            btn = tk.Button(
-                self.chat_list,
-                text=f"💬 {s.name[:25]}",
-                bg="#f3f4f6",
-                fg="#1f2937",
-                activebackground="#e5e7eb",
-                activeforeground="#1f2937",
-                relief=tk.FLAT,
-                anchor="w",
-                font=("Segoe UI", 10),
-                padx=10,
-                pady=8,
-                cursor="hand2",
-                command=lambda sid=s.id: self.load_chat(sid),
-            )
-            btn.pack(fill=tk.X, pady=3, padx=5)
-            
-            # Hover effect
-            btn.bind("<Enter>", lambda e, b=btn: b.config(bg="#e5e7eb"))
-            btn.bind("<Leave>", lambda e, b=btn: b.config(bg="#f3f4f6"))
+        """Show every chat in the sidebar, newest first"""
+        self.chat_list.set_entries(reversed(self.chat_sessions))
+
+    # ======================================
+    # Search
+    # ======================================
+    def on_search_changed(self, event=None):
+        """Search shortly after the user stops typing"""
+        if self.search_after_id:
+            self.after_cancel(self.search_after_id)
+        self.search_after_id = self.after(150, self.run_search)
+
+    def run_search(self):
+        self.search_after_id = None
+        text = self.search_var.get().strip()
+        if not text:
+            self.show_search_results(False)
+            return
+        hits = [SearchHit(hit) for hit in self.store.search(text)]
+        self.search_results.set_entries(hits)
+        self.show_search_results(True)
+        self.set_status(f"🔎 {len(hits)} result(s) for \"{text}\"")
+
+    def clear_search(self):
+        self.search_var.set("")
+        self.run_search()
+
+    def show_search_results(self, show):
+        if show == self.showing_search_results:
+            return
+        self.showing_search_results = show
+        if show:
+            self.chat_list.pack_forget()
+            self.search_results.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        else:
+            self.search_results.pack_forget()
+            self.chat_list.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+    def open_search_hit(self, message_id):
+        """Open the chat containing a search hit, scrolled to the message"""
+        index = self.search_results.model.index_of(message_id)
+        if index < 0:
+            return
+        hit = self.search_results.model.entries[index]
+        self.load_chat(hit.session_id, focus=hit.seq)
+
+    def highlight_message(self, i):
+        """Highlight rendered history message i and scroll it to the top"""
+        marks = self.message_marks()
+        if i not in marks:
+            return
+        self.chat_display.tag_remove("search_hit", "1.0", tk.END)
+        self.chat_display.tag_add("search_hit", marks[i], marks.get(i + 1, tk.END))
+        self.chat_display.yview(marks[i])
+
+    def show_chat_menu(self, sid, event):
+        menu = tk.Menu(self, tearoff=0)
+        menu.add_command(label="Rename", command=lambda: self.prompt_rename_chat(sid))
+        menu.add_command(label="Delete", command=lambda: self.delete_chat(sid))
+        menu.tk_popup(event.x_root, event.y_root)
+
+    def prompt_rename_chat(self, sid):
+        info = self.session_index.get(sid)
+        if info is None:
+            return
+        name = simpledialog.askstring("Rename Chat", "New name:", initialvalue=info.name, parent=self)
+        if name and name.strip():
+            self.rename_chat(sid, name.strip())
+
+    def rename_chat(self, sid, name):
+        info = self.session_index.get(sid)
+        if info is None:
+            return
+        self.store.rename_session(sid, name)
+        info.name = name
+        if sid in self.session_cache:
+            self.session_cache.get(sid).name = name
+        self.chat_list.refresh_entry(sid)
+
+    def delete_chat(self, sid):
+        info = self.session_index.pop(sid, None)
+        if info is None:
+            return
+        self.scheduler.cancel(sid)
+        self.client.forget(sid)
+        self.store.delete_session(sid)
+        self.chat_sessions.remove(info)
+        self.session_cache.discard(sid)
+        self.retriever.discard(sid)
+        self.chat_list.remove(sid)
+        if self.current_session and self.current_session.id == sid:
+            if self.chat_sessions:
+                self.load_chat(self.chat_sessions[-1].id)
+            else:
+                self.new_chat()
 
     def new_chat(self):
         s = ChatSession()
-        self.chat_sessions.append(s)
+        self.store.create_session(s)
+        self.add_session_info(SessionInfo(s.id, s.name, s.created_at, s.updated_at))
+        self.session_cache.put(s)
         self.current_session = s
-        self.refresh_chat_list()
+        self.generation = None
+        self.transcript.reset(0)
+        self.clear_message_marks()
+        self.chat_list.insert(self.session_index[s.id], 0)
         self.display_message("New chat started.", "assistant")
+        self.update_send_button()
+
+    def load_chat(self, sid, focus=None):
+        """Switch to a chat, optionally scrolled to message index focus"""
+        if sid not in self.session_index:
+            return
+        self.hide_thinking_indicator()
+        self.current_session = self.session_cache.get(sid)
+        # Answers still running for the previous chat finish in the
+        # background and show up when it is opened again. One running for
+        # this chat is not streamed in half-way: it shows as thinking and
+        # finish_generation renders it once it is complete.
+        self.generation = None
+        self.display_chat_history(focus=focus)
+        self.update_send_button()
+        if self.is_generating:
+            self.show_thinking_indicator()
+
+    def add_session_info(self, info):
+        self.chat_sessions.append(info)
+        self.session_index[info.id] = info
 
-    def load_chat(self, sid):
-        for s in self.chat_sessions:
-            if s.id == sid:
-                self.current_session = s
-                self.display_chat_history()
-                break
+    def open_session(self, sid):
+        """Build a ChatSession with its messages read from the store"""
+        info = self.session_index.get(sid)
+        if info is None:
+            return None
+        s = ChatSession(name=info.name, chat_id=info.id)
+        s.created_at, s.updated_at = info.created_at, info.updated_at
+        s.messages = self.store.load_messages(sid)
+        return s
 
-    def display_chat_history(self):
+    def record_message(self, session, message):
+        """Persist a message appended to session and update its sidebar entry"""
+        self.store.append_message(session.id, message)
+        session.updated_at = datetime.now()
+        info = self.session_index.get(session.id)
+        if info is not None:
+            info.message_count += 1
+            info.updated_at = session.updated_at
+
+    def display_chat_history(self, focus=None):
+        """Render the newest page of the current chat; older pages load on scroll.
+
+        With focus set, render the page around that message index instead
+        and highlight it.
+        """
+        messages = self.current_session.messages
+        if focus is None:
+            start, end = self.transcript.reset(len(messages))
+        else:
+            start, end = self.transcript.reset_around(len(messages), focus)
         self.chat_display.config(state=tk.NORMAL)
         self.chat_display.delete("1.0", tk.END)
-        for msg in self.current_session.messages:
-            self.display_message(msg["content"], msg["role"], add_to_history=False)
+        self.clear_message_marks()
+        self.render_history_messages(start, messages[start:end])
         self.chat_display.config(state=tk.DISABLED)
+        if focus is None:
+            self.chat_display.see(tk.END)
+        else:
+            self.highlight_message(focus)
+
+    # ======================================
+    # Windowed transcript
+    # ======================================
+    def render_history_messages(self, first, messages, prepend=False):
+        """Insert history messages first, first+1, ... in one Text insert call.
+
+        Messages go at the bottom (or the top when prepend is set) and each
+        gets a msg_<index> mark at its first line, computed from the newline
+        counts so the widget is not queried per message.
+        """
+        if not messages:
+            return
+        pieces = []
+        starts = []
+        line, column = (1, 0) if prepend else map(int, self.chat_display.index("end-1c").split("."))
+        for msg in messages:
+            header, content_tag = self.message_style(msg["role"])
+            content = f"{msg['content']}\n"
+            pieces += ["\n", (), header, "header", content, content_tag]
+            starts.append(f"{line}.{column}")
+            line += content.count("\n") + 2
+            column = 0
+        self.chat_display.insert("1.0" if prepend else tk.END, *pieces)
+        for i, start in enumerate(starts, first):
+            self.chat_display.mark_set(f"msg_{i}", start)
+
+    def message_marks(self):
+        """Return {history index: mark name} for the rendered messages"""
+        return {
+            int(name[4:]): name
+            for name in map(str, self.chat_display.mark_names())
+            if name.startswith("msg_")
+        }
+
+    def clear_message_marks(self, keep=lambda i: False):
+        for i, name in self.message_marks().items():
+            if not keep(i):
+                self.chat_display.mark_unset(name)
+
+    def show_transcript_tail(self):
+        """Jump back to the newest messages before a live message is appended.
+
+        Live messages count towards MAX_RENDERED; past it the oldest
+        rendered page is dropped from the top.
+        """
+        if not self.current_session:
+            return
+        if not self.transcript.at_tail:
+            self.display_chat_history()
+            return
+        trim_to = self.transcript.overflow(len(self.current_session.messages))
+        if trim_to is None:
+            return
+        marks = self.message_marks()
+        if trim_to in marks:
+            self.chat_display.config(state=tk.NORMAL)
+            self.chat_display.delete("1.0", marks[trim_to])
+            self.chat_display.config(state=tk.DISABLED)
+            self.clear_message_marks(keep=lambda i: i >= trim_to)
+            self.transcript.start = trim_to
+        elif self.generation is None:
+            # That message was appended live and carries no mark; render
+            # the newest page afresh while no answer streams into the display
+            self.display_chat_history()
+
+    def on_transcript_scroll(self, first, last):
+        """Load the neighbouring page when the transcript is scrolled to either end"""
+        if not self.current_session or self.transcript_loading or self.is_generating:
+            return
+        total = len(self.current_session.messages)
+        if float(first) <= 0.0 and self.transcript.has_older():
+            self.transcript_loading = True
+            self.after_idle(self.load_older_messages)
+        elif float(last) >= 1.0 and not self.transcript.at_tail and self.transcript.has_newer(total):
+            self.transcript_loading = True
+            self.after_idle(self.load_newer_messages)
+
+    def load_older_messages(self):
+        self.transcript_loading = False
+        messages = self.current_session.messages
+        self.transcript.sync_tail(len(messages))
+        page = self.transcript.older_page()
+        if not page:
+            return
+        first, last, trim_from = page
+
+        self.chat_display.config(state=tk.NORMAL)
+        self.chat_display.mark_set("transcript_view", "@0,0")
+        self.render_history_messages(first, messages[first:last], prepend=True)
+        if trim_from is not None:
+            marks = self.message_marks()
+            # Live messages appended since the last render carry no mark;
+            # cut at the nearest marked message and drop them as well
+            while trim_from > first and trim_from not in marks:
+                trim_from -= 1
+            self.chat_display.delete(marks[trim_from], tk.END)
+            self.transcript.end = trim_from
+            self.clear_message_marks(keep=lambda i: i < trim_from)
+        self.chat_display.config(state=tk.DISABLED)
+        self.chat_display.yview("transcript_view")
+
+    def load_newer_messages(self):
+        self.transcript_loading = False
+        messages = self.current_session.messages
+        page = self.transcript.newer_page(len(messages))
+        if not page:
+            return
+        first, last, trim_to = page
 
-    def display_message(self, msg, role, add_to_history=True):
-        """Display Claude-style left-aligned messages with custom round avatars"""
         self.chat_display.config(state=tk.NORMAL)
+        self.chat_display.mark_set("transcript_view", "@0,0")
+        self.render_history_messages(first, messages[first:last])
+        if trim_to is not None:
+            self.chat_display.delete("1.0", f"msg_{trim_to}")
+            self.clear_message_marks(keep=lambda i: i >= trim_to)
+        self.chat_display.config(state=tk.DISABLED)
+        self.chat_display.yview("transcript_view")
 
-        # Role-based visuals with custom avatars
+    def get_role_visuals(self, role):
+        """Return avatar, label, background and text color for a message role"""
         if role == "user":
-            avatar = self.user_avatar
-            label = "You"
-            bg_color = self.colors["chat_bg"]
-            text_color = self.colors["text"]
+            return self.user_avatar, "You", self.colors["chat_bg"], self.colors["text"]
         elif role == "assistant":
-            avatar = self.bot_avatar
-            label = "Assistant"
-            bg_color = self.colors["bubble_bot"]
-            text_color = self.colors["text"]
+            return self.bot_avatar, "Assistant", self.colors["bubble_bot"], self.colors["text"]
         else:
-            avatar = "ℹ️"
-            label = "System"
-            bg_color = "#f0f0f0"
-            text_color = self.colors["text_alt"]
+            return "ℹ️", "System", "#f0f0f0", self.colors["text_alt"]
 
-        # Add spacing between messages
-        self.chat_display.insert(tk.END, "\n")
-        
-        # Insert avatar and label on one line
-        self.chat_display.insert(tk.END, f"{avatar}  {label}\n", "header")
-        
-        # Insert message content with proper indentation (left-aligned)
-        self.chat_display.insert(tk.END, f"{msg}\n", f"content_{role}")
-        
-        # Configure header style (avatar + label)
+    def display_message(self, msg, role, add_to_history=True):
+        """Display Claude-style left-aligned messages with custom round avatars"""
+        self.show_transcript_tail()
+        self.chat_display.config(state=tk.NORMAL)
+
+        # Spacing, avatar + label header, then the left-aligned content
+        header, content_tag = self.message_style(role)
+        self.chat_display.insert(tk.END, "\n", (), header, "header", f"{msg}\n", content_tag)
+
+        self.chat_display.config(state=tk.DISABLED)
+        self.chat_display.see(tk.END)
+
+    def build_message_styles(self):
+        """Configure the message tags once and cache each role's header line.
+
+        Called when the chat display is created and again when an avatar
+        changes; rendering a message then only inserts text.
+        """
+        # Header style (avatar + label)
         self.chat_display.tag_configure(
             "header",
             font=("Segoe UI", 10, "bold"),
@@ -770,23 +1188,65 @@ class OllamaChatbotBlue(tk.Tk):
             spacing1=10,
             spacing3=5,
         )
-        
-        # Configure content style (message text) - all left-aligned
+
+        # Thinking indicator style
         self.chat_display.tag_configure(
-            f"content_{role}",
-            font=("Segoe UI", 11),
-            foreground=text_color,
-            background=bg_color,
-            lmargin1=55,  # Indent to align with text after avatar
+            "thinking",
+            font=("Segoe UI", 11, "italic"),
+            foreground=self.colors["thinking"],
+            lmargin1=55,
             lmargin2=55,
-            rmargin=20,
             spacing3=15,
-            wrap="word",
         )
 
+        # Content style (message text) per role - all left-aligned
+        self.message_styles = {}
+        for role in ("user", "assistant", "system"):
+            avatar, label, bg_color, text_color = self.get_role_visuals(role)
+            self.chat_display.tag_configure(
+                f"content_{role}",
+                font=("Segoe UI", 11),
+                foreground=text_color,
+                background=bg_color,
+                lmargin1=55,  # Indent to align with text after avatar
+                lmargin2=55,
+                rmargin=20,
+                spacing3=15,
+                wrap="word",
+            )
+            self.message_styles[role] = (f"{avatar}  {label}\n", f"content_{role}")
+
+        # Message opened from a search result
+        self.chat_display.tag_configure("search_hit", background="#fef3c7")
+        self.chat_display.tag_raise("search_hit")
+
+    def message_style(self, role):
+        """Return (header line, content tag) for a role; unknown roles render as system"""
+        return self.message_styles.get(role) or self.message_styles["system"]
+
+    def begin_streamed_message(self):
+        """Replace the thinking indicator with an assistant message that fills in as tokens arrive"""
+        self.hide_thinking_indicator()
+        self.show_transcript_tail()
+        self.chat_display.config(state=tk.NORMAL)
+
+        header, _ = self.message_style("assistant")
+        self.chat_display.insert(tk.END, "\n", (), header, "header")
+
         self.chat_display.config(state=tk.DISABLED)
         self.chat_display.see(tk.END)
 
+    def append_streamed_text(self, text):
+        """Append a streamed fragment to the open assistant message"""
+        self.chat_display.config(state=tk.NORMAL)
+        self.chat_display.insert(tk.END, text, "content_assistant")
+        self.chat_display.config(state=tk.DISABLED)
+        self.chat_display.see(tk.END)
+
+    def end_streamed_message(self, note=None):
+        """Close the streamed assistant message, optionally with a note such as STOPPED_NOTE"""
+        self.append_streamed_text(f"\n\n{note}\n" if note else "\n")
+
     def attach_file(self):
         # Cross-platform file dialog (works on macOS, Windows, Linux)
         f = filedialog.askopenfilename(
@@ -800,9 +1260,13 @@ class OllamaChatbotBlue(tk.Tk):
         )
         if f:
             with open(f, "r", errors="ignore") as fp:
-                content = fp.read()[:5000]
+                content = fp.read()
             self.attached_files.append({"name": os.path.basename(f), "content": content})
-            messagebox.showinfo("Attached", f"Attached file: {os.path.basename(f)}\n\n📄 Size: {len(content)} characters")
+            messagebox.showinfo(
+                "Attached",
+                f"Attached file: {os.path.basename(f)}\n\n📄 Size: {len(content)} characters\n"
+                "The file is indexed when you send your message.",
+            )
 
     def attach_image(self):
         # Cross-platform file dialog (works on macOS, Windows, Linux)
@@ -817,10 +1281,6 @@ class OllamaChatbotBlue(tk.Tk):
             ]
         )
         if f:
-            with open(f, "rb") as fp:
-                data = base64.b64encode(fp.read()).decode("utf-8")
-            self.attached_images.append({"name": os.path.basename(f), "data": data})
-            
             # Suggest llava model for image analysis
             if self.current_model.get() != "llava":
                 response = messagebox.askyesno(
@@ -829,107 +1289,308 @@ class OllamaChatbotBlue(tk.Tk):
                 )
                 if response:
                     self.current_model.set("llava")
-            
-            messagebox.showinfo("Attached", f"Attached image: {os.path.basename(f)}\n\n📷 Total: {len(self.attached_images)} image(s)")
+
+            # Resize and recompress for the selected model in the background
+            self.pending_images += 1
+            self.set_status(f"🖼️ Preparing {os.path.basename(f)}...")
+            self.image_preprocessor.submit(
+                f,
+                self.current_model.get(),
+                lambda future: self.ui_queue.post(self.add_prepared_image, future),
+            )
+
+    def add_prepared_image(self, future):
+        """Attach an image once the preprocessor has finished with it"""
+        self.pending_images -= 1
+        try:
+            prepared = future.result()
+        except Exception as e:
+            self.set_status("⚠️ Could not read image.")
+            messagebox.showerror("Error", f"Failed to read image: {e}")
+            return
+        self.attached_images.append({"name": prepared["name"], "data": prepared["data"]})
+        self.set_status(f"🖼️ {prepared['name']}: {savings_text(prepared)}")
+        messagebox.showinfo(
+            "Attached",
+            f"Attached image: {prepared['name']}\n\n"
+            f"📐 {prepared['width']}×{prepared['height']}, {savings_text(prepared)}\n"
+            f"📷 Total: {len(self.attached_images)} image(s)",
+        )
 
     def send_message(self, event=None):
         msg = self.input_box.get().strip()
-        if not msg and not self.attached_images:
+        if self.pending_images:
+            self.set_status("⏳ Still preparing image(s), try again in a moment.")
+            return
+        if self.current_session and self.scheduler.stopping(self.current_session.id):
+            self.set_status("⏹ Stopping the current answer, try again in a moment.")
+            return
+        if not msg and not self.attached_images and not self.attached_files:
             return
         self.input_box.delete(0, tk.END)
         
         # Build display message
-        display_msg = msg if msg else "Analyzing image..."
+        display_msg = msg if msg else ("Analyzing image..." if self.attached_images else "Reading file...")
         if self.attached_images:
             display_msg += f"\n📷 {len(self.attached_images)} image(s) attached"
-        
-        self.display_message(display_msg, "user")
+        if self.attached_files:
+            display_msg += f"\n📎 {len(self.attached_files)} file(s) attached"
         
         if not self.current_session:
             self.new_chat()
+        session = self.current_session
         
         # Create message with content and images
         user_msg = {"role": "user", "content": msg}
+        files, self.attached_files = self.attached_files, []
+        if files:
+            names = ", ".join(f["name"] for f in files)
+            user_msg["content"] = f"{msg}\n\n[Attached files: {names}]" if msg else f"[Attached files: {names}]"
         if self.attached_images:
-            user_msg["images"] = [img["data"] for img in self.attached_images]
-        
-        self.current_session.messages.append(user_msg)
+            # History keeps references; base64 is produced when a payload is built
+            user_msg["images"] = [self.attachments.put(img["data"]) for img in self.attached_images]
         
         # Clear attachments after adding to message
         self.attached_images = []
+
+        if self.scheduler.busy(session.id):
+            # Joins the history once the answers before it are complete, so
+            # the chat keeps question/answer order
+            self.scheduler.submit(session.id, self.run_turn, session, user_msg, display_msg, files, msg)
+            waiting = self.scheduler.queued(session.id)
+            self.set_status(f"⏳ Queued: {waiting} message(s) waiting for the current answer")
+            return
+
+        self.display_message(display_msg, "user")
+        session.messages.append(user_msg)
+        self.record_message(session, user_msg)
         
-        # Show thinking indicator
-        self.is_generating = True
+        # Show thinking indicator; the send button turns into a stop button
+        job = self.scheduler.submit(session.id, self.run_turn, session, None, display_msg, files, msg)
+        self.generation = job.cancel
+        self.update_send_button()
         self.show_thinking_indicator()
-        
-        threading.Thread(target=self.get_bot_response, daemon=True).start()
 
-    def get_bot_response(self):
+    def run_turn(self, session, user_msg, display_msg, files, question, cancel=None):
+        """Scheduler job: add a queued question to the chat, then answer it"""
+        if user_msg is not None:
+            if cancel.cancelled:
+                return
+            session.messages.append(user_msg)
+            self.record_message(session, user_msg)
+            self.ui_queue.post(self.start_queued_turn, session, display_msg, cancel, len(session.messages) - 1)
+        self.get_bot_response(files, question, cancel, session=session)
+
+    def start_queued_turn(self, session, display_msg, token, index):
+        """Show a queued question that has started, if its chat is open.
+
+        index is its place in the history; a chat rendered since then
+        already shows it.
+        """
+        if session is not self.current_session or token.cancelled:
+            return
+        self.hide_thinking_indicator()
+        if not (self.transcript.at_tail and self.transcript.end > index):
+            self.display_message(display_msg, "user")
+        self.generation = token
+        self.show_thinking_indicator()
+        self.show_connected_status()
+
+    def post_live(self, token, func, *args):
+        """Queue func(*args) for the UI thread if token's answer is still shown"""
+        self.ui_queue.post(self.run_if_live, token, func, *args)
+
+    def run_if_live(self, token, func, *args):
+        if self.generation is token:
+            func(*args)
+
+    def stop_generation(self):
+        """Abort the current chat's answer and drop its queued messages.
+
+        The text received so far is kept. The input stays locked until the
+        worker has returned and posted finish_generation, so nothing can be
+        sent while the stopped answer may still be recorded.
+        """
+        session = self.current_session
+        if not session or not self.scheduler.busy(session.id) or self.scheduler.stopping(session.id):
+            return
+        dropped = self.scheduler.cancel(session.id)
+        self.hide_thinking_indicator()
+        self.set_status("⏹ Stopping..." + (f" {len(dropped)} queued message(s) dropped." if dropped else ""))
+        self.update_send_button()
+
+    def finish_generation(self, token, session=None):
+        """Detach a finished or stopped answer from the chat display.
+
+        An answer that was not streamed to the display, because its chat was
+        left and opened again meanwhile, is shown by rendering the chat again.
+        """
+        shown = session is not None and session is self.current_session
+        if self.generation is token:
+            self.generation = None
+        elif shown:
+            self.hide_thinking_indicator()
+            self.display_chat_history()
+        else:
+            self.update_send_button()
+            return
+        if token.cancelled:
+            self.set_status("⏹ Stopped.")
+        self.update_send_button()
+        if shown and self.generation is None and self.is_generating:
+            self.show_thinking_indicator()   # more of the chat's questions are queued
+
+    def update_send_button(self):
+        """Show the stop button while the current chat has answers running or queued"""
+        session = self.current_session
+        self.is_generating = bool(session) and self.scheduler.busy(session.id)
+        if self.is_generating and self.scheduler.stopping(session.id):
+            self.send_btn.config(text="⏳", command=self.send_message, state=tk.DISABLED)
+        elif self.is_generating:
+            self.send_btn.config(text="⏹", command=self.stop_generation, state=tk.NORMAL)
+        else:
+            self.send_btn.config(text="⬆️", command=self.send_message, state=tk.NORMAL)
+
+    def update_queue_status(self, running, queued):
+        if running or queued:
+            self.queue_label.config(text=f"⏳ {running} generating · {queued} queued")
+        else:
+            self.queue_label.config(text="")
+        self.update_send_button()
+
+    def get_bot_response(self, files=(), question="", cancel=None, session=None):
+        session = session or self.current_session
+        cancel = cancel or CancelToken()
         try:
-            payload = {
-                "model": self.current_model.get(),
-                "messages": [{"role": "system", "content": self.system_prompt}] + self.current_session.messages,
-                "stream": False,
-                "options": {"temperature": self.temperature.get()},
-            }
-            
-            # Debug: Print payload info
-            print(f"\n🔍 DEBUG: Sending request to {self.ollama_url}")
-            print(f"📦 Model: {payload['model']}")
-            print(f"📝 Messages count: {len(payload['messages'])}")
-            for i, msg in enumerate(payload['messages']):
-                has_images = "images" in msg
-                img_count = len(msg.get("images", []))
-                print(f"  Message {i}: role={msg['role']}, has_images={has_images}, image_count={img_count}")
-            
-            r = requests.post(self.ollama_url, json=payload, timeout=120)
-            
-            print(f"✅ Response status: {r.status_code}")
-            
-            # Hide thinking indicator
-            self.is_generating = False
-            self.after(0, self.hide_thinking_indicator)
-            
-            if r.status_code == 200:
-                resp = r.json().get("message", {}).get("content", "No response.")
-                self.current_session.messages.append({"role": "assistant", "content": resp})
-                self.after(0, lambda: self.display_message(resp, "assistant"))
-            else:
-                error_msg = f"Error {r.status_code}: {r.text}"
-                print(f"❌ {error_msg}")
-                self.after(0, lambda: self.display_message(error_msg, "system"))
-        except Exception as e:
-            print(f"❌ Exception: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            self.is_generating = False
-            self.after(0, self.hide_thinking_indicator)
-            self.after(0, lambda: self.display_message(f"Error: {str(e)}", "system"))
+            result = self.engine.run_turn(
+                session.messages,
+                self.current_model.get(),
+                system_prompt=self.system_prompt,
+                temperature=self.temperature.get(),
+                question=question,
+                files=files,
+                key=session.id,
+                use_cache=self.cache_enabled,
+                cancel=cancel,
+                listener=self.turn_listener(cancel),
+                record=lambda message: self.record_message(session, message),
+            )
+            if result.outcome == CACHED:
+                self.post_live(cancel, self.set_status, "⚡ Answered from cache")
+            if self.cache_enabled:
+                self.ui_queue.post(self.update_cache_status)
+        finally:
+            self.ui_queue.post(self.finish_generation, cancel, session)
+
+    def turn_listener(self, cancel):
+        """Route the engine's progress for one answer to the chat display.
+
+        Everything but the status line is dropped once the answer's chat is
+        no longer shown. Fragments go through one sink object so adjacent
+        ones still merge in the UI queue.
+        """
+        post = functools.partial(self.post_live, cancel)
+        sink = functools.partial(self.run_if_live, cancel, self.append_streamed_text)
+        return TurnListener(
+            status=lambda text: self.ui_queue.post(self.set_status, text),
+            notice=lambda text: post(self.display_message, text, "system"),
+            begin=lambda: post(self.begin_streamed_message),
+            text=lambda piece: self.ui_queue.append_text(sink, piece),
+            end=lambda note: post(self.end_streamed_message, note),
+            message=lambda text, role: post(self.show_reply, text, role),
+        )
+
+    def show_reply(self, text, role):
+        """Replace the thinking indicator with a complete message"""
+        self.hide_thinking_indicator()
+        self.display_message(text, role)
 
     def check_ollama_connection(self):
         def check():
             try:
-                r = requests.get("http://localhost:11434/api/tags", timeout=2)
+                r = self.client.tags()
                 if r.status_code == 200:
-                    self.status_label.config(text=f"✅ Connected to Ollama | Model: {self.current_model.get()}")
+                    self.ui_queue.post(self.update_model_list, model_names(r))
+                    self.ui_queue.post(self.show_connected_status)
+                    self.ui_queue.post(self.warm_current_model)
                 else:
-                    self.status_label.config(text="⚠️ Error connecting to Ollama.")
+                    self.ui_queue.post(self.set_status, "⚠️ Error connecting to Ollama.")
             except Exception:
-                self.status_label.config(text="❌ Disconnected.")
+                self.ui_queue.post(self.set_status, "❌ Disconnected.")
         threading.Thread(target=check, daemon=True).start()
 
+    def update_model_list(self, models):
+        """Offer the models installed on the Ollama server in the model selector"""
+        if models:
+            self.model_selector.config(values=models)
+
+    def show_connected_status(self):
+        self.set_status(f"✅ Connected to Ollama | Model: {self.current_model.get()}")
+
+    def set_status(self, text):
+        self.status_label.config(text=text)
+
+    def warm_current_model(self):
+        """Load the selected model in the background"""
+        model = self.current_model.get()
+        if self.model_warmer.warm(model):
+            self.set_status(f"⏳ Loading {model}...")
+
+    def on_model_warmed(self, model, seconds, error):
+        if model != self.current_model.get():
+            return
+        if error:
+            self.set_status(f"⚠️ Could not load {model}: {error}")
+        else:
+            self.set_status(f"✅ Connected to Ollama | Model: {model} ready ({seconds:.1f} s)")
+
+    def on_keep_alive_changed(self, event=None):
+        self.client.keep_alive = KEEP_ALIVE_CHOICES.get(self.keep_alive_var.get(), DEFAULT_KEEP_ALIVE)
+        self.save_settings()
+        # Reload so the new keep_alive applies to the model in memory now
+        self.warm_current_model()
+
+    def toggle_response_cache(self):
+        self.cache_enabled = self.cache_var.get()
+        self.save_settings()
+        self.update_cache_status()
+
+    def update_cache_status(self):
+        self.cache_label.config(text=self.response_cache.stats_text() if self.cache_enabled else "")
+
     def load_sessions(self):
-        if os.path.exists(self.sessions_file):
-            try:
-                with open(self.sessions_file, "rb") as f:
-                    self.chat_sessions = pickle.load(f)
-                    if self.chat_sessions:
-                        self.current_session = self.chat_sessions[-1]
-            except Exception:
-                self.chat_sessions = []
-        if not self.chat_sessions:
+        try:
+            migrated = self.store.migrate_pickle(self.sessions_file)
+            if migrated:
+                print(f"Migrated {migrated} chat(s) from {self.sessions_file} to {self.sessions_db}")
+        except Exception as e:
+            print(f"Could not migrate {self.sessions_file}: {e}")
+        try:
+            moved = self.store.externalize_images(self.attachments.put)
+            if moved:
+                print(f"Moved {moved} inline image(s) to {self.attachments.root}/")
+        except Exception as e:
+            print(f"Could not move inline images: {e}")
+
+        self.chat_sessions, self.session_index = [], {}
+        for row in self.store.list_sessions():
+            self.add_session_info(SessionInfo(
+                row["id"], row["name"], row["created_at"], row["updated_at"], row["message_count"]
+            ))
+        self.refresh_chat_list()
+        if self.chat_sessions:
+            self.current_session = self.session_cache.get(self.chat_sessions[-1].id)
+        else:
             self.new_chat()
 
+    def destroy(self):
+        super().destroy()
+        self.scheduler.shutdown()
+        self.image_preprocessor.shutdown()
+        self.retriever.close()
+        self.response_cache.close()
+        self.store.close()
+
 
 if __name__ == "__main__":
     OllamaChatbotBlue().mainloop()
\ No newline at end of file
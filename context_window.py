@@ -0,0 +1,215 @@
+"""
+Context Window Manager
+Fits chat history into a model's token budget before it is sent to Ollama.
+"""
+
+import threading
+from collections import OrderedDict
+
+# Context sizes (num_ctx) used for each model family
+DEFAULT_NUM_CTX = 4096
+MODEL_NUM_CTX = {
+    "llama2": 4096,
+    "llava": 4096,
+    "mistral": 8192,
+    "codellama": 16384,
+    "llama3": 8192,
+    "phi": 2048,
+    "gemma": 8192,
+}
+
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4   # role name and chat template markers
+IMAGE_TOKENS = 576            # llava turns every image into 576 patch embeddings
+
+SLIDING_WINDOW = "sliding_window"
+PIN_FIRST = "pin_first"
+DROP_OLD_IMAGES = "drop_old_images"
+STRATEGIES = (SLIDING_WINDOW, PIN_FIRST, DROP_OLD_IMAGES)
+
+
+def estimate_text_tokens(text):
+    """Rough token count for a piece of text (about four characters per token)"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def estimate_tokens(message):
+    """Rough token count for one chat message, images included"""
+    return (
+        MESSAGE_OVERHEAD_TOKENS
+        + estimate_text_tokens(message.get("content", ""))
+        + IMAGE_TOKENS * len(message.get("images") or ())
+    )
+
+
+class HistoryTokens:
+    """Cached token estimates for one history list.
+
+    Chat histories only grow at the end, so estimates are computed once per
+    message and the running totals are updated incrementally.
+    """
+
+    def __init__(self, messages):
+        self.messages = messages
+        self.counts = []
+        self.total = 0
+        self.image_indexes = []
+        self.last_message = None
+
+    def sync(self):
+        """Estimate any messages appended since the last call"""
+        messages = self.messages
+        seen = len(self.counts)
+        if seen > len(messages) or (seen and messages[seen - 1] is not self.last_message):
+            # The list was edited rather than appended to; start over
+            self.counts, self.total, self.image_indexes = [], 0, []
+            seen = 0
+        for i in range(seen, len(messages)):
+            tokens = estimate_tokens(messages[i])
+            self.counts.append(tokens)
+            self.total += tokens
+            if messages[i].get("images"):
+                self.image_indexes.append(i)
+        if messages:
+            self.last_message = messages[-1]
+
+
+class ContextWindow:
+    """Choose which history messages to send so the prompt fits num_ctx.
+
+    Strategies:
+      sliding_window   keep the newest messages that fit
+      pin_first        always keep the first pinned_turns exchanges, then the newest
+      drop_old_images  strip images from the oldest messages first, then slide
+    """
+
+    def __init__(self, strategy=SLIDING_WINDOW, pinned_turns=1, reserve_tokens=512,
+                 num_ctx_overrides=None, max_cached_histories=64):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown context strategy: {strategy}")
+        self.strategy = strategy
+        self.pinned_turns = pinned_turns
+        self.reserve_tokens = reserve_tokens
+        self.model_num_ctx = dict(MODEL_NUM_CTX)
+        if num_ctx_overrides:
+            self.model_num_ctx.update(num_ctx_overrides)
+        self.max_cached_histories = max_cached_histories
+        self.histories = OrderedDict()
+        self.lock = threading.Lock()
+
+    def num_ctx(self, model):
+        """Return the context size used for a model name such as 'llama3:8b'"""
+        return self.model_num_ctx.get(model.split(":")[0], DEFAULT_NUM_CTX)
+
+    def budget(self, model, system_prompt=""):
+        """Tokens available for history once the system prompt and reply are reserved"""
+        system_tokens = estimate_tokens({"content": system_prompt}) if system_prompt else 0
+        return max(0, self.num_ctx(model) - self.reserve_tokens - system_tokens)
+
+    def tokens_for(self, messages):
+        """Return the synced HistoryTokens cache for a history list"""
+        key = id(messages)
+        with self.lock:
+            history = self.histories.get(key)
+            if history is None or history.messages is not messages:
+                history = HistoryTokens(messages)
+                self.histories[key] = history
+                if len(self.histories) > self.max_cached_histories:
+                    self.histories.popitem(last=False)
+            else:
+                self.histories.move_to_end(key)
+            history.sync()
+        return history
+
+    def invalidate(self, messages):
+        """Forget cached estimates after a history was edited in place or closed.
+
+        The cache holds the history list itself, so a chat unloaded from
+        memory must be invalidated for its messages to be freed.
+        """
+        with self.lock:
+            history = self.histories.get(id(messages))
+            if history is not None and history.messages is messages:
+                del self.histories[id(messages)]
+
+    def fit(self, messages, model, system_prompt=""):
+        """Return the list of messages to send for this history"""
+        if not messages:
+            return []
+        history = self.tokens_for(messages)
+        budget = self.budget(model, system_prompt)
+
+        if history.total <= budget:
+            return list(messages)
+        if self.strategy == PIN_FIRST:
+            return self.fit_pinned(history, budget)
+        if self.strategy == DROP_OLD_IMAGES:
+            return self.fit_without_old_images(history, budget)
+        start = self.window_start(history.counts, len(messages), 0, budget)
+        return messages[start:]
+
+    def build_messages(self, system_prompt, messages, model):
+        """Return the system prompt followed by the history that fits"""
+        return [{"role": "system", "content": system_prompt}] + self.fit(messages, model, system_prompt)
+
+    def window_start(self, counts, end, floor, budget):
+        """Walk back from end and return the first index of the newest run that fits.
+
+        The newest message is always kept, even if it alone exceeds the budget.
+        """
+        start = end - 1
+        used = counts[start]
+        while start > floor and used + counts[start - 1] <= budget:
+            start -= 1
+            used += counts[start]
+        return start
+
+    def pinned_end(self, messages):
+        """Return the index just past the first pinned_turns user/assistant exchanges"""
+        turns = 0
+        for i, message in enumerate(messages):
+            if message.get("role") == "user":
+                if turns == self.pinned_turns:
+                    return i
+                turns += 1
+        return len(messages)
+
+    def fit_pinned(self, history, budget):
+        messages, counts = history.messages, history.counts
+        pinned = self.pinned_end(messages)
+        if pinned >= len(messages) - 1:
+            start = self.window_start(counts, len(messages), 0, budget)
+            return messages[start:]
+        pinned_tokens = sum(counts[:pinned])
+        if pinned_tokens + counts[-1] > budget:
+            # Pinned turns no longer fit next to the new message; fall back to sliding
+            start = self.window_start(counts, len(messages), 0, budget)
+            return messages[start:]
+        start = self.window_start(counts, len(messages), pinned, budget - pinned_tokens)
+        return messages[:pinned] + messages[start:]
+
+    def fit_without_old_images(self, history, budget):
+        messages, counts = history.messages, history.counts
+        last = len(messages) - 1
+        total = history.total
+        stripped = set()
+        for i in history.image_indexes:
+            if total <= budget or i == last:
+                break
+            saved = IMAGE_TOKENS * len(messages[i]["images"])
+            total -= saved
+            stripped.add(i)
+
+        if stripped:
+            counts = list(counts)
+            for i in stripped:
+                counts[i] -= IMAGE_TOKENS * len(messages[i]["images"])
+        start = 0 if total <= budget else self.window_start(counts, len(messages), 0, budget)
+
+        selected = []
+        for i in range(start, len(messages)):
+            message = messages[i]
+            if i in stripped:
+                message = {k: v for k, v in message.items() if k != "images"}
+            selected.append(message)
+        return selected
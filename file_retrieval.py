@@ -0,0 +1,134 @@
+"""
+File Retrieval
+Splits attached files into overlapping chunks, embeds them with an Ollama
+embedding model and picks the chunks most relevant to each question, so
+large files can be attached without sending them whole.
+"""
+
+import os
+import threading
+
+from vector_index import VectorIndex
+
+EMBED_MODEL = "nomic-embed-text"
+CHUNK_CHARS = 1500      # characters per chunk
+CHUNK_OVERLAP = 200     # characters repeated at the start of the next chunk
+TOP_K = 4               # chunks added to the prompt per question
+EMBED_BATCH = 16        # chunks sent per /api/embed request
+
+
+def split_text(text, size=CHUNK_CHARS, overlap=CHUNK_OVERLAP):
+    """Split text into chunks of at most size characters overlapping by about overlap.
+
+    Cuts are moved back to a paragraph break, line break or space when one
+    exists in the last quarter of the chunk, so words are rarely split.
+    """
+    text = text.strip()
+    size = max(1, size)
+    overlap = max(0, min(overlap, size // 2))
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(len(text), start + size)
+        if end < len(text):
+            floor = start + size * 3 // 4
+            for sep in ("\n\n", "\n", " "):
+                cut = text.rfind(sep, floor, end)
+                if cut >= 0:
+                    end = cut + len(sep)
+                    break
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        if end >= len(text):
+            break
+        start = max(end - overlap, start + 1)
+    return chunks
+
+
+def with_context(system_prompt, chunks):
+    """Return the system prompt with retrieved file excerpts appended"""
+    if not chunks:
+        return system_prompt
+    parts = [system_prompt, "Excerpts from the files the user attached, use them when relevant:"]
+    for chunk in chunks:
+        parts.append(f"--- {chunk['name']} ---\n{chunk['text']}")
+    return "\n\n".join(parts)
+
+
+class FileRetriever:
+    """Per-chat vector indexes of chunks from attached files.
+
+    add_file and retrieve call the embedding endpoint and block, so they
+    belong on a worker thread. key identifies the chat the files belong to.
+    With a root directory each chat's index is saved under root/<key> and
+    reopened on first use, so files stay attached across restarts.
+    """
+
+    def __init__(self, client, root=None, model=EMBED_MODEL, chunk_size=CHUNK_CHARS,
+                 overlap=CHUNK_OVERLAP, top_k=TOP_K, batch_size=EMBED_BATCH):
+        self.client = client
+        self.root = root
+        self.model = model
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self.top_k = top_k
+        self.batch_size = max(1, batch_size)
+        self.indexes = {}
+        self.lock = threading.Lock()
+
+    def add_file(self, key, name, text):
+        """Chunk and embed one file; returns the number of chunks indexed"""
+        texts = split_text(text, self.chunk_size, self.overlap)
+        vectors = []
+        for i in range(0, len(texts), self.batch_size):
+            vectors.extend(self.client.embed(self.model, texts[i:i + self.batch_size]))
+        if texts:
+            with self.lock:
+                self.index_for(key, create=True).add(vectors, [{"name": name, "text": t} for t in texts])
+        return len(texts)
+
+    def index_for(self, key, create=False):
+        """Return the open index for a chat, opening a saved one; callers hold the lock"""
+        index = self.indexes.get(key)
+        if index is None:
+            path = os.path.join(self.root, key) if self.root else None
+            if not create and not (path and os.path.isdir(path)):
+                return None
+            index = self.indexes[key] = VectorIndex(path)
+        return index
+
+    def has_files(self, key):
+        with self.lock:
+            index = self.index_for(key)
+            return bool(index is not None and len(index))
+
+    def retrieve(self, key, query, k=None):
+        """Return up to k chunks for a question, most relevant first"""
+        k = k or self.top_k
+        with self.lock:
+            index = self.index_for(key)
+            if index is None or not len(index):
+                return []
+            # Everything fits, or there is nothing to rank by: no query embedding needed
+            if len(index) <= k or not query.strip():
+                return index.live_payloads(k)
+        vector = self.client.embed(self.model, [query])[0]
+        with self.lock:
+            return [payload for _, _, payload in index.search(vector, k)]
+
+    def discard(self, key):
+        """Forget the files attached to a chat, deleting its saved index"""
+        with self.lock:
+            index = self.indexes.pop(key, None)
+            if index is None and self.root:
+                index = self.index_for(key)
+                self.indexes.pop(key, None)
+            if index is not None:
+                index.destroy()
+
+    def close(self):
+        with self.lock:
+            for index in self.indexes.values():
+                index.close()
+            self.indexes.clear()
@@ -0,0 +1,182 @@
+"""
+Generation Queue
+Schedules chat generations so each chat runs one at a time, in order, while
+different chats share a bounded number of concurrent requests.
+"""
+
+import os
+import threading
+import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from ollama_client import CancelToken
+
+
+def ollama_num_parallel(default=1):
+    """Concurrent requests the Ollama server is configured to serve (OLLAMA_NUM_PARALLEL)"""
+    try:
+        return max(1, int(os.environ.get("OLLAMA_NUM_PARALLEL", default)))
+    except ValueError:
+        return default
+
+
+class GenerationJob:
+    """One queued generation: func(*args, cancel=token) for a chat"""
+
+    def __init__(self, key, func, args):
+        self.key = key
+        self.func = func
+        self.args = args
+        self.cancel = CancelToken()
+        self.preempted = False
+
+
+class GenerationScheduler:
+    """Per-chat FIFO queues served by a bounded worker pool.
+
+    A chat never has more than one job running, so its history is always
+    extended in the order messages were sent; follow-ups wait in the chat's
+    queue. Up to max_concurrent chats run at once, which should match the
+    server's OLLAMA_NUM_PARALLEL: more only queues inside Ollama, fewer
+    leaves slots idle. Chats get a turn in the order their work arrived.
+
+    on_change(running, queued) is called from whichever thread changed the
+    queues, so UI code should hand it to the UI queue.
+
+    Background jobs (submit_background) only start when no chat job is
+    waiting, and a running one is cancelled and queued again as soon as a
+    chat job has to wait for its slot.
+    """
+
+    def __init__(self, max_concurrent=None, on_change=None):
+        self.max_concurrent = max_concurrent or ollama_num_parallel()
+        self.on_change = on_change
+        self.queues = {}        # key -> deque of jobs not started yet
+        self.running = {}       # key -> job in flight
+        self.ready = deque()    # keys with queued jobs and nothing running, oldest first
+        self.background = deque()       # low-priority jobs not started yet
+        self.background_running = []    # low-priority jobs in flight
+        self.closed = False
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix="generation")
+
+    def submit(self, key, func, *args):
+        """Queue func(*args, cancel=token) behind the chat's earlier jobs; returns the job"""
+        job = GenerationJob(key, func, args)
+        with self.lock:
+            self.queues.setdefault(key, deque()).append(job)
+            if key not in self.running and key not in self.ready:
+                self.ready.append(key)
+            self.dispatch()
+            # A chat waiting for a slot takes it from background work
+            preempted = [j for j in self.background_running if not j.preempted] if self.ready else []
+            for background_job in preempted:
+                background_job.preempted = True
+        for background_job in preempted:
+            background_job.cancel.cancel()
+        self.notify()
+        return job
+
+    def submit_background(self, func, *args):
+        """Queue func(*args, cancel=token) to run when no chat job is waiting; returns the job.
+
+        func may be cancelled and run again later, so it should stop soon
+        after its token is cancelled and leave no partial result behind.
+        """
+        job = GenerationJob(None, func, args)
+        with self.lock:
+            self.background.append(job)
+            self.dispatch()
+        return job
+
+    def in_flight(self):
+        return len(self.running) + len(self.background_running)
+
+    def dispatch(self):
+        """Start queued jobs while there is capacity, chats first; callers hold the lock"""
+        while self.ready and self.in_flight() < self.max_concurrent:
+            key = self.ready.popleft()
+            job = self.queues[key].popleft()
+            if not self.queues[key]:
+                del self.queues[key]
+            self.running[key] = job
+            self.executor.submit(self.run, job)
+        while self.background and not self.ready and self.in_flight() < self.max_concurrent:
+            job = self.background.popleft()
+            self.background_running.append(job)
+            self.executor.submit(self.run, job)
+
+    def run(self, job):
+        try:
+            job.func(*job.args, cancel=job.cancel)
+        except Exception:
+            traceback.print_exc()
+        finally:
+            with self.lock:
+                if job.key is None:
+                    self.background_running.remove(job)
+                    if job.preempted and not self.closed:
+                        # Run it again with a fresh token once chats leave room
+                        job.preempted = False
+                        job.cancel = CancelToken()
+                        self.background.appendleft(job)
+                else:
+                    del self.running[job.key]
+                    if job.key in self.queues:
+                        self.ready.append(job.key)
+                self.dispatch()
+            self.notify()
+
+    def notify(self):
+        if self.on_change:
+            running, queued = self.counts()
+            self.on_change(running, queued)
+
+    def counts(self):
+        """Return (running, queued) job counts over all chats"""
+        with self.lock:
+            return len(self.running), sum(len(q) for q in self.queues.values())
+
+    def busy(self, key):
+        """True while the chat has a job running or waiting"""
+        with self.lock:
+            return key in self.running or key in self.queues
+
+    def stopping(self, key):
+        """True while the chat's running job has been cancelled but not returned yet"""
+        with self.lock:
+            job = self.running.get(key)
+            return job is not None and job.cancel.cancelled
+
+    def queued(self, key):
+        """Number of jobs waiting behind the chat's running one"""
+        with self.lock:
+            return len(self.queues.get(key, ()))
+
+    def cancel(self, key):
+        """Stop the chat's running job and drop its queued ones; returns the dropped jobs"""
+        with self.lock:
+            dropped = list(self.queues.pop(key, ()))
+            if key in self.ready:
+                self.ready.remove(key)
+            job = self.running.get(key)
+        if job is not None:
+            job.cancel.cancel()
+        for queued_job in dropped:
+            queued_job.cancel.cancel()
+        self.notify()
+        return dropped
+
+    def shutdown(self):
+        """Cancel everything and stop the workers without waiting"""
+        with self.lock:
+            self.closed = True
+            keys = set(self.running) | set(self.queues)
+            background = list(self.background) + self.background_running
+            self.background.clear()
+        for key in keys:
+            self.cancel(key)
+        for job in background:
+            job.cancel.cancel()
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,333 @@
+"""
+Ollama Host Pool
+Spreads requests over several Ollama servers: least outstanding requests,
+sticky per chat, with unreachable servers taken out of rotation until they
+answer again.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import requests
+
+from ollama_client import OllamaClient, OllamaError, DEFAULT_KEEP_ALIVE, resolve_base_url, model_names
+
+MAX_FAILURES = 2          # consecutive connection failures before a host is ejected
+RETRY_INTERVAL = 5        # seconds before an ejected host is probed again
+MAX_RETRY_INTERVAL = 60   # probe backoff doubles up to this
+MAX_AFFINITIES = 10000    # chats remembered for stickiness, least recent dropped first
+
+
+def configured_hosts(hosts=None):
+    """Base URLs to use: hosts, else OLLAMA_HOSTS (comma separated), else OLLAMA_HOST"""
+    if isinstance(hosts, str):
+        hosts = hosts.split(",")
+    if not hosts:
+        hosts = os.environ.get("OLLAMA_HOSTS", "").split(",")
+    urls = []
+    for host in hosts:
+        host = host.strip()
+        if host and resolve_base_url(host) not in urls:
+            urls.append(resolve_base_url(host))
+    return urls or [resolve_base_url()]
+
+
+class HostNode:
+    """One server in the pool and its load and health bookkeeping"""
+
+    def __init__(self, client):
+        self.client = client
+        self.outstanding = 0
+        self.failures = 0
+        self.healthy = True
+        self.retry_at = 0.0
+        self.retry_interval = RETRY_INTERVAL
+        self.probing = False
+        self.requests = 0
+
+    @property
+    def base_url(self):
+        return self.client.base_url
+
+
+class OllamaHostPool:
+    """OllamaClient-compatible front for several Ollama servers.
+
+    Each request goes to the healthy host with the fewest requests in
+    flight. Requests made for a chat (affinity) stick to the host that
+    served it before, so the model there still holds the chat's prompt in
+    its KV cache; a chat only moves when its host is ejected.
+
+    A host is ejected after MAX_FAILURES connection failures in a row and
+    probed with /api/tags in the background, with doubling backoff, until
+    it answers and is re-admitted. When every host is ejected requests are
+    still tried on the least loaded one rather than failing outright.
+
+    Streamed answers should be read inside request() so they count as
+    outstanding until the last chunk; the OllamaClient methods on the pool
+    only hold a host until the response headers arrive.
+    """
+
+    def __init__(self, hosts=None, timeouts=None, pool_size=4, keep_alive=DEFAULT_KEEP_ALIVE,
+                 max_failures=MAX_FAILURES, retry_interval=RETRY_INTERVAL):
+        self.nodes = [
+            HostNode(OllamaClient(url, timeouts=timeouts, pool_size=pool_size, keep_alive=keep_alive))
+            for url in configured_hosts(hosts)
+        ]
+        self.max_failures = max_failures
+        self.retry_interval = retry_interval
+        self.affinity = OrderedDict()   # chat id -> node
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.nodes)
+
+    # ======================================
+    # Host selection
+    # ======================================
+    def pick(self, affinity=None, exclude=()):
+        """Choose the host for a request; call with the lock held"""
+        now = time.monotonic()
+        for node in self.nodes:
+            if not node.healthy and not node.probing and now >= node.retry_at:
+                node.probing = True
+                threading.Thread(target=self.probe, args=(node,), daemon=True).start()
+
+        candidates = [n for n in self.nodes if n.healthy and n not in exclude]
+        if not candidates:
+            candidates = [n for n in self.nodes if n not in exclude] or self.nodes
+        node = self.affinity.get(affinity) if affinity is not None else None
+        if node is None or node not in candidates:
+            node = min(candidates, key=lambda n: (n.outstanding, n.requests))
+        if affinity is not None:
+            self.affinity[affinity] = node
+            self.affinity.move_to_end(affinity)
+            while len(self.affinity) > MAX_AFFINITIES:
+                self.affinity.popitem(last=False)
+        return node
+
+    def acquire(self, affinity=None, exclude=()):
+        """Choose a host and count a request in flight on it; pair with release()"""
+        with self.lock:
+            node = self.pick(affinity, exclude)
+            node.outstanding += 1
+            node.requests += 1
+        return node
+
+    def release(self, node, reachable=True):
+        with self.lock:
+            node.outstanding -= 1
+        if reachable:
+            self.record_success(node)
+        else:
+            self.record_failure(node)
+
+    @contextmanager
+    def lease(self, affinity=None):
+        """Yield the OllamaClient of the chosen host, counted as busy until the block ends"""
+        node = self.acquire(affinity)
+        reachable = True
+        try:
+            yield node.client
+        except requests.ConnectionError:
+            reachable = False
+            raise
+        finally:
+            self.release(node, reachable)
+
+    def send(self, method, args, kwargs, affinity):
+        """Start a request on the best host, moving on to the next one while hosts cannot be reached.
+
+        Returns (node, result) with the node still acquired.
+        """
+        tried = []
+        while True:
+            node = self.acquire(affinity, exclude=tried)
+            try:
+                return node, getattr(node.client, method)(*args, **kwargs)
+            except requests.ConnectionError:
+                cancel = kwargs.get("cancel")
+                if cancel is not None and cancel.cancelled:
+                    self.release(node)   # stopped by the user, not a dead host
+                    raise
+                self.release(node, reachable=False)
+                tried.append(node)
+                if len(tried) >= len(self.nodes):
+                    raise
+            except BaseException:
+                self.release(node)
+                raise
+
+    def call(self, method, *args, affinity=None, **kwargs):
+        """Run an OllamaClient method on the best host, failing over if it cannot be reached"""
+        node, result = self.send(method, args, kwargs, affinity)
+        self.release(node)
+        return result
+
+    @contextmanager
+    def request(self, method, *args, affinity=None, **kwargs):
+        """Like call(), but the host stays busy until the block ends.
+
+        Use it for streamed answers, so the whole read counts as outstanding:
+            with pool.request("chat", payload, stream=True, affinity=chat_id) as response:
+                ...
+        """
+        node, response = self.send(method, args, kwargs, affinity)
+        reachable = True
+        try:
+            yield response
+        except requests.ConnectionError:
+            reachable = False
+            raise
+        finally:
+            self.release(node, reachable)
+
+    def forget(self, affinity):
+        """Drop a chat's host binding, e.g. when the chat is deleted"""
+        with self.lock:
+            self.affinity.pop(affinity, None)
+
+    # ======================================
+    # Health
+    # ======================================
+    def record_failure(self, node):
+        with self.lock:
+            node.failures += 1
+            if node.healthy and node.failures >= self.max_failures:
+                node.healthy = False
+                node.retry_interval = self.retry_interval
+                node.retry_at = time.monotonic() + node.retry_interval
+                print(f"⚠️ Ollama host {node.base_url} ejected after {node.failures} failures")
+
+    def record_success(self, node):
+        with self.lock:
+            node.failures = 0
+            if not node.healthy:
+                node.healthy = True
+                print(f"✅ Ollama host {node.base_url} re-admitted")
+
+    def probe(self, node):
+        """Health-check an ejected host; re-admit it or back off"""
+        available = node.client.is_available()
+        with self.lock:
+            node.probing = False
+            if not available:
+                node.retry_interval = min(node.retry_interval * 2, MAX_RETRY_INTERVAL)
+                node.retry_at = time.monotonic() + node.retry_interval
+                return
+        self.record_success(node)
+
+    def check_health(self):
+        """Probe every host now; returns {base_url: healthy}"""
+        for node in self.nodes:
+            if node.client.is_available():
+                self.record_success(node)
+            else:
+                # Unreachable now: eject at once instead of after more failures
+                with self.lock:
+                    node.failures = max(node.failures, self.max_failures - 1)
+                self.record_failure(node)
+        return {node.base_url: node.healthy for node in self.nodes}
+
+    def healthy_count(self):
+        with self.lock:
+            return sum(node.healthy for node in self.nodes)
+
+    # ======================================
+    # OllamaClient interface
+    # ======================================
+    @property
+    def keep_alive(self):
+        return self.nodes[0].client.keep_alive
+
+    @keep_alive.setter
+    def keep_alive(self, value):
+        for node in self.nodes:
+            node.client.keep_alive = value
+
+    @property
+    def base_url(self):
+        return self.nodes[0].base_url
+
+    @property
+    def chat_url(self):
+        return self.nodes[0].client.chat_url
+
+    def chat(self, payload, stream=False, affinity=None, cancel=None):
+        """Send a /api/chat request; a streamed answer should be read inside request() instead"""
+        return self.call("chat", payload, stream=stream, affinity=affinity, cancel=cancel)
+
+    def generate(self, payload, stream=False, affinity=None, cancel=None):
+        return self.call("generate", payload, stream=stream, affinity=affinity, cancel=cancel)
+
+    def embed(self, model, texts):
+        return self.call("embed", model, texts)
+
+    def load_model(self, model, options=None):
+        """Load a model on every healthy host; returns the longest load time in seconds.
+
+        Chats can land on any host, so each one should have the model ready.
+        A host that fails is logged and skipped; OllamaError is raised only
+        when no host loaded the model, naming each host and its error.
+        """
+        with self.lock:
+            nodes = [n for n in self.nodes if n.healthy] or list(self.nodes)
+        durations = []
+        failed = []
+        for node in nodes:
+            try:
+                durations.append(node.client.load_model(model, options))
+                self.record_success(node)
+            except (OllamaError, requests.RequestException) as e:
+                if isinstance(e, requests.ConnectionError):
+                    self.record_failure(node)
+                print(f"⚠️ Could not load {model} on {node.base_url}: {e}")
+                failed.append(f"{node.base_url}: {e}")
+        if not durations:
+            raise OllamaError(f"Could not load {model} on any host ({'; '.join(failed)})")
+        return max(durations)
+
+    def tags(self):
+        return self.call("tags")
+
+    def is_available(self):
+        """Return True if any host answers /api/tags"""
+        try:
+            return self.tags().status_code == 200
+        except requests.RequestException:
+            return False
+
+    def list_models(self):
+        """Return the models installed on the hosts, in first-seen order"""
+        names = []
+        for node in self.nodes:
+            try:
+                response = node.client.tags()
+            except requests.RequestException:
+                continue
+            for name in model_names(response):
+                if name not in names:
+                    names.append(name)
+        return names
+
+    def pool_stats(self):
+        """Return counters summed over hosts, plus per-host load and health"""
+        stats = {"requests": 0, "connections_opened": 0, "pooled_requests": 0, "hosts": []}
+        for node in self.nodes:
+            node_stats = node.client.pool_stats()
+            for key in ("requests", "connections_opened", "pooled_requests"):
+                stats[key] += node_stats[key]
+            stats["hosts"].append({
+                "url": node.base_url,
+                "healthy": node.healthy,
+                "outstanding": node.outstanding,
+                "requests": node.requests,
+            })
+        return stats
+
+    def close(self):
+        for node in self.nodes:
+            node.client.close()
@@ -0,0 +1,184 @@
+"""
+Image Memory
+Keeps images only in the most recent turns of a request payload and
+stands in a short, cached model-written description for older ones.
+"""
+
+import hashlib
+import threading
+
+KEEP_IMAGE_TURNS = 2
+DESCRIBE_MODEL = "llava"
+# Model families that can see images; other models are never asked for descriptions
+VISION_MODELS = ("llava", "bakllava", "llava-llama3", "llava-phi3", "moondream", "minicpm-v", "llama3.2-vision")
+DESCRIBE_PROMPT = (
+    "Describe this image in two or three sentences. Mention any text, "
+    "numbers or objects someone might ask about later."
+)
+
+
+def is_vision_model(model):
+    """Whether a model name such as 'llava:13b' belongs to a vision model family"""
+    return model.split(":")[0] in VISION_MODELS
+
+
+def image_key(image):
+    """Cache key for an image: its blob reference, or a hash of inline base64"""
+    if image.startswith("sha256:"):
+        return image
+    return "sha256-inline:" + hashlib.sha256(image.encode("utf-8")).hexdigest()
+
+
+class ImagePolicy:
+    """Drop images from all but the last keep_turns user messages.
+
+    describe(image) returns a cached description or None; dropped images are
+    replaced by that text in the message content so the model still knows
+    what was shown.
+    """
+
+    def __init__(self, keep_turns=KEEP_IMAGE_TURNS, describe=None):
+        self.keep_turns = max(0, keep_turns)
+        self.describe = describe or (lambda image: None)
+
+    def cutoff(self, messages):
+        """Index of the oldest user message whose images are kept"""
+        if not self.keep_turns:
+            return len(messages)
+        seen = 0
+        for i in range(len(messages) - 1, -1, -1):
+            if messages[i].get("role") == "user":
+                seen += 1
+                if seen == self.keep_turns:
+                    return i
+        return 0
+
+    def apply(self, messages):
+        """Return messages with old images replaced by descriptions; never mutates the input"""
+        cutoff = self.cutoff(messages)
+        payload = []
+        for i, message in enumerate(messages):
+            images = message.get("images")
+            if i < cutoff and images:
+                notes = []
+                for image in images:
+                    description = self.describe(image)
+                    notes.append(f"[Earlier image: {description}]" if description else "[Earlier image omitted]")
+                content = message.get("content", "")
+                message = {k: v for k, v in message.items() if k != "images"}
+                message["content"] = "\n\n".join([content] + notes) if content else "\n\n".join(notes)
+            payload.append(message)
+        return payload
+
+
+class ImageDescriber:
+    """Asks a vision model once per image for a description and caches it.
+
+    resolve(image) turns a stored image (reference or inline base64) into
+    base64 for the request. When store is given (a SessionStore) the
+    descriptions are persisted in its meta table and survive restarts.
+    Images are described by the vision model that answered the turn, or by
+    model when a text-only model answered; an image whose description
+    failed is not requested again until restart.
+
+    describe_later() runs the requests as background jobs of scheduler (a
+    GenerationScheduler), so they never hold up a chat's answer; without a
+    scheduler images are only described through describe().
+    """
+
+    def __init__(self, client, resolve=None, store=None, prompt=DESCRIBE_PROMPT, model=DESCRIBE_MODEL,
+                 keep_turns=KEEP_IMAGE_TURNS, scheduler=None):
+        self.client = client
+        self.resolve = resolve or (lambda image: image)
+        self.store = store
+        self.prompt = prompt
+        self.model = model
+        self.keep_turns = max(1, keep_turns)
+        self.scheduler = scheduler
+        self.descriptions = {}
+        self.pending = set()
+        self.failed = set()
+        self.lock = threading.Lock()
+
+    def get(self, image):
+        key = image_key(image)
+        with self.lock:
+            if key in self.descriptions:
+                return self.descriptions[key]
+        description = self.store.get_meta(f"image_description:{key}") if self.store else None
+        if description:
+            with self.lock:
+                self.descriptions[key] = description
+        return description
+
+    def describe(self, image, model, cancel=None):
+        """Describe one image now (blocking) and cache the result"""
+        response = self.client.generate({
+            "model": model,
+            "prompt": self.prompt,
+            "images": [self.resolve(image)],
+            "stream": False,
+            "options": {"temperature": 0},
+        }, cancel=cancel)
+        response.raise_for_status()
+        description = " ".join(response.json().get("response", "").split())
+        if description:
+            key = image_key(image)
+            with self.lock:
+                self.descriptions[key] = description
+            if self.store:
+                self.store.set_meta(f"image_description:{key}", description)
+        return description
+
+    def leaving(self, messages):
+        """The user message whose images are dropped from the next payload, or None.
+
+        That is the oldest of the last keep_turns user messages; the scan
+        stops there instead of walking the whole history.
+        """
+        seen = 0
+        for i in range(len(messages) - 1, -1, -1):
+            if messages[i].get("role") == "user":
+                seen += 1
+                if seen == self.keep_turns:
+                    return messages[i]
+        return None
+
+    def describe_later(self, messages, model):
+        """Queue descriptions for the images about to be dropped from payloads.
+
+        Called after each reply: the next question pushes the leaving()
+        turn out of the kept ones, so every image is considered once, just
+        before its description is needed, and images still sent as images
+        cost no request.
+        """
+        if self.scheduler is None:
+            return
+        message = self.leaving(messages)
+        if message is None:
+            return
+        if not is_vision_model(model):
+            model = self.model
+        for image in message.get("images") or ():
+            key = image_key(image)
+            with self.lock:
+                if key in self.descriptions or key in self.pending or key in self.failed:
+                    continue
+                self.pending.add(key)
+            self.scheduler.submit_background(self.run_describe, image, key, model)
+
+    def run_describe(self, image, key, model, cancel=None):
+        """Background job: describe one image unless that happened meanwhile"""
+        if cancel is not None and cancel.cancelled:
+            return   # preempted (it runs again) or shut down
+        try:
+            described = self.get(image) or self.describe(image, model, cancel)
+        except Exception as e:
+            if cancel is not None and cancel.cancelled:
+                return
+            print(f"Could not describe image with {model}: {e}")
+            described = None
+        with self.lock:
+            self.pending.discard(key)
+            if not described:
+                self.failed.add(key)
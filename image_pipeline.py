@@ -0,0 +1,118 @@
+"""
+Image Pipeline
+Downscales and recompresses attached images before they are base64-encoded
+for a vision model.
+"""
+
+import base64
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps
+
+# Longest side, in pixels, each vision model family works at. Larger images
+# are scaled down by the model anyway, so sending more pixels only costs
+# bandwidth and decode time.
+DEFAULT_IMAGE_SIZE = 672
+MODEL_IMAGE_SIZE = {
+    "llava": 672,
+    "bakllava": 336,
+    "moondream": 378,
+    "llama3.2-vision": 1120,
+}
+
+JPEG_QUALITY = 85
+
+
+def image_size_for(model, overrides=None):
+    """Return the longest side to resize to for a model name such as 'llava:13b'"""
+    family = model.split(":")[0]
+    if overrides and family in overrides:
+        return overrides[family]
+    return MODEL_IMAGE_SIZE.get(family, DEFAULT_IMAGE_SIZE)
+
+
+def format_bytes(count):
+    if count < 1024:
+        return f"{count} B"
+    if count < 1024 * 1024:
+        return f"{count / 1024:.1f} KB"
+    return f"{count / (1024 * 1024):.1f} MB"
+
+
+def prepare_image(source, max_side=DEFAULT_IMAGE_SIZE, quality=JPEG_QUALITY, name=None):
+    """Resize, strip metadata and re-encode one image.
+
+    source is a file path or the raw image bytes. Returns a dict with the
+    attachment name, base64 data, width/height and the original and
+    encoded sizes in bytes.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        raw = bytes(source)
+    else:
+        with open(source, "rb") as f:
+            raw = f.read()
+        name = name or os.path.basename(source)
+
+    with Image.open(io.BytesIO(raw)) as img:
+        original_format = img.format
+        has_exif = bool(img.info.get("exif"))
+        # Apply the EXIF orientation before the tag is dropped
+        img = ImageOps.exif_transpose(img)
+        resized = max(img.size) > max_side
+        if resized:
+            img.thumbnail((max_side, max_side), Image.LANCZOS)
+
+        has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+        out = io.BytesIO()
+        if has_alpha:
+            img.convert("RGBA").save(out, format="PNG", optimize=True)
+        else:
+            img.convert("RGB").save(out, format="JPEG", quality=quality, optimize=True)
+        encoded = out.getvalue()
+        width, height = img.size
+
+    # Small images that needed no resizing can already be smaller than the
+    # re-encoded version; keep them unless they carry metadata
+    if not resized and not has_exif and original_format in ("JPEG", "PNG") and len(raw) <= len(encoded):
+        encoded = raw
+
+    return {
+        "name": name or "image",
+        "data": base64.b64encode(encoded).decode("utf-8"),
+        "width": width,
+        "height": height,
+        "original_bytes": len(raw),
+        "encoded_bytes": len(encoded),
+    }
+
+
+def savings_text(prepared):
+    """Human readable summary such as '4.2 MB → 96.0 KB'"""
+    return f"{format_bytes(prepared['original_bytes'])} → {format_bytes(prepared['encoded_bytes'])}"
+
+
+class ImagePreprocessor:
+    """Runs prepare_image in a small worker pool, off the Tk thread.
+
+    submit() returns a Future; callback(future) is called from the worker
+    when the image is ready (or failed), so UI code should hand the result
+    to the UI queue rather than touch widgets directly.
+    """
+
+    def __init__(self, quality=JPEG_QUALITY, max_workers=2, size_overrides=None):
+        self.quality = quality
+        self.size_overrides = size_overrides
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="image-prep")
+
+    def submit(self, path, model, callback=None):
+        future = self.executor.submit(
+            prepare_image, path, image_size_for(model, self.size_overrides), self.quality
+        )
+        if callback:
+            future.add_done_callback(callback)
+        return future
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
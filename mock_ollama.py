@@ -0,0 +1,399 @@
+"""
+Mock Ollama Server
+A local stand-in for the Ollama HTTP API, for tests and benchmarks on
+machines without Ollama. Answers are synthetic but arrive the way real
+ones do: streamed as NDJSON at a set token rate, after a first-token delay,
+with model loading, errors and a limited number of parallel slots.
+
+    python mock_ollama.py --port 11435 --token-rate 40 --first-token-delay 0.2
+    OLLAMA_HOST=127.0.0.1:11435 python chatbot_v3.py
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_MODELS = ["llama2", "llava", "mistral", "nomic-embed-text"]
+WORDS = ("the quick brown fox jumps over a lazy dog while mock tokens stream "
+         "steadily from this local test server").split()
+
+
+def count_tokens(text):
+    """Rough token count of a prompt, good enough for the reported statistics"""
+    return max(1, len(text) // 4) if text else 0
+
+
+def fake_embedding(text, dim):
+    """A deterministic unit vector for text, so equal texts embed equally"""
+    rng = random.Random(hashlib.sha256(text.encode("utf-8")).digest())
+    vector = [rng.gauss(0, 1) for _ in range(dim)]
+    norm = sum(v * v for v in vector) ** 0.5 or 1.0
+    return [v / norm for v in vector]
+
+
+class MockConfig:
+    """Behaviour of the mock server; every field may be changed while it runs.
+
+    token_rate         tokens per second while streaming (0 sends them at once)
+    first_token_delay  seconds before the first token (prompt evaluation)
+    load_delay         seconds to load a model that is not loaded yet
+    tokens             tokens per answer unless options.num_predict says otherwise
+    slots              requests generated at once, like OLLAMA_NUM_PARALLEL;
+                       more wait for a free slot
+    error_rate         share of chat/generate requests answered with error_status
+    error_status       HTTP status of injected errors
+    fail_next          the next this many chat/generate requests fail
+    stream_error_after break streams with an error chunk after this many tokens
+    embedding_dim      length of the returned embedding vectors
+    reply              optional function(messages) -> answer text; replaces the
+                       synthetic tokens (then split on spaces)
+    """
+
+    def __init__(self, token_rate=50.0, first_token_delay=0.05, load_delay=0.0, tokens=24, slots=1,
+                 error_rate=0.0, error_status=500, fail_next=0, stream_error_after=None,
+                 embedding_dim=384, models=None, reply=None, seed=0):
+        self.token_rate = token_rate
+        self.first_token_delay = first_token_delay
+        self.load_delay = load_delay
+        self.tokens = tokens
+        self.slots = slots
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.fail_next = fail_next
+        self.stream_error_after = stream_error_after
+        self.embedding_dim = embedding_dim
+        self.models = list(models or DEFAULT_MODELS)
+        self.reply = reply
+        self.random = random.Random(seed)
+
+
+class MockOllamaServer:
+    """Runs the mock API on a background thread; usable as a context manager.
+
+    Counters for assertions and benchmarks: requests (per path), active and
+    peak_active (requests holding a slot), queued_peak (requests that had
+    to wait for one), disconnects (streams the client abandoned) and
+    payloads (the last 100 JSON bodies received).
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, config=None, **settings):
+        self.config = config or MockConfig(**settings)
+        self.httpd = ThreadingHTTPServer((host, port), MockOllamaHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.mock = self
+        self.thread = None
+        self.lock = threading.Lock()
+        self.slot_free = threading.Condition(self.lock)
+        self.loaded = set()
+        self.requests = {}
+        self.active = 0
+        self.peak_active = 0
+        self.waiting = 0
+        self.queued_peak = 0
+        self.disconnects = 0
+        self.payloads = []
+
+    @property
+    def port(self):
+        return self.httpd.server_address[1]
+
+    @property
+    def url(self):
+        return f"http://{self.httpd.server_address[0]}:{self.port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def reset_stats(self):
+        with self.lock:
+            self.requests.clear()
+            self.peak_active = self.active
+            self.queued_peak = 0
+            self.disconnects = 0
+            self.payloads.clear()
+
+    def count(self, path, payload=None):
+        with self.lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+            if payload is not None:
+                self.payloads.append(payload)
+                del self.payloads[:-100]
+
+    # ======================================
+    # Slots and model loading
+    # ======================================
+    def acquire_slot(self):
+        with self.slot_free:
+            if self.active >= max(1, self.config.slots):
+                self.waiting += 1
+                self.queued_peak = max(self.queued_peak, self.waiting)
+                while self.active >= max(1, self.config.slots):
+                    self.slot_free.wait()
+                self.waiting -= 1
+            self.active += 1
+            self.peak_active = max(self.peak_active, self.active)
+
+    def release_slot(self):
+        with self.slot_free:
+            self.active -= 1
+            self.slot_free.notify()
+
+    def load(self, model):
+        """Load model unless it is loaded; returns the load time in seconds"""
+        with self.lock:
+            if model in self.loaded:
+                return 0.0
+        delay = self.config.load_delay
+        if delay:
+            time.sleep(delay)
+        with self.lock:
+            self.loaded.add(model)
+        return delay
+
+    def unload(self, model):
+        with self.lock:
+            self.loaded.discard(model)
+
+    def injected_error(self):
+        """Decide whether this request fails; returns the status or None"""
+        config = self.config
+        with self.lock:
+            if config.fail_next > 0:
+                config.fail_next -= 1
+                return config.error_status
+            if config.error_rate and config.random.random() < config.error_rate:
+                return config.error_status
+        return None
+
+    def answer_tokens(self, messages, options):
+        config = self.config
+        if config.reply is not None:
+            words = config.reply(messages).split(" ")
+            return [w + " " for w in words[:-1]] + words[-1:]
+        count = int((options or {}).get("num_predict") or config.tokens)
+        return [WORDS[i % len(WORDS)] + (" " if i < count - 1 else ".") for i in range(count)]
+
+
+class MockOllamaHandler(BaseHTTPRequestHandler):
+    """HTTP/1.1 handler for the subset of the Ollama API the app uses"""
+
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def mock(self):
+        return self.server.mock
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, data, status=200):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            return json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return None
+
+    def do_GET(self):
+        self.mock.count(self.path)
+        if self.path == "/api/tags":
+            self.send_json({"models": [{"name": name, "model": name} for name in self.mock.config.models]})
+        elif self.path in ("/", "/api/version"):
+            self.send_json({"version": "mock"})
+        else:
+            self.send_json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        payload = self.read_json()
+        self.mock.count(self.path, payload)
+        if payload is None:
+            self.send_json({"error": "invalid JSON"}, 400)
+            return
+        routes = {
+            "/api/chat": self.chat,
+            "/api/generate": self.generate,
+            "/api/embed": self.embed,
+            "/api/embeddings": self.embeddings,
+        }
+        route = routes.get(self.path)
+        if route is None:
+            self.send_json({"error": "not found"}, 404)
+            return
+        model = payload.get("model")
+        if self.path != "/api/generate" and model not in self.mock.config.models:
+            self.send_json({"error": f"model '{model}' not found, try pulling it first"}, 404)
+            return
+        route(payload)
+
+    # ======================================
+    # Endpoints
+    # ======================================
+    def embed(self, payload):
+        texts = payload.get("input", [])
+        if isinstance(texts, str):
+            texts = [texts]
+        dim = self.mock.config.embedding_dim
+        self.send_json({"model": payload["model"], "embeddings": [fake_embedding(t, dim) for t in texts]})
+
+    def embeddings(self, payload):
+        """The older single-text endpoint"""
+        self.send_json({"embedding": fake_embedding(payload.get("prompt", ""), self.mock.config.embedding_dim)})
+
+    def generate(self, payload):
+        model = payload.get("model")
+        if model not in self.mock.config.models:
+            self.send_json({"error": f"model '{model}' not found, try pulling it first"}, 404)
+            return
+        if payload.get("keep_alive") in (0, "0", "0s"):
+            self.mock.unload(model)
+            self.send_json({"model": model, "response": "", "done": True, "done_reason": "unload"})
+            return
+        if not payload.get("prompt"):
+            # An empty generate only loads the model
+            seconds = self.mock.load(model)
+            self.send_json({"model": model, "response": "", "done": True, "load_duration": int(seconds * 1e9)})
+            return
+        messages = [{"role": "user", "content": payload["prompt"]}]
+        self.answer(payload, messages, lambda text: {"response": text})
+
+    def chat(self, payload):
+        self.answer(payload, payload.get("messages", []),
+                    lambda text: {"message": {"role": "assistant", "content": text}})
+
+    def answer(self, payload, messages, shape):
+        """Generate an answer in a slot, streamed or whole; shape(text) builds the body fields"""
+        mock = self.mock
+        config = mock.config
+        status = mock.injected_error()
+        if status is not None:
+            self.send_json({"error": "injected failure"}, status)
+            return
+
+        started = time.perf_counter()
+        mock.acquire_slot()
+        try:
+            load_seconds = mock.load(payload["model"])
+            prompt_text = " ".join(str(m.get("content", "")) for m in messages)
+            tokens = mock.answer_tokens(messages, payload.get("options"))
+            if config.first_token_delay:
+                time.sleep(config.first_token_delay)
+            prompt_done = time.perf_counter()
+            stats = {
+                "model": payload["model"],
+                "done": True,
+                "done_reason": "stop",
+                "load_duration": int(load_seconds * 1e9),
+                "prompt_eval_count": count_tokens(prompt_text),
+                "prompt_eval_duration": int((prompt_done - started - load_seconds) * 1e9),
+            }
+            if payload.get("stream", True):
+                self.stream(tokens, shape, stats, started, prompt_done)
+            else:
+                self.sleep_for(len(tokens))
+                finished = time.perf_counter()
+                body = dict(shape("".join(tokens)), **stats)
+                body.update(eval_count=len(tokens), eval_duration=int((finished - prompt_done) * 1e9),
+                            total_duration=int((finished - started) * 1e9))
+                self.send_json(body)
+        except ConnectionError:
+            # The client went away, e.g. the user pressed stop
+            with mock.lock:
+                mock.disconnects += 1
+        finally:
+            mock.release_slot()
+
+    def sleep_for(self, count):
+        rate = self.mock.config.token_rate
+        if rate:
+            time.sleep(count / rate)
+
+    def stream(self, tokens, shape, stats, started, prompt_done):
+        """Send NDJSON chunks at the configured rate with chunked encoding"""
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        break_after = self.mock.config.stream_error_after
+        rate = self.mock.config.token_rate
+        for i, token in enumerate(tokens):
+            if break_after is not None and i >= break_after:
+                self.send_chunk({"error": "injected stream failure"})
+                break
+            if rate and i:
+                # Keep to the schedule instead of sleeping a fixed time per token
+                delay = prompt_done + i / rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            self.send_chunk(dict(shape(token), model=stats["model"], done=False))
+        else:
+            finished = time.perf_counter()
+            final = dict(shape(""), **stats)
+            final.update(eval_count=len(tokens), eval_duration=int((finished - prompt_done) * 1e9),
+                         total_duration=int((finished - started) * 1e9))
+            self.send_chunk(final)
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def send_chunk(self, data):
+        line = json.dumps(data).encode("utf-8") + b"\n"
+        self.wfile.write(f"{len(line):x}\r\n".encode("ascii") + line + b"\r\n")
+        self.wfile.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a mock Ollama server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--token-rate", type=float, default=50.0, help="Tokens per second (0: no delay)")
+    parser.add_argument("--first-token-delay", type=float, default=0.05, help="Seconds before the first token")
+    parser.add_argument("--load-delay", type=float, default=0.0, help="Seconds to load a model")
+    parser.add_argument("--tokens", type=int, default=24, help="Tokens per answer")
+    parser.add_argument("--slots", type=int, default=1, help="Requests generated in parallel")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests that fail")
+    parser.add_argument("--models", help="Comma-separated model names to report")
+    args = parser.parse_args(argv)
+
+    server = MockOllamaServer(
+        args.host, args.port,
+        token_rate=args.token_rate,
+        first_token_delay=args.first_token_delay,
+        load_delay=args.load_delay,
+        tokens=args.tokens,
+        slots=args.slots,
+        error_rate=args.error_rate,
+        models=args.models.split(",") if args.models else None,
+    )
+    print(f"Mock Ollama listening on {server.url} (Ctrl+C to stop)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Model Warm-up
+Loads the selected model in the background, so the first message after
+starting the app or switching models does not wait for the model to load.
+"""
+
+import threading
+import time
+
+# Choices offered for how long a model stays loaded after the last request
+KEEP_ALIVE_CHOICES = {
+    "5 minutes": "5m",
+    "30 minutes": "30m",
+    "2 hours": "2h",
+    "Always": -1,
+}
+
+
+def keep_alive_label(value):
+    for label, choice in KEEP_ALIVE_CHOICES.items():
+        if choice == value:
+            return label
+    return str(value)
+
+
+class ModelWarmer:
+    """Issues a background load request per model.
+
+    warm() returns at once and is cheap to call repeatedly: a model that is
+    already being loaded is skipped, and Ollama answers straight away for a
+    model that is in memory. on_done(model, seconds, error) is called from
+    the worker thread, so UI code should hand it to the UI queue.
+
+    options(model) returns the options to load with; pass the ones chat
+    requests use (ChatEngine.options), otherwise Ollama loads the model
+    again with the chat's num_ctx on the first message.
+    """
+
+    def __init__(self, client, on_done=None, options=None):
+        self.client = client
+        self.on_done = on_done
+        self.options = options
+        self.loading = set()
+        self.lock = threading.Lock()
+
+    def warm(self, model):
+        """Start loading a model; returns False if it is already loading"""
+        if not model:
+            return False
+        with self.lock:
+            if model in self.loading:
+                return False
+            self.loading.add(model)
+        threading.Thread(target=self.run, args=(model,), daemon=True).start()
+        return True
+
+    def run(self, model):
+        started = time.perf_counter()
+        error = None
+        try:
+            self.client.load_model(model, self.options(model) if self.options else None)
+        except Exception as e:
+            error = e
+        finally:
+            with self.lock:
+                self.loading.discard(model)
+        if self.on_done:
+            self.on_done(model, time.perf_counter() - started, error)
@@ -0,0 +1,342 @@
+"""
+Ollama Client Helpers
+Shared HTTP client and helpers used by all chatbot versions to talk to the Ollama API.
+"""
+
+import json
+import os
+import socket
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+DEFAULT_BASE_URL = "http://localhost:11434"
+
+# How long Ollama keeps a model in memory after a request ("5m", "2h", -1 for
+# forever, 0 to unload right away); None leaves it to the server default
+DEFAULT_KEEP_ALIVE = "30m"
+
+# Per-endpoint timeouts in seconds; tuples are (connect, read)
+DEFAULT_TIMEOUTS = {
+    "chat": (5, 120),
+    "generate": (5, 120),
+    "embed": (5, 120),
+    "load": (5, 300),
+    "tags": 2,
+    "default": (5, 60),
+}
+
+
+class OllamaError(Exception):
+    """Raised when Ollama reports an error inside a response stream"""
+
+
+# The CancelToken of the request the current thread is sending, if any
+sending = threading.local()
+
+
+def shutdown_socket(sock):
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+
+def abort_response(response):
+    """Close a streaming response from another thread.
+
+    Closing alone only takes effect once the next chunk arrives; shutting
+    the socket down first wakes a reader blocked in iter_lines at once, and
+    the dropped connection tells Ollama to stop generating.
+    """
+    connection = getattr(getattr(response, "raw", None), "_connection", None)
+    sock = getattr(connection, "sock", None)
+    if sock is not None:
+        shutdown_socket(sock)
+    response.close()
+
+
+class CancelToken:
+    """Lets the UI thread stop one in-flight request.
+
+    While the request waits for its response headers (Ollama sends them
+    with the first token, after prompt evaluation) the token holds the
+    connection's socket; the worker then attach()es the response. cancel()
+    may be called at any point and shuts down whichever is current.
+    """
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.lock = threading.Lock()
+        self.response = None
+        self.sock = None
+
+    @property
+    def cancelled(self):
+        return self.event.is_set()
+
+    def attach_socket(self, sock):
+        """Called from the connection once the request is sent"""
+        with self.lock:
+            self.sock = sock
+            if self.cancelled and sock is not None:
+                shutdown_socket(sock)
+
+    def detach_socket(self):
+        with self.lock:
+            self.sock = None
+
+    def attach(self, response):
+        with self.lock:
+            self.response = response
+            self.sock = None
+        if self.cancelled:
+            abort_response(response)
+
+    def cancel(self):
+        self.event.set()
+        with self.lock:
+            response = self.response
+            if response is None and self.sock is not None:
+                shutdown_socket(self.sock)
+        if response is not None:
+            abort_response(response)
+
+
+class CancellableConnectionMixin:
+    """Hands the socket of a sent request to the sending thread's CancelToken"""
+
+    def request(self, *args, **kwargs):
+        super().request(*args, **kwargs)
+        token = getattr(sending, "token", None)
+        if token is not None:
+            token.attach_socket(self.sock)
+
+
+class CancellableHTTPConnection(CancellableConnectionMixin, HTTPConnection):
+    pass
+
+
+class CancellableHTTPSConnection(CancellableConnectionMixin, HTTPSConnection):
+    pass
+
+
+class CancellableHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = CancellableHTTPConnection
+
+
+class CancellableHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = CancellableHTTPSConnection
+
+
+class CancellableAdapter(HTTPAdapter):
+    """HTTPAdapter whose requests can be aborted before the response headers arrive"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": CancellableHTTPConnectionPool,
+            "https": CancellableHTTPSConnectionPool,
+        }
+
+
+def resolve_base_url(base_url=None):
+    """Return the server base URL, honouring OLLAMA_HOST like the Ollama CLI does"""
+    url = base_url or os.environ.get("OLLAMA_HOST") or DEFAULT_BASE_URL
+    if "://" not in url:
+        url = f"http://{url}"
+    return url.rstrip("/")
+
+
+class OllamaClient:
+    """Long-lived HTTP client for one Ollama server.
+
+    All requests go through a single requests.Session, so chat turns,
+    health checks and model listing reuse keep-alive connections from one
+    pool instead of opening a fresh TCP connection per call.
+    """
+
+    def __init__(self, base_url=None, timeouts=None, pool_size=4, keep_alive=DEFAULT_KEEP_ALIVE):
+        self.base_url = resolve_base_url(base_url)
+        self.keep_alive = keep_alive
+        self.timeouts = dict(DEFAULT_TIMEOUTS)
+        if timeouts:
+            self.timeouts.update(timeouts)
+
+        self.session = requests.Session()
+        self.adapter = CancellableAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", self.adapter)
+        self.session.mount("https://", self.adapter)
+
+        self.lock = threading.Lock()
+        self.request_count = 0
+
+    @property
+    def chat_url(self):
+        return self.url("chat")
+
+    def url(self, endpoint):
+        """Return the full URL of an /api endpoint"""
+        return f"{self.base_url}/api/{endpoint}"
+
+    def timeout(self, endpoint):
+        """Return the timeout configured for an endpoint"""
+        return self.timeouts.get(endpoint, self.timeouts["default"])
+
+    def count_request(self):
+        with self.lock:
+            self.request_count += 1
+
+    def get(self, endpoint, **kwargs):
+        """GET an /api endpoint through the shared pool"""
+        self.count_request()
+        kwargs.setdefault("timeout", self.timeout(endpoint))
+        return self.session.get(self.url(endpoint), **kwargs)
+
+    def post(self, endpoint, payload, stream=False, cancel=None, **kwargs):
+        """POST a JSON payload to an /api endpoint through the shared pool.
+
+        With cancel (a CancelToken) the request can be stopped while it
+        waits for the response; a stopped request raises a ConnectionError.
+        """
+        self.count_request()
+        kwargs.setdefault("timeout", self.timeout(endpoint))
+        if cancel is None:
+            return self.session.post(self.url(endpoint), json=payload, stream=stream, **kwargs)
+        sending.token = cancel
+        try:
+            response = self.session.post(self.url(endpoint), json=payload, stream=stream, **kwargs)
+        finally:
+            sending.token = None
+            cancel.detach_socket()
+        cancel.attach(response)
+        return response
+
+    def with_keep_alive(self, payload):
+        """Return payload with the client's keep_alive unless it sets its own"""
+        if self.keep_alive is None or "keep_alive" in payload:
+            return payload
+        return dict(payload, keep_alive=self.keep_alive)
+
+    def chat(self, payload, stream=False, cancel=None):
+        """Send a /api/chat request"""
+        return self.post("chat", self.with_keep_alive(payload), stream=stream, cancel=cancel)
+
+    def generate(self, payload, stream=False, cancel=None):
+        """Send a /api/generate request"""
+        return self.post("generate", self.with_keep_alive(payload), stream=stream, cancel=cancel)
+
+    def load_model(self, model, options=None):
+        """Load a model into memory without generating anything.
+
+        An /api/generate request without a prompt only loads the model (and
+        refreshes its keep_alive); it returns at once when the model is
+        already loaded. options should carry the num_ctx later chats send:
+        Ollama reloads a model whose context size changes. Returns the load
+        duration Ollama reports, in seconds.
+        """
+        payload = {"model": model}
+        if options:
+            payload["options"] = options
+        response = self.post("generate", self.with_keep_alive(payload), timeout=self.timeout("load"))
+        if response.status_code != 200:
+            try:
+                message = response.json().get("error", response.text)
+            except ValueError:
+                message = response.text
+            raise OllamaError(f"Could not load {model} ({response.status_code}): {message}")
+        return response.json().get("load_duration", 0) / 1e9
+
+    def embed(self, model, texts):
+        """Return one embedding vector per text from /api/embed"""
+        response = self.post("embed", {"model": model, "input": list(texts)})
+        if response.status_code != 200:
+            try:
+                message = response.json().get("error", response.text)
+            except ValueError:
+                message = response.text
+            raise OllamaError(f"Embedding failed ({response.status_code}): {message}")
+        return response.json()["embeddings"]
+
+    def tags(self):
+        """Fetch /api/tags; doubles as the health check"""
+        return self.get("tags")
+
+    def is_available(self):
+        """Return True if the server answers /api/tags"""
+        try:
+            return self.tags().status_code == 200
+        except requests.RequestException:
+            return False
+
+    def list_models(self):
+        """Return the names of the models installed on the server"""
+        response = self.tags()
+        response.raise_for_status()
+        return model_names(response)
+
+    def pool_stats(self):
+        """Return request and connection counters for tuning connection reuse"""
+        connections = 0
+        pooled_requests = 0
+        pools = self.adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                connections += pool.num_connections
+                pooled_requests += pool.num_requests
+        return {
+            "requests": self.request_count,
+            "connections_opened": connections,
+            "pooled_requests": pooled_requests,
+        }
+
+    def close(self):
+        """Close every pooled connection"""
+        self.session.close()
+
+
+def model_names(response):
+    """Extract model names from a /api/tags response, or [] if it is unreadable"""
+    try:
+        return [m["name"] for m in response.json().get("models", [])]
+    except (ValueError, TypeError, KeyError, AttributeError):
+        return []
+
+
+def iter_chat_stream(response, cancel=None):
+    """Yield parsed NDJSON chunks from a streaming /api/chat response.
+
+    Ollama sends one JSON object per line while the answer is generated and
+    finishes with a chunk whose ``done`` flag is set. That final chunk carries
+    the timing and token statistics and is yielded like every other chunk.
+    When cancel (a CancelToken) is cancelled the stream simply ends; check
+    cancel.cancelled afterwards to tell a stopped answer from a finished one.
+    """
+    try:
+        for line in response.iter_lines():
+            if cancel is not None and cancel.cancelled:
+                return
+            if not line:
+                continue
+            if isinstance(line, bytes):
+                line = line.decode("utf-8")
+            chunk = json.loads(line)
+            if "error" in chunk:
+                raise OllamaError(chunk["error"])
+            yield chunk
+            if chunk.get("done"):
+                break
+    except (requests.RequestException, AttributeError, OSError, ValueError):
+        # An aborted response fails in whatever read was in progress
+        if cancel is not None and cancel.cancelled:
+            return
+        raise
+
+
+def chunk_text(chunk):
+    """Return the content fragment carried by a chat stream chunk"""
+    return chunk.get("message", {}).get("content", "")
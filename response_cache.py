@@ -0,0 +1,143 @@
+"""
+Response Cache
+Reuses the answer to a prompt that was already asked with the same model,
+messages and options, instead of generating it again.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from image_memory import image_key
+
+MEMORY_ENTRIES = 128     # answers kept in memory
+DISK_ENTRIES = 2000      # answers kept in the SQLite file
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key        TEXT PRIMARY KEY,
+    model      TEXT NOT NULL,
+    response   TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses (last_used);
+"""
+
+
+def normalize_message(message):
+    """The parts of a message that decide the answer, in a canonical form"""
+    content = message.get("content", "").replace("\r\n", "\n").strip()
+    normalized = {"role": message.get("role"), "content": content}
+    if message.get("images"):
+        normalized["images"] = [image_key(image) for image in message["images"]]
+    return normalized
+
+
+def cache_key(model, messages, options=None):
+    """Stable hash of everything that goes into a generation.
+
+    messages includes the system prompt as its first message. Images are
+    hashed by reference, so the key can be computed before attachments are
+    turned into base64.
+    """
+    options = {k: v for k, v in (options or {}).items() if v is not None}
+    data = json.dumps(
+        {"model": model, "messages": [normalize_message(m) for m in messages], "options": options},
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Size-bounded LRU of answers, backed by a SQLite file.
+
+    Only deterministic requests (temperature 0) are cached unless
+    allow_sampled is set, since a sampled answer is just one of many the
+    model could give. hits and misses count lookups since start.
+    """
+
+    def __init__(self, path="response_cache.db", memory_entries=MEMORY_ENTRIES,
+                 disk_entries=DISK_ENTRIES, allow_sampled=False):
+        self.memory_entries = max(1, memory_entries)
+        self.disk_entries = max(1, disk_entries)
+        self.allow_sampled = allow_sampled
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.conn = None
+        if path:
+            self.conn = sqlite3.connect(path, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.executescript(SCHEMA)
+            self.conn.commit()
+
+    def cacheable(self, options):
+        return self.allow_sampled or (options or {}).get("temperature") == 0
+
+    def remember(self, key, response):
+        self.entries[key] = response
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.memory_entries:
+            self.entries.popitem(last=False)
+
+    def get(self, key):
+        """Return the cached answer for a key, or None; counts a hit or miss"""
+        with self.lock:
+            response = self.entries.get(key)
+            if response is None and self.conn:
+                row = self.conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+                if row:
+                    response = row[0]
+            if response is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.remember(key, response)
+            if self.conn:
+                with self.conn:
+                    self.conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            return response
+
+    def put(self, key, model, response):
+        with self.lock:
+            self.remember(key, response)
+            if not self.conn:
+                return
+            now = time.time()
+            with self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, model, response, created_at, last_used) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, model, response, now, now),
+                )
+                self.conn.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    " SELECT key FROM responses ORDER BY last_used DESC, rowid DESC LIMIT -1 OFFSET ?)",
+                    (self.disk_entries,),
+                )
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            if self.conn:
+                with self.conn:
+                    self.conn.execute("DELETE FROM responses")
+
+    def stats_text(self):
+        """Short summary for the status bar, e.g. '⚡ Cache: 3 hits / 5 misses'"""
+        hits = f"{self.hits} hit" + ("s" if self.hits != 1 else "")
+        misses = f"{self.misses} miss" + ("es" if self.misses != 1 else "")
+        return f"⚡ Cache: {hits} / {misses}"
+
+    def close(self):
+        with self.lock:
+            if self.conn:
+                self.conn.close()
+                self.conn = None
@@ -31,11 +31,47 @@ def run_all_tests():
         import test_chatbot_v1
         import test_chatbot_v2
         import test_chatbot_v3
+        import test_ollama_client
+        import test_ui_queue
+        import test_context_window
+        import test_session_store
+        import test_transcript_window
+        import test_chat_list
+        import test_image_pipeline
+        import test_attachment_store
+        import test_image_memory
+        import test_file_retrieval
+        import test_vector_index
+        import test_response_cache
+        import test_model_warmup
+        import test_generation_queue
+        import test_host_pool
+        import test_chat_engine
+        import test_batch_chat
+        import test_mock_ollama
 
         # Add test suites
         suite.addTests(loader.loadTestsFromModule(test_chatbot_v1))
         suite.addTests(loader.loadTestsFromModule(test_chatbot_v2))
         suite.addTests(loader.loadTestsFromModule(test_chatbot_v3))
+        suite.addTests(loader.loadTestsFromModule(test_ollama_client))
+        suite.addTests(loader.loadTestsFromModule(test_ui_queue))
+        suite.addTests(loader.loadTestsFromModule(test_context_window))
+        suite.addTests(loader.loadTestsFromModule(test_session_store))
+        suite.addTests(loader.loadTestsFromModule(test_transcript_window))
+        suite.addTests(loader.loadTestsFromModule(test_chat_list))
+        suite.addTests(loader.loadTestsFromModule(test_image_pipeline))
+        suite.addTests(loader.loadTestsFromModule(test_attachment_store))
+        suite.addTests(loader.loadTestsFromModule(test_image_memory))
+        suite.addTests(loader.loadTestsFromModule(test_file_retrieval))
+        suite.addTests(loader.loadTestsFromModule(test_vector_index))
+        suite.addTests(loader.loadTestsFromModule(test_response_cache))
+        suite.addTests(loader.loadTestsFromModule(test_model_warmup))
+        suite.addTests(loader.loadTestsFromModule(test_generation_queue))
+        suite.addTests(loader.loadTestsFromModule(test_host_pool))
+        suite.addTests(loader.loadTestsFromModule(test_chat_engine))
+        suite.addTests(loader.loadTestsFromModule(test_batch_chat))
+        suite.addTests(loader.loadTestsFromModule(test_mock_ollama))
 
     except ImportError as e:
         print(f"Error importing test modules: {e}")
@@ -122,6 +158,11 @@ if __name__ == '__main__':
         action='store_true',
         help='Reduce output verbosity'
     )
+    parser.add_argument(
+        '--benchmark',
+        action='store_true',
+        help='Also run the quick latency benchmark and fail on regressions'
+    )
 
     args = parser.parse_args()
 
@@ -131,5 +172,11 @@ if __name__ == '__main__':
     else:
         success = run_specific_version(args.version)
 
+    if args.benchmark:
+        import subprocess
+        bench = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks', 'bench_latency.py')
+        print()
+        success = subprocess.call([sys.executable, bench, '--quick']) == 0 and success
+
     # Exit with appropriate code
     sys.exit(0 if success else 1)
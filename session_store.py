@@ -0,0 +1,408 @@
+"""
+Session Store
+SQLite-backed persistence for chat sessions, messages and attachments.
+"""
+
+import os
+import pickle
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id          TEXT PRIMARY KEY,
+    name        TEXT NOT NULL,
+    created_at  TEXT NOT NULL,
+    updated_at  TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS messages (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id  TEXT NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+    seq         INTEGER NOT NULL,
+    role        TEXT NOT NULL,
+    content     TEXT NOT NULL,
+    created_at  TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS attachments (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    message_id  INTEGER NOT NULL REFERENCES messages(id) ON DELETE CASCADE,
+    kind        TEXT NOT NULL,
+    position    INTEGER NOT NULL,
+    data        TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key         TEXT PRIMARY KEY,
+    value       TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_messages_session_seq ON messages(session_id, seq);
+CREATE INDEX IF NOT EXISTS idx_sessions_updated_at ON sessions(updated_at);
+CREATE INDEX IF NOT EXISTS idx_attachments_message ON attachments(message_id);
+"""
+
+# Full-text index over message contents, kept in sync by triggers so every
+# append (and cascade delete) updates it in the same transaction
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+    content, content='messages', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+    INSERT INTO messages_fts (rowid, content) VALUES (new.id, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN
+    INSERT INTO messages_fts (messages_fts, rowid, content) VALUES ('delete', old.id, old.content);
+END;
+"""
+
+SEARCH_LIMIT = 50
+RANK_WINDOW = 2000   # newest matches considered when ranking by relevance
+
+
+def fts_query(text):
+    """Turn free text into an FTS5 query: every word must match, the last as a prefix"""
+    words = [w.replace('"', '""') for w in text.split()]
+    if not words:
+        return ""
+    terms = [f'"{w}"' for w in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def to_timestamp(value):
+    """Store datetimes as ISO strings"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value or datetime.now().isoformat()
+
+
+def from_timestamp(value):
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return datetime.now()
+
+
+class SessionStore:
+    """Chat sessions persisted in SQLite, one row per message.
+
+    Every message is committed as soon as it is appended, so a crash loses
+    at most the message being written, and loading a session reads only
+    that session's rows.
+    """
+
+    def __init__(self, path="chat_sessions.db"):
+        self.path = path
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+        self.has_fts = self.create_fts_index()
+
+    def create_fts_index(self):
+        """Create the FTS5 index, filling it from existing messages the first time.
+
+        Returns False when this SQLite build has no FTS5; search then falls
+        back to a LIKE scan.
+        """
+        try:
+            self.conn.executescript(FTS_SCHEMA)
+        except sqlite3.OperationalError:
+            return False
+        if not self.get_meta("fts_built"):
+            with self.conn:
+                self.conn.execute("INSERT INTO messages_fts (messages_fts) VALUES ('rebuild')")
+                self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('fts_built', '1')")
+        return True
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    # ======================================
+    # Sessions
+    # ======================================
+    def create_session(self, session):
+        """Insert a session (any object with id, name, created_at, updated_at)"""
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO sessions (id, name, created_at, updated_at) VALUES (?, ?, ?, ?)",
+                (session.id, session.name, to_timestamp(session.created_at), to_timestamp(session.updated_at)),
+            )
+
+    def rename_session(self, session_id, name):
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE sessions SET name = ? WHERE id = ?", (name, session_id))
+
+    def delete_session(self, session_id):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def list_sessions(self):
+        """Return session metadata in creation order, without message bodies.
+
+        Each row has id, name, created_at, updated_at and message_count; the
+        count comes from the (session_id, seq) index, not the message table.
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT s.id, s.name, s.created_at, s.updated_at, "
+                "(SELECT COUNT(*) FROM messages m WHERE m.session_id = s.id) AS message_count "
+                "FROM sessions s ORDER BY s.created_at, s.rowid"
+            ).fetchall()
+        return [
+            {
+                "id": row["id"],
+                "name": row["name"],
+                "created_at": from_timestamp(row["created_at"]),
+                "updated_at": from_timestamp(row["updated_at"]),
+                "message_count": row["message_count"],
+            }
+            for row in rows
+        ]
+
+    # ======================================
+    # Messages
+    # ======================================
+    def append_message(self, session_id, message):
+        """Append one message (and its images) to a session in a single transaction"""
+        now = datetime.now().isoformat()
+        with self.lock, self.conn:
+            self.insert_message(session_id, message, now)
+            self.conn.execute("UPDATE sessions SET updated_at = ? WHERE id = ?", (now, session_id))
+
+    def insert_message(self, session_id, message, created_at):
+        seq = self.conn.execute(
+            "SELECT COALESCE(MAX(seq), -1) + 1 FROM messages WHERE session_id = ?", (session_id,)
+        ).fetchone()[0]
+        cursor = self.conn.execute(
+            "INSERT INTO messages (session_id, seq, role, content, created_at) VALUES (?, ?, ?, ?, ?)",
+            (session_id, seq, message["role"], message.get("content", ""), created_at),
+        )
+        for position, data in enumerate(message.get("images") or ()):
+            self.conn.execute(
+                "INSERT INTO attachments (message_id, kind, position, data) VALUES (?, 'image', ?, ?)",
+                (cursor.lastrowid, position, data),
+            )
+        return cursor.lastrowid
+
+    def load_messages(self, session_id):
+        """Return a session's messages in the dict format sent to Ollama"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id, role, content FROM messages WHERE session_id = ? ORDER BY seq", (session_id,)
+            ).fetchall()
+            images = {}
+            for row in self.conn.execute(
+                "SELECT a.message_id, a.data FROM attachments a "
+                "JOIN messages m ON m.id = a.message_id "
+                "WHERE m.session_id = ? AND a.kind = 'image' ORDER BY a.message_id, a.position",
+                (session_id,),
+            ):
+                images.setdefault(row["message_id"], []).append(row["data"])
+
+        messages = []
+        for row in rows:
+            message = {"role": row["role"], "content": row["content"]}
+            if row["id"] in images:
+                message["images"] = images[row["id"]]
+            messages.append(message)
+        return messages
+
+    def externalize_images(self, put):
+        """Move inline base64 images into a blob store.
+
+        put(data) stores one image and returns its reference. Returns the
+        number of attachments moved; the database is vacuumed afterwards so
+        the file actually shrinks.
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id, data FROM attachments WHERE kind = 'image' AND data NOT LIKE 'sha256:%'"
+            ).fetchall()
+            if not rows:
+                return 0
+            with self.conn:
+                for row in rows:
+                    self.conn.execute(
+                        "UPDATE attachments SET data = ? WHERE id = ?", (put(row["data"]), row["id"])
+                    )
+            self.conn.execute("VACUUM")
+        return len(rows)
+
+    # ======================================
+    # Search
+    # ======================================
+    def search(self, text, limit=SEARCH_LIMIT):
+        """Return the best matching messages across all sessions.
+
+        Each hit has message_id, session_id, session_name, seq (the
+        message's position in its session), role and a snippet.
+        """
+        query = fts_query(text)
+        if not query:
+            return []
+        with self.lock:
+            if self.has_fts:
+                # Rank only the newest RANK_WINDOW matches so that common
+                # words cost no more than rare ones: find the oldest rowid in
+                # that window, then let FTS5 score just that rowid range
+                floor = self.conn.execute(
+                    "SELECT rowid FROM messages_fts WHERE messages_fts MATCH ? "
+                    "ORDER BY rowid DESC LIMIT 1 OFFSET ?",
+                    (query, RANK_WINDOW - 1),
+                ).fetchone()
+                rows = self.conn.execute(
+                    "SELECT m.id, m.session_id, s.name, m.seq, m.role, "
+                    "snippet(messages_fts, 0, '', '', '…', 12) AS snippet "
+                    "FROM messages_fts "
+                    "JOIN messages m ON m.id = messages_fts.rowid "
+                    "JOIN sessions s ON s.id = m.session_id "
+                    "WHERE messages_fts MATCH ? AND messages_fts.rowid >= ? "
+                    "ORDER BY bm25(messages_fts) LIMIT ?",
+                    (query, floor[0] if floor else 0, limit),
+                ).fetchall()
+            else:
+                rows = self.conn.execute(
+                    "SELECT m.id, m.session_id, s.name, m.seq, m.role, substr(m.content, 1, 80) AS snippet "
+                    "FROM messages m JOIN sessions s ON s.id = m.session_id "
+                    "WHERE m.content LIKE ? ORDER BY m.id DESC LIMIT ?",
+                    (f"%{text.strip()}%", limit),
+                ).fetchall()
+        return [
+            {
+                "message_id": row["id"],
+                "session_id": row["session_id"],
+                "session_name": row["name"],
+                "seq": row["seq"],
+                "role": row["role"],
+                "snippet": " ".join(row["snippet"].split()),
+            }
+            for row in rows
+        ]
+
+    # ======================================
+    # Pickle migration
+    # ======================================
+    def get_meta(self, key):
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else None
+
+    def set_meta(self, key, value):
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def migrate_pickle(self, pickle_path):
+        """Import sessions from a legacy chat_sessions.pkl once.
+
+        Returns the number of sessions imported. The pickle file is left in
+        place; a marker in the meta table stops it from being imported twice.
+        """
+        marker = f"migrated:{os.path.abspath(pickle_path)}"
+        if not os.path.exists(pickle_path) or self.get_meta(marker):
+            return 0
+
+        with open(pickle_path, "rb") as f:
+            sessions = LegacySessionUnpickler(f).load()
+
+        with self.lock, self.conn:
+            for session in sessions:
+                created_at = to_timestamp(getattr(session, "created_at", None))
+                updated_at = to_timestamp(getattr(session, "updated_at", None))
+                self.conn.execute(
+                    "INSERT OR IGNORE INTO sessions (id, name, created_at, updated_at) VALUES (?, ?, ?, ?)",
+                    (session.id, session.name, created_at, updated_at),
+                )
+                for message in getattr(session, "messages", []):
+                    self.insert_message(session.id, message, updated_at)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                (marker, datetime.now().isoformat()),
+            )
+        return len(sessions)
+
+
+class SessionCache:
+    """Least-recently-used set of sessions whose messages are held in memory.
+
+    load(session_id) is called on a miss and must return the session with its
+    messages. Evicted sessions are simply dropped; their messages are already
+    in the store and are read back the next time they are opened.
+    pinned(session_id) marks sessions that must stay, e.g. while an answer
+    is still being appended to them; the cache grows past capacity until
+    they are released. on_evict(session) is called for every session that
+    is evicted or discarded, so other caches keyed on it can let go too.
+    """
+
+    def __init__(self, load, capacity=8, pinned=None, on_evict=None):
+        self.load = load
+        self.capacity = max(1, capacity)
+        self.pinned = pinned or (lambda session_id: False)
+        self.on_evict = on_evict
+        self.sessions = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __contains__(self, session_id):
+        return session_id in self.sessions
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def get(self, session_id):
+        """Return a loaded session, reading it from the store on a miss"""
+        with self.lock:
+            session = self.sessions.get(session_id)
+            if session is not None:
+                self.sessions.move_to_end(session_id)
+                return session
+        session = self.load(session_id)
+        if session is not None:
+            self.put(session)
+        return session
+
+    def put(self, session):
+        evicted = []
+        with self.lock:
+            replaced = self.sessions.get(session.id)
+            if replaced is not None and replaced is not session:
+                evicted.append(replaced)
+            self.sessions[session.id] = session
+            self.sessions.move_to_end(session.id)
+            excess = len(self.sessions) - self.capacity
+            if excess > 0:
+                evictable = [sid for sid in self.sessions if sid != session.id and not self.pinned(sid)]
+                for sid in evictable[:excess]:
+                    evicted.append(self.sessions.pop(sid))
+        self.evicted(evicted)
+
+    def discard(self, session_id):
+        with self.lock:
+            session = self.sessions.pop(session_id, None)
+        self.evicted([session] if session is not None else [])
+
+    def evicted(self, sessions):
+        if self.on_evict is not None:
+            for session in sessions:
+                self.on_evict(session)
+
+
+class LegacySession:
+    """Attribute bag standing in for ChatSession objects found in old pickles"""
+
+
+class LegacySessionUnpickler(pickle.Unpickler):
+    """Unpickle ChatSession objects whichever module they were saved from.
+
+    Sessions pickled while running chatbot_v3.py as a script reference
+    __main__.ChatSession, which does not exist when loading from elsewhere.
+    """
+
+    def find_class(self, module, name):
+        if name == "ChatSession":
+            return LegacySession
+        return super().find_class(module, name)
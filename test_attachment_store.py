@@ -0,0 +1,107 @@
+"""
+Unit Tests for the content-addressed attachment store
+"""
+
+import unittest
+import base64
+import shutil
+import tempfile
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from attachment_store import AttachmentStore, is_ref
+
+
+class TestAttachmentStore(unittest.TestCase):
+    """Test storing, deduplicating and materializing images"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.store = AttachmentStore(os.path.join(self.tmpdir, "attachments"))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def blob_count(self):
+        return sum(len(files) for _, _, files in os.walk(self.store.root))
+
+    def test_put_returns_reference(self):
+        """Test stored images are replaced by a short sha256 reference"""
+        ref = self.store.put(b"image bytes")
+
+        self.assertTrue(is_ref(ref))
+        self.assertEqual(self.store.get_bytes(ref), b"image bytes")
+
+    def test_base64_and_bytes_share_a_blob(self):
+        """Test the same image is stored once whatever form it arrives in"""
+        raw = b"\x89PNG same picture"
+        first = self.store.put(raw)
+        second = self.store.put(base64.b64encode(raw).decode("utf-8"))
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.blob_count(), 1)
+
+    def test_materialize_replaces_references(self):
+        """Test payload messages get base64 while history keeps references"""
+        ref = self.store.put(b"pixels")
+        history = [
+            {"role": "system", "content": "Be brief."},
+            {"role": "user", "content": "what is this?", "images": [ref]},
+        ]
+
+        payload = self.store.materialize(history)
+
+        self.assertEqual(payload[1]["images"], [base64.b64encode(b"pixels").decode("utf-8")])
+        self.assertEqual(history[1]["images"], [ref])
+        self.assertIs(payload[0], history[0])
+
+    def test_inline_base64_passes_through(self):
+        """Test messages saved before references existed still work"""
+        inline = base64.b64encode(b"old image").decode("utf-8")
+
+        payload = self.store.materialize([{"role": "user", "content": "", "images": [inline]}])
+
+        self.assertEqual(payload[0]["images"], [inline])
+
+    def test_base64_cached(self):
+        """Test repeated payloads reuse the encoded string"""
+        ref = self.store.put(b"pixels")
+        first = self.store.get_base64(ref)
+        os.remove(self.store.path_for(ref))
+
+        self.assertIs(self.store.get_base64(ref), first)
+
+    def test_cache_is_bounded(self):
+        """Test the cache evicts old entries beyond its byte budget"""
+        store = AttachmentStore(os.path.join(self.tmpdir, "small"), cache_bytes=100)
+        refs = [store.put(bytes([i]) * 60) for i in range(3)]
+        for ref in refs:
+            store.get_base64(ref)
+
+        self.assertEqual(list(store.cache), refs[-1:])
+        self.assertLessEqual(store.cached_bytes, 100)
+
+
+def suite():
+    """Create test suite"""
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(TestAttachmentStore))
+    return suite
+
+
+if __name__ == '__main__':
+    print("Running Attachment Store Tests...")
+    print("=" * 60)
+
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite())
+
+    print("\n" + "=" * 60)
+    print(f"Tests run: {result.testsRun}")
+    print(f"Successes: {result.testsRun - len(result.failures) - len(result.errors)}")
+    print(f"Failures: {len(result.failures)}")
+    print(f"Errors: {len(result.errors)}")
+
+    sys.exit(0 if result.wasSuccessful() else 1)
@@ -0,0 +1,213 @@
+"""
+Unit Tests for the batch JSONL prompt runner
+"""
+
+import unittest
+import json
+import shutil
+import tempfile
+import threading
+import time
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from batch_chat import BatchRunner, completed_lines, split_messages, main
+from chat_engine import ChatEngine, DEFAULT_SYSTEM_PROMPT
+
+
+class FakeResponse:
+    """Streams the last user message back with Ollama-style final stats"""
+
+    status_code = 200
+    url = "http://fake/api/chat"
+
+    def __init__(self, payload, fail=False):
+        self.payload = payload
+        if fail:
+            self.status_code = 500
+        self.text = "boom"
+
+    def iter_lines(self):
+        content = self.payload["messages"][-1]["content"]
+        yield json.dumps({"message": {"content": content.upper()}, "done": False}).encode()
+        yield json.dumps({
+            "message": {"content": ""}, "done": True,
+            "prompt_eval_count": 7, "eval_count": 4, "eval_duration": 2e9,
+        }).encode()
+
+    def close(self):
+        pass
+
+
+class FakeClient:
+    """Answers chats after a short delay and tracks how many run at once"""
+
+    def __init__(self, delay=0.0, fail_on=()):
+        self.delay = delay
+        self.fail_on = fail_on
+        self.lock = threading.Lock()
+        self.running = 0
+        self.peak = 0
+        self.payloads = []
+
+    def chat(self, payload, stream=False, cancel=None):
+        with self.lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+            self.payloads.append(payload)
+        time.sleep(self.delay)
+        with self.lock:
+            self.running -= 1
+        return FakeResponse(payload, fail=payload["messages"][-1]["content"] in self.fail_on)
+
+
+class TestBatchRunner(unittest.TestCase):
+    """Test prompts are answered, recorded and resumed"""
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.input = os.path.join(self.dir, "prompts.jsonl")
+        self.output = os.path.join(self.dir, "results.jsonl")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def write_prompts(self, *lines):
+        with open(self.input, "w", encoding="utf-8") as f:
+            for line in lines:
+                f.write((line if isinstance(line, str) else json.dumps(line)) + "\n")
+
+    def results(self):
+        with open(self.output, encoding="utf-8") as f:
+            return [json.loads(line) for line in f]
+
+    def run_batch(self, client, concurrency=2, resume=True):
+        runner = BatchRunner(ChatEngine(client), concurrency=concurrency)
+        return runner.run(self.input, self.output, resume=resume)
+
+    def test_results_with_stats(self):
+        """Test every prompt gets a result line with latency and token stats"""
+        self.write_prompts({"prompt": "hi", "id": "a"}, {"messages": [{"role": "user", "content": "yo"}]})
+
+        counts = self.run_batch(FakeClient())
+
+        results = sorted(self.results(), key=lambda r: r["line"])
+        self.assertEqual(counts["done"], 2)
+        self.assertEqual([r["response"] for r in results], ["HI", "YO"])
+        self.assertEqual(results[0]["id"], "a")
+        self.assertEqual(results[0]["prompt_tokens"], 7)
+        self.assertEqual(results[0]["completion_tokens"], 4)
+        self.assertEqual(results[0]["tokens_per_s"], 2.0)
+        self.assertIsNotNone(results[0]["ttft_s"])
+        self.assertGreaterEqual(results[0]["latency_s"], results[0]["ttft_s"])
+
+    def test_concurrency_bounded(self):
+        """Test no more than concurrency prompts are in flight"""
+        self.write_prompts(*({"prompt": f"p{i}"} for i in range(8)))
+        client = FakeClient(delay=0.05)
+
+        self.run_batch(client, concurrency=3)
+
+        self.assertEqual(client.peak, 3)
+        self.assertEqual(len(self.results()), 8)
+
+    def test_invalid_lines_reported(self):
+        """Test unreadable lines get an error result instead of stopping the run"""
+        self.write_prompts("{not json", {"nothing": 1}, {"prompt": "ok"})
+
+        counts = self.run_batch(FakeClient())
+
+        errors = {r["line"]: r["error"] for r in self.results() if r["outcome"] == "error"}
+        self.assertEqual(sorted(errors), [1, 2])
+        self.assertEqual((counts["done"], counts["failed"]), (1, 2))
+
+    def test_resume_skips_completed(self):
+        """Test a rerun only answers prompts without a successful result"""
+        self.write_prompts({"prompt": "one"}, {"prompt": "two"}, {"prompt": "three"})
+        self.run_batch(FakeClient(fail_on=("two",)))
+        with open(self.output, "a", encoding="utf-8") as f:
+            f.write('{"line": 3, "outc')   # torn line from an interrupted run
+
+        client = FakeClient()
+        counts = self.run_batch(client)
+
+        self.assertEqual([p["messages"][-1]["content"] for p in client.payloads], ["two"])
+        self.assertEqual(counts["skipped"], 2)
+        self.assertEqual(completed_lines(self.output), {1, 2, 3})
+
+    def test_resume_records_invalid_lines_once(self):
+        """Test resuming twice does not write the same input error again"""
+        self.write_prompts("{not json", {"prompt": "ok"}, {"nothing": 1})
+        self.run_batch(FakeClient())
+
+        for _ in range(2):
+            counts = self.run_batch(FakeClient())
+            self.assertEqual(counts, {"done": 0, "failed": 0, "skipped": 3})
+
+        lines = sorted(r["line"] for r in self.results())
+        self.assertEqual(lines, [1, 2, 3])
+
+        self.write_prompts({"prompt": "fixed"}, {"prompt": "ok"}, {"nothing": 1})
+        counts = self.run_batch(FakeClient())
+        self.assertEqual((counts["done"], counts["skipped"]), (1, 2))
+
+    def test_no_resume_overwrites(self):
+        """Test --no-resume starts a fresh output file"""
+        self.write_prompts({"prompt": "one"})
+        self.run_batch(FakeClient())
+        self.run_batch(FakeClient(), resume=False)
+
+        self.assertEqual(len(self.results()), 1)
+
+    def test_system_message_split(self):
+        """Test a leading system message becomes the system prompt"""
+        system, history = split_messages({"messages": [
+            {"role": "system", "content": "Be terse."}, {"role": "user", "content": "Hi"},
+        ]})
+        self.assertEqual(system, "Be terse.")
+        self.assertEqual(history, [{"role": "user", "content": "Hi"}])
+        self.assertEqual(split_messages({"prompt": "Hi"})[0], DEFAULT_SYSTEM_PROMPT)
+
+    def test_options_passed_through(self):
+        """Test per-prompt model and options reach the request"""
+        self.write_prompts({"prompt": "hi", "model": "mistral", "options": {"seed": 42}})
+        client = FakeClient()
+
+        self.run_batch(client)
+
+        self.assertEqual(client.payloads[0]["model"], "mistral")
+        self.assertEqual(client.payloads[0]["options"]["seed"], 42)
+
+    def test_cli_reports_unreachable_server(self):
+        """Test the command line records a failure when Ollama cannot be reached"""
+        self.write_prompts({"prompt": "hi"})
+
+        code = main([self.input, "-o", self.output, "--hosts", "127.0.0.1:9", "--quiet"])
+
+        self.assertEqual(code, 1)
+        self.assertEqual(self.results()[0]["outcome"], "error")
+
+
+def suite():
+    """Create test suite"""
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(TestBatchRunner))
+    return suite
+
+
+if __name__ == '__main__':
+    print("Running Batch Chat Tests...")
+    print("=" * 60)
+
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite())
+
+    print("\n" + "=" * 60)
+    print(f"Tests run: {result.testsRun}")
+    print(f"Successes: {result.testsRun - len(result.failures) - len(result.errors)}")
+    print(f"Failures: {len(result.failures)}")
+    print(f"Errors: {len(result.errors)}")
+
+    sys.exit(0 if result.wasSuccessful() else 1)
@@ -0,0 +1,261 @@
+"""
+Unit Tests for the UI-free chat engine
+"""
+
+import unittest
+import json
+import sys
+import os
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from chat_engine import (
+    ChatEngine, TurnListener, DONE, CACHED, STOPPED, ERROR, STOPPED_NOTE, NO_RESPONSE
+)
+from ollama_client import CancelToken
+from response_cache import ResponseCache
+
+
+class FakeResponse:
+    """Just enough of requests.Response for the engine"""
+
+    def __init__(self, chunks=(), status_code=200, text=""):
+        self.chunks = chunks
+        self.status_code = status_code
+        self.text = text
+        self.url = "http://fake/api/chat"
+
+    def iter_lines(self):
+        for chunk in self.chunks:
+            yield json.dumps(chunk).encode("utf-8")
+
+    def json(self):
+        return {"message": {"content": "".join(c.get("message", {}).get("content", "") for c in self.chunks)}}
+
+    def close(self):
+        pass
+
+
+def answer(*pieces):
+    chunks = [{"message": {"content": p}, "done": False} for p in pieces]
+    return chunks + [{"message": {"content": ""}, "done": True, "eval_count": len(pieces)}]
+
+
+class FakeClient:
+    """Records payloads and answers every chat with the same response"""
+
+    def __init__(self, response):
+        self.response = response
+        self.payloads = []
+
+    def chat(self, payload, stream=False, cancel=None):
+        self.payloads.append(payload)
+        return self.response
+
+
+class FakePool(FakeClient):
+    """A host pool: chats go through request() with an affinity"""
+
+    def __init__(self, response):
+        super().__init__(response)
+        self.affinities = []
+
+    @contextmanager
+    def request(self, method, payload, stream=False, affinity=None, cancel=None):
+        self.affinities.append(affinity)
+        yield self.chat(payload, stream)
+
+
+class Recorder:
+    """A TurnListener that logs every event"""
+
+    def __init__(self):
+        self.events = []
+        names = ("status", "notice", "begin", "text", "end", "message")
+        self.listener = TurnListener(**{
+            name: (lambda *args, name=name: self.events.append((name,) + args)) for name in names
+        })
+
+    def of(self, name):
+        return [event[1:] for event in self.events if event[0] == name]
+
+
+class TestChatEngine(unittest.TestCase):
+    """Test turns run end to end without a UI"""
+
+    def run_turn(self, engine, history, **kwargs):
+        recorder = Recorder()
+        result = engine.run_turn(history, "llama2", listener=recorder.listener, **kwargs)
+        return result, recorder
+
+    def test_streamed_turn(self):
+        """Test fragments reach the listener and the reply joins the history"""
+        engine = ChatEngine(FakeClient(FakeResponse(answer("Hel", "lo"))))
+        history = [{"role": "user", "content": "Hi"}]
+        recorded = []
+
+        result, recorder = self.run_turn(engine, history, record=recorded.append)
+
+        self.assertEqual(result.outcome, DONE)
+        self.assertEqual(result.text, "Hello")
+        self.assertEqual(result.stats["eval_count"], 2)
+        self.assertEqual([e[0] for e in recorder.events], ["begin", "text", "text", "end"])
+        self.assertEqual(history[-1], {"role": "assistant", "content": "Hello"})
+        self.assertEqual(recorded, [history[-1]])
+
+    def test_payload(self):
+        """Test the payload carries the system prompt, history and options"""
+        client = FakeClient(FakeResponse(answer("ok")))
+        engine = ChatEngine(client)
+
+        self.run_turn(engine, [{"role": "user", "content": "Hi"}], system_prompt="Be brief.", temperature=0.2)
+
+        payload = client.payloads[0]
+        self.assertEqual(payload["messages"][0], {"role": "system", "content": "Be brief."})
+        self.assertEqual(payload["messages"][-1]["content"], "Hi")
+        self.assertEqual(payload["options"]["temperature"], 0.2)
+        self.assertIn("num_ctx", payload["options"])
+        self.assertTrue(payload["stream"])
+
+    def test_non_streamed_turn(self):
+        """Test a whole answer is passed as one message"""
+        engine = ChatEngine(FakeClient(FakeResponse(answer("Whole"))), stream=False)
+        history = [{"role": "user", "content": "Hi"}]
+
+        result, recorder = self.run_turn(engine, history)
+
+        self.assertEqual(result.text, "Whole")
+        self.assertEqual(recorder.of("message"), [("Whole", "assistant")])
+
+    def test_empty_answer(self):
+        """Test an answer without text is recorded as NO_RESPONSE"""
+        engine = ChatEngine(FakeClient(FakeResponse(answer())))
+        history = [{"role": "user", "content": "Hi"}]
+
+        result, recorder = self.run_turn(engine, history)
+
+        self.assertEqual(result.text, NO_RESPONSE)
+        self.assertEqual(recorder.of("message"), [(NO_RESPONSE, "assistant")])
+
+    def test_http_error(self):
+        """Test an error status is reported and the history left alone"""
+        engine = ChatEngine(FakeClient(FakeResponse(status_code=404, text="model not found")))
+        history = [{"role": "user", "content": "Hi"}]
+
+        result, recorder = self.run_turn(engine, history)
+
+        self.assertEqual(result.outcome, ERROR)
+        self.assertEqual(len(history), 1)
+        self.assertEqual(recorder.of("message"), [("Error 404: model not found", "system")])
+
+    def test_exception_reported(self):
+        """Test a failing request is reported instead of raised"""
+        class BrokenClient:
+            def chat(self, payload, stream=False, cancel=None):
+                raise OSError("connection refused")
+
+        result, recorder = self.run_turn(ChatEngine(BrokenClient()), [{"role": "user", "content": "Hi"}])
+
+        self.assertEqual(result.outcome, ERROR)
+        self.assertIn("connection refused", recorder.of("message")[0][0])
+
+    def test_cancelled_before_request(self):
+        """Test a cancelled turn sends nothing"""
+        client = FakeClient(FakeResponse(answer("late")))
+        cancel = CancelToken()
+        cancel.cancel()
+
+        result, _ = self.run_turn(ChatEngine(client), [{"role": "user", "content": "Hi"}], cancel=cancel)
+
+        self.assertEqual(result.outcome, STOPPED)
+        self.assertEqual(client.payloads, [])
+
+    def test_stopped_mid_stream(self):
+        """Test a stream stopped after some text keeps it with STOPPED_NOTE"""
+        cancel = CancelToken()
+        chunks = answer("Par", "tial")
+
+        class CancellingResponse(FakeResponse):
+            def iter_lines(self):
+                for i, line in enumerate(super().iter_lines()):
+                    if i == 1:
+                        cancel.cancel()
+                    yield line
+
+        engine = ChatEngine(FakeClient(CancellingResponse(chunks)))
+        history = [{"role": "user", "content": "Hi"}]
+        result, recorder = self.run_turn(engine, history, cancel=cancel)
+
+        self.assertEqual(result.outcome, STOPPED)
+        self.assertEqual(history[-1]["content"], f"Par\n\n{STOPPED_NOTE}")
+        self.assertEqual(recorder.of("end"), [(STOPPED_NOTE,)])
+
+    def test_cached_answer(self):
+        """Test a repeated prompt is answered from the response cache"""
+        client = FakeClient(FakeResponse(answer("Paris")))
+        cache = ResponseCache(None, allow_sampled=True)
+        engine = ChatEngine(client, response_cache=cache)
+
+        first = engine.ask([], "Capital of France?", "llama2", use_cache=True)
+        history = []
+        second = engine.ask(history, "Capital of France?", "llama2", use_cache=True)
+
+        self.assertEqual((first.outcome, second.outcome), (DONE, CACHED))
+        self.assertEqual(len(client.payloads), 1)
+        self.assertEqual([m["role"] for m in history], ["user", "assistant"])
+
+    def test_ask_records_both_messages(self):
+        """Test ask() appends and records the question and the answer"""
+        engine = ChatEngine(FakeClient(FakeResponse(answer("Hi!"))))
+        history, recorded = [], []
+
+        engine.ask(history, "Hello", "llama2", record=recorded.append)
+
+        self.assertEqual([m["content"] for m in recorded], ["Hello", "Hi!"])
+        self.assertEqual(history, recorded)
+
+    def test_pool_affinity(self):
+        """Test a host pool receives the chat key as affinity"""
+        pool = FakePool(FakeResponse(answer("ok")))
+
+        self.run_turn(ChatEngine(pool), [{"role": "user", "content": "Hi"}], key="chat-1")
+
+        self.assertEqual(pool.affinities, ["chat-1"])
+
+    def test_materialize_applied_to_payload_only(self):
+        """Test image references are resolved for the request, not in the history"""
+        client = FakeClient(FakeResponse(answer("A cat")))
+        engine = ChatEngine(
+            client,
+            materialize=lambda messages: [dict(m, images=["BASE64"]) if m.get("images") else m for m in messages],
+        )
+        history = [{"role": "user", "content": "What?", "images": ["sha256:abc"]}]
+
+        self.run_turn(engine, history)
+
+        self.assertEqual(client.payloads[0]["messages"][-1]["images"], ["BASE64"])
+        self.assertEqual(history[0]["images"], ["sha256:abc"])
+
+
+def suite():
+    """Create test suite"""
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(TestChatEngine))
+    return suite
+
+
+if __name__ == '__main__':
+    print("Running Chat Engine Tests...")
+    print("=" * 60)
+
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite())
+
+    print("\n" + "=" * 60)
+    print(f"Tests run: {result.testsRun}")
+    print(f"Successes: {result.testsRun - len(result.failures) - len(result.errors)}")
+    print(f"Failures: {len(result.failures)}")
+    print(f"Errors: {len(result.errors)}")
+
+    sys.exit(0 if result.wasSuccessful() else 1)
@@ -0,0 +1,109 @@
+"""
+Unit Tests for the recycled-row chat list model
+"""
+
+import unittest
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from chat_list import ChatListModel
+
+
+class Entry:
+    def __init__(self, entry_id, name=None):
+        self.id = entry_id
+        self.name = name or entry_id
+
+
+def entries(count):
+    return [Entry(f"chat{i}") for i in range(count)]
+
+
+class TestChatListModel(unittest.TestCase):
+    """Test the window of chats drawn in the sidebar"""
+
+    def test_visible_is_bounded_by_rows(self):
+        """Test only one pool's worth of entries is drawn"""
+        model = ChatListModel(rows=5)
+        model.set_entries(entries(1000))
+
+        self.assertEqual([e.id for e in model.visible()], [f"chat{i}" for i in range(5)])
+
+    def test_scroll_is_clamped(self):
+        """Test scrolling stops at both ends"""
+        model = ChatListModel(rows=5)
+        model.set_entries(entries(20))
+
+        model.scroll_by(100)
+        self.assertEqual(model.offset, 15)
+        self.assertEqual(model.visible()[-1].id, "chat19")
+
+        model.scroll_by(-100)
+        self.assertEqual(model.offset, 0)
+
+    def test_insert_at_top(self):
+        """Test a new chat appears first when viewing the top"""
+        model = ChatListModel(rows=3)
+        model.set_entries(entries(5))
+
+        model.insert(Entry("new"))
+
+        self.assertEqual(model.visible()[0].id, "new")
+
+    def test_insert_above_window_keeps_view(self):
+        """Test inserting above the scrolled window does not move the rows in view"""
+        model = ChatListModel(rows=3)
+        model.set_entries(entries(10))
+        model.scroll_to(4)
+        before = [e.id for e in model.visible()]
+
+        model.insert(Entry("new"))
+
+        self.assertEqual([e.id for e in model.visible()], before)
+
+    def test_remove(self):
+        """Test removing an entry by id"""
+        model = ChatListModel(rows=3)
+        model.set_entries(entries(4))
+        model.scroll_to(1)
+
+        self.assertTrue(model.remove("chat3"))
+        self.assertFalse(model.remove("missing"))
+
+        self.assertEqual(model.offset, 0)
+        self.assertEqual([e.id for e in model.visible()], ["chat0", "chat1", "chat2"])
+
+    def test_fractions(self):
+        """Test scrollbar fractions reflect the visible slice"""
+        model = ChatListModel(rows=10)
+        model.set_entries(entries(5))
+        self.assertEqual(model.fractions(), (0.0, 1.0))
+
+        model.set_entries(entries(100))
+        model.scroll_to(50)
+        self.assertEqual(model.fractions(), (0.5, 0.6))
+
+
+def suite():
+    """Create test suite"""
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(TestChatListModel))
+    return suite
+
+
+if __name__ == '__main__':
+    print("Running Chat List Tests...")
+    print("=" * 60)
+
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite())
+
+    print("\n" + "=" * 60)
+    print(f"Tests run: {result.testsRun}")
+    print(f"Successes: {result.testsRun - len(result.failures) - len(result.errors)}")
+    print(f"Failures: {len(result.failures)}")
+    print(f"Errors: {len(result.errors)}")
+
+    sys.exit(0 if result.wasSuccessful() else 1)
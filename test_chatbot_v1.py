@@ -108,7 +108,7 @@ class TestChatbotV1(unittest.TestCase):
         self.app.update_status("Test status")
         self.assertEqual(self.app.status_bar.cget("text"), "Test status")
     
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_check_ollama_connection_success(self, mock_get):
         """Test successful Ollama connection check"""
         mock_response = Mock()
@@ -125,7 +125,7 @@ class TestChatbotV1(unittest.TestCase):
         indicator_text = self.app.connection_indicator.cget("text")
         self.assertIn("Connected", indicator_text)
     
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_check_ollama_connection_failure(self, mock_get):
         """Test failed Ollama connection check"""
         mock_get.side_effect = Exception("Connection error")
@@ -9,6 +9,9 @@ from unittest.mock import Mock, patch, MagicMock, mock_open
 import sys
 import os
 import base64
+import shutil
+import tempfile
+from PIL import Image
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
@@ -61,16 +64,23 @@ class TestChatbotV2(unittest.TestCase):
         self.assertIn('content', self.app.attached_files[0])
     
     @patch('tkinter.filedialog.askopenfilename')
-    @patch('builtins.open', new_callable=mock_open, read_data=b'fake_image_data')
-    def test_attach_image(self, mock_file, mock_dialog):
+    def test_attach_image(self, mock_dialog):
         """Test image attachment"""
-        mock_dialog.return_value = '/path/to/test.jpg'
+        image_dir = tempfile.mkdtemp()
+        image_path = os.path.join(image_dir, 'test.jpg')
+        Image.new('RGB', (2000, 1500), 'red').save(image_path)
+        mock_dialog.return_value = image_path
         
         # Mock messagebox to not show dialog
         with patch('tkinter.messagebox.askyesno', return_value=False):
             self.app.attach_image()
+            # Wait for the worker pool, then run the queued UI update
+            self.app.image_preprocessor.executor.shutdown(wait=True)
+            self.app.ui_queue.drain()
+        shutil.rmtree(image_dir)
         
         self.assertEqual(len(self.app.attached_images), 1)
+        self.assertEqual(self.app.pending_images, 0)
         self.assertEqual(self.app.attached_images[0]['name'], 'test.jpg')
         self.assertIsNotNone(self.app.current_image_data)
     
@@ -9,11 +9,47 @@ from unittest.mock import Mock, patch, MagicMock, mock_open
 import sys
 import os
 import pickle
+import base64
+import shutil
+import tempfile
+from PIL import Image
 from datetime import datetime
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from chatbot_v3 import OllamaChatbotBlue, ChatSession
+from ollama_client import CancelToken
+from transcript_window import TranscriptWindow
+
+SESSION_DB_FILES = ("chat_sessions.db", "chat_sessions.db-wal", "chat_sessions.db-shm")
+CACHE_DB_FILES = ("response_cache.db", "response_cache.db-wal", "response_cache.db-shm")
+DATA_DIRS = ("attachments", "retrieval")
+
+
+def remove_session_db():
+    """Delete the SQLite session store so each test starts empty"""
+    for path in SESSION_DB_FILES:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def setUpModule():
+    """Keep any real session database, caches and attachments out of the way while testing"""
+    for path in SESSION_DB_FILES + CACHE_DB_FILES + DATA_DIRS:
+        if os.path.exists(path):
+            os.rename(path, path + ".backup")
+
+
+def tearDownModule():
+    remove_session_db()
+    for path in CACHE_DB_FILES:
+        if os.path.exists(path):
+            os.remove(path)
+    for path in DATA_DIRS:
+        shutil.rmtree(path, ignore_errors=True)
+    for path in SESSION_DB_FILES + CACHE_DB_FILES + DATA_DIRS:
+        if os.path.exists(path + ".backup"):
+            os.rename(path + ".backup", path)
 
 
 class TestChatSession(unittest.TestCase):
@@ -233,6 +269,125 @@ class TestChatbotV3Sessions(unittest.TestCase):
 
         self.assertEqual(self.app.current_session.id, first_chat_id)
 
+    def test_chat_list_rows_are_recycled(self):
+        """Test the sidebar keeps a fixed pool of rows however many chats exist"""
+        pool = list(self.app.chat_list.row_buttons)
+
+        for _ in range(30):
+            self.app.new_chat()
+
+        self.assertEqual(self.app.chat_list.row_buttons, pool)
+        self.assertEqual(self.app.chat_list.model.visible()[0].id, self.app.current_session.id)
+
+    def test_rename_and_delete_chat(self):
+        """Test renaming and deleting a single chat"""
+        self.app.new_chat()
+        sid = self.app.current_session.id
+
+        self.app.rename_chat(sid, "Holiday plans")
+        self.assertEqual(self.app.session_index[sid].name, "Holiday plans")
+        self.assertEqual(self.app.chat_list.row_buttons[0].cget("text"), "💬 Holiday plans")
+
+        self.app.delete_chat(sid)
+        self.assertNotIn(sid, self.app.session_index)
+        self.assertNotEqual(self.app.current_session.id, sid)
+
+    def test_search_jumps_to_message(self):
+        """Test a search hit opens its chat at the matching message"""
+        self.app.new_chat()
+        target = self.app.current_session
+        for i in range(200):
+            message = {"role": "user", "content": f"filler {i}"}
+            if i == 20:
+                message["content"] = "the quokka question"
+            target.messages.append(message)
+            self.app.record_message(target, message)
+        self.app.new_chat()
+
+        self.app.search_var.set("quokka")
+        self.app.run_search()
+        hit = self.app.search_results.model.entries[0]
+        self.app.open_search_hit(hit.id)
+
+        self.assertEqual(self.app.current_session.id, target.id)
+        highlighted = self.app.chat_display.get("search_hit.first", "search_hit.last")
+        self.assertIn("the quokka question", highlighted)
+
+    def test_search_hit_detaches_live_answer(self):
+        """Test opening a search hit in another chat stops the streaming answer rendering there"""
+        self.app.new_chat()
+        target = self.app.current_session
+        message = {"role": "user", "content": "the quokka question"}
+        target.messages.append(message)
+        self.app.record_message(target, message)
+
+        self.app.new_chat()
+        streaming = self.app.current_session.id
+        token = CancelToken()
+        self.app.generation = token
+        self.app.scheduler.busy = lambda sid: sid == streaming
+        self.app.update_send_button()
+        self.assertEqual(self.app.send_btn.cget("text"), "⏹")
+
+        self.app.search_var.set("quokka")
+        self.app.run_search()
+        self.app.open_search_hit(self.app.search_results.model.entries[0].id)
+        self.app.run_if_live(token, self.app.append_streamed_text, "leaked fragment")
+
+        self.assertEqual(self.app.current_session.id, target.id)
+        self.assertIsNone(self.app.generation)
+        self.assertNotIn("leaked fragment", self.app.chat_display.get("1.0", tk.END))
+        self.assertEqual(self.app.send_btn.cget("text"), "⬆️")
+
+    def test_stop_keeps_input_locked_until_worker_returns(self):
+        """Test Stop locks the input until the worker posts finish_generation"""
+        session = self.app.current_session
+        sent = len(session.messages)
+        token = CancelToken()
+        self.app.generation = token
+        self.app.scheduler.busy = lambda sid: sid == session.id
+        self.app.scheduler.stopping = lambda sid: token.cancelled
+        self.app.scheduler.cancel = lambda sid: token.cancel() or []
+
+        self.app.stop_generation()
+        self.app.input_box.insert(0, "too early")
+        self.app.send_message()
+
+        self.assertEqual(str(self.app.send_btn.cget("state")), tk.DISABLED)
+        self.assertEqual(self.app.input_box.get(), "too early")
+        self.assertEqual(len(session.messages), sent)
+
+        self.app.scheduler.busy = lambda sid: False
+        self.app.finish_generation(token)
+
+        self.assertEqual(str(self.app.send_btn.cget("state")), tk.NORMAL)
+        self.assertEqual(self.app.send_btn.cget("text"), "⬆️")
+        self.assertIn("Stopped", self.app.status_label.cget("text"))
+
+    def test_reopened_chat_shows_running_answer(self):
+        """Test a chat opened again mid-answer shows it thinking, then the answer once complete"""
+        self.app.new_chat()
+        answering = self.app.current_session
+        token = CancelToken()
+        self.app.generation = token
+        self.app.scheduler.busy = lambda sid: sid == answering.id and not token.cancelled
+        self.app.new_chat()
+        self.app.load_chat(answering.id)
+
+        self.assertIsNone(self.app.generation)
+        self.assertIn("Thinking...", self.app.chat_display.get("1.0", tk.END))
+
+        reply = {"role": "assistant", "content": "the background answer"}
+        answering.messages.append(reply)
+        self.app.record_message(answering, reply)
+        self.app.scheduler.busy = lambda sid: False
+        self.app.finish_generation(token, answering)
+
+        shown = self.app.chat_display.get("1.0", tk.END)
+        self.assertIn("the background answer", shown)
+        self.assertNotIn("Thinking...", shown)
+        self.assertEqual(self.app.send_btn.cget("text"), "⬆️")
+
     def test_load_nonexistent_chat(self):
         """Test loading a chat that doesn't exist"""
         current_session = self.app.current_session
@@ -243,6 +398,54 @@ class TestChatbotV3Sessions(unittest.TestCase):
         # Should still be on current session (no change)
         self.assertEqual(self.app.current_session, current_session)
 
+    def test_long_chat_renders_one_page(self):
+        """Test switching to a long chat only renders the newest page"""
+        self.app.current_session.messages = [
+            {"role": "user", "content": f"message {i}"} for i in range(1000)
+        ]
+
+        self.app.display_chat_history()
+
+        content = self.app.chat_display.get("1.0", tk.END)
+        self.assertIn("message 999", content)
+        self.assertNotIn("message 900\n", content)
+        self.assertEqual(len(self.app.transcript), self.app.transcript.page_size)
+
+        self.app.load_older_messages()
+
+        content = self.app.chat_display.get("1.0", tk.END)
+        self.assertIn("message 900\n", content)
+        self.assertLess(content.index("message 900\n"), content.index("message 999"))
+
+    def test_live_messages_trim_oldest_page(self):
+        """Test messages appended live drop the oldest rendered page past the cap"""
+        self.app.transcript = TranscriptWindow(page_size=5, max_rendered=10)
+        messages = self.app.current_session.messages = [
+            {"role": "user", "content": f"message {i}"} for i in range(10)
+        ]
+        self.app.display_chat_history()
+        self.app.load_older_messages()
+
+        def send(i):
+            self.app.display_message(f"message {i}", "user")
+            messages.append({"role": "user", "content": f"message {i}"})
+
+        send(10)
+        send(11)
+
+        content = self.app.chat_display.get("1.0", tk.END)
+        self.assertNotIn("message 4\n", content)
+        self.assertIn("message 5\n", content)
+        self.assertEqual(self.app.transcript.start, 5)
+
+        for i in range(12, 17):
+            send(i)
+
+        content = self.app.chat_display.get("1.0", tk.END)
+        self.assertNotIn("message 10\n", content)
+        self.assertIn("message 16\n", content)
+        self.assertEqual(sorted(self.app.message_marks()), list(range(11, 16)))
+
     def test_display_chat_history(self):
         """Test displaying chat history"""
         # Add messages to current session
@@ -304,6 +507,30 @@ class TestChatbotV3Messages(unittest.TestCase):
         self.assertIn("AI response", content)
         self.assertIn("Assistant:", content)
 
+    def test_display_message_reuses_tags(self):
+        """Test message tags are configured once, not per message"""
+        with patch.object(self.app.chat_display, 'tag_configure') as tag_configure:
+            for i in range(5):
+                self.app.display_message(f"Message {i}", "user")
+
+        tag_configure.assert_not_called()
+        self.assertEqual(self.app.chat_display.tag_cget("content_user", "lmargin1"), "55")
+
+    def test_bulk_render_marks_each_message(self):
+        """Test bulk rendering marks where every message starts"""
+        messages = [
+            {"role": "user", "content": "first"},
+            {"role": "assistant", "content": "two\nlines"},
+            {"role": "user", "content": "third"},
+        ]
+        self.app.chat_display.config(state=tk.NORMAL)
+        self.app.chat_display.delete("1.0", tk.END)
+        self.app.render_history_messages(0, messages)
+
+        for i, msg in enumerate(messages):
+            body = self.app.chat_display.get(f"msg_{i} +2l linestart", f"msg_{i} +2l lineend")
+            self.assertEqual(body, msg["content"].split("\n")[0])
+
     def test_message_adds_to_history(self):
         """Test that messages are added to session history"""
         initial_count = len(self.app.current_session.messages)
@@ -314,6 +541,19 @@ class TestChatbotV3Messages(unittest.TestCase):
         # This test documents the actual behavior
         # In real app, messages are added in send_message()
 
+    def test_images_stored_by_reference(self):
+        """Test sent images are kept in history as blob references"""
+        data = base64.b64encode(b"fake png").decode("utf-8")
+        self.app.attached_images = [{"name": "a.png", "data": data}]
+
+        with patch('threading.Thread'):
+            self.app.input_box.insert(0, "What is this?")
+            self.app.send_message()
+
+        ref = self.app.current_session.messages[-1]["images"][0]
+        self.assertTrue(ref.startswith("sha256:"))
+        self.assertEqual(self.app.attachments.get_base64(ref), data)
+
     def test_empty_message_handling(self):
         """Test that empty messages are not sent"""
         self.app.input_box.delete(0, tk.END)
@@ -335,9 +575,11 @@ class TestChatbotV3Persistence(unittest.TestCase):
         """Set up test fixtures"""
         if os.path.exists("chat_sessions.pkl"):
             os.rename("chat_sessions.pkl", "chat_sessions_backup.pkl")
+        remove_session_db()
 
     def tearDown(self):
         """Clean up after tests"""
+        remove_session_db()
         if os.path.exists("chat_sessions_backup.pkl"):
             if os.path.exists("chat_sessions.pkl"):
                 os.remove("chat_sessions.pkl")
@@ -396,6 +638,66 @@ class TestChatbotV3Persistence(unittest.TestCase):
 
         app.destroy()
 
+    def test_messages_persist_across_restart(self):
+        """Test messages are written to the store as they are sent"""
+        app = OllamaChatbotBlue()
+        app.withdraw()
+        session_id = app.current_session.id
+
+        with patch('threading.Thread'):
+            app.input_box.insert(0, "Remember this")
+            app.send_message()
+        app.destroy()
+
+        app = OllamaChatbotBlue()
+        app.withdraw()
+
+        self.assertEqual(app.current_session.id, session_id)
+        self.assertEqual(app.current_session.messages[-1]["content"], "Remember this")
+
+        app.destroy()
+
+    def test_sessions_loaded_on_demand(self):
+        """Test only the current chat's messages are read at startup"""
+        app = OllamaChatbotBlue()
+        app.withdraw()
+        first_id = app.current_session.id
+        with patch('threading.Thread'):
+            app.input_box.insert(0, "In the first chat")
+            app.send_message()
+        app.new_chat()
+        app.destroy()
+
+        app = OllamaChatbotBlue()
+        app.withdraw()
+
+        self.assertEqual(len(app.chat_sessions), 2)
+        self.assertEqual(app.chat_sessions[0].message_count, 1)
+        self.assertNotIn(first_id, app.session_cache)
+
+        app.load_chat(first_id)
+
+        self.assertIn(first_id, app.session_cache)
+        self.assertEqual(app.current_session.messages[0]["content"], "In the first chat")
+
+        app.destroy()
+
+    def test_pickle_migrated_once(self):
+        """Test the legacy pickle is imported on the first start only"""
+        with open("chat_sessions.pkl", "wb") as f:
+            pickle.dump([ChatSession(name="Old Chat", chat_id="old1")], f)
+
+        app = OllamaChatbotBlue()
+        app.withdraw()
+        app.destroy()
+
+        app = OllamaChatbotBlue()
+        app.withdraw()
+
+        self.assertEqual([s.name for s in app.chat_sessions], ["Old Chat"])
+
+        app.destroy()
+
 
 class TestChatbotV3Ticker(unittest.TestCase):
     """Test fun facts ticker"""
@@ -481,19 +783,27 @@ class TestChatbotV3Attachments(unittest.TestCase):
         self.assertEqual(self.app.attached_files[0]['name'], 'test.txt')
 
     @patch('tkinter.filedialog.askopenfilename')
-    @patch('builtins.open', new_callable=mock_open, read_data=b'fake_image_data')
+    @patch('tkinter.messagebox.askyesno', return_value=False)
     @patch('tkinter.messagebox.showinfo')
-    def test_attach_image(self, mock_msg, mock_file, mock_dialog):
-        """Test image attachment"""
-        mock_dialog.return_value = '/path/to/test.jpg'
+    def test_attach_image(self, mock_msg, mock_ask, mock_dialog):
+        """Test image attachment is resized in the background"""
+        image_dir = tempfile.mkdtemp()
+        image_path = os.path.join(image_dir, 'test.jpg')
+        Image.new('RGB', (4000, 3000), 'blue').save(image_path, quality=95)
+        mock_dialog.return_value = image_path
 
         self.app.attach_image()
+        # Wait for the worker pool, then run the queued UI update
+        self.app.image_preprocessor.executor.shutdown(wait=True)
+        self.app.ui_queue.drain()
+        shutil.rmtree(image_dir)
 
         self.assertEqual(len(self.app.attached_images), 1)
         self.assertEqual(self.app.attached_images[0]['name'], 'test.jpg')
+        self.assertEqual(self.app.pending_images, 0)
 
 
-@patch('requests.get')
+@patch('requests.Session.get')
 class TestChatbotV3Connection(unittest.TestCase):
     """Test Ollama connection checking"""
 
@@ -0,0 +1,186 @@
+"""
+Unit Tests for the token-budgeted context window manager
+"""
+
+import unittest
+from unittest.mock import patch
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import context_window
+from context_window import (
+    ContextWindow, estimate_tokens, IMAGE_TOKENS, MESSAGE_OVERHEAD_TOKENS,
+    SLIDING_WINDOW, PIN_FIRST, DROP_OLD_IMAGES,
+)
+
+
+def make_history(turns, words=50):
+    """Build a user/assistant history with numbered messages"""
+    messages = []
+    for i in range(turns):
+        messages.append({"role": "user", "content": f"question {i} " + "word " * words})
+        messages.append({"role": "assistant", "content": f"answer {i} " + "word " * words})
+    return messages
+
+
+class TestTokenEstimate(unittest.TestCase):
+    """Test the token estimator"""
+
+    def test_text_estimate(self):
+        """Test text costs about one token per four characters"""
+        message = {"role": "user", "content": "x" * 400}
+        self.assertEqual(estimate_tokens(message), 100 + MESSAGE_OVERHEAD_TOKENS)
+
+    def test_images_cost_fixed_tokens(self):
+        """Test each image adds a fixed patch-token cost"""
+        message = {"role": "user", "content": "", "images": ["a", "b"]}
+        self.assertEqual(estimate_tokens(message), 2 * IMAGE_TOKENS + MESSAGE_OVERHEAD_TOKENS)
+
+
+class TestContextWindow(unittest.TestCase):
+    """Test history selection strategies"""
+
+    def test_everything_fits(self):
+        """Test short histories are sent unchanged"""
+        window = ContextWindow()
+        history = make_history(3)
+
+        self.assertEqual(window.fit(history, "llama2"), history)
+
+    def test_num_ctx_per_model(self):
+        """Test context sizes are looked up by model family"""
+        window = ContextWindow(num_ctx_overrides={"phi": 1024})
+        self.assertEqual(window.num_ctx("mistral:7b"), 8192)
+        self.assertEqual(window.num_ctx("phi"), 1024)
+        self.assertEqual(window.num_ctx("unknown-model"), context_window.DEFAULT_NUM_CTX)
+
+    def test_unknown_strategy_rejected(self):
+        """Test an invalid strategy name raises ValueError"""
+        with self.assertRaises(ValueError):
+            ContextWindow(strategy="everything")
+
+    def test_sliding_window_keeps_newest(self):
+        """Test sliding window drops the oldest messages to fit the budget"""
+        window = ContextWindow(strategy=SLIDING_WINDOW, reserve_tokens=0,
+                               num_ctx_overrides={"tiny": 500})
+        history = make_history(20)
+
+        selected = window.fit(history, "tiny")
+
+        self.assertLess(len(selected), len(history))
+        self.assertIs(selected[-1], history[-1])
+        self.assertLessEqual(sum(estimate_tokens(m) for m in selected), 500)
+        self.assertEqual(selected, history[-len(selected):])
+
+    def test_newest_message_always_kept(self):
+        """Test an oversized newest message is still sent"""
+        window = ContextWindow(reserve_tokens=0, num_ctx_overrides={"tiny": 10})
+        history = [{"role": "user", "content": "x" * 1000}]
+
+        self.assertEqual(window.fit(history, "tiny"), history)
+
+    def test_pin_first_keeps_opening_turn(self):
+        """Test pin_first keeps the first exchange plus the newest messages"""
+        window = ContextWindow(strategy=PIN_FIRST, pinned_turns=1, reserve_tokens=0,
+                               num_ctx_overrides={"tiny": 500})
+        history = make_history(20)
+
+        selected = window.fit(history, "tiny")
+
+        self.assertIs(selected[0], history[0])
+        self.assertIs(selected[1], history[1])
+        self.assertIs(selected[-1], history[-1])
+        self.assertNotIn(history[2], selected)
+        self.assertLessEqual(sum(estimate_tokens(m) for m in selected), 500)
+
+    def test_drop_old_images_strips_before_sliding(self):
+        """Test old images are removed before any message is dropped"""
+        window = ContextWindow(strategy=DROP_OLD_IMAGES, reserve_tokens=0,
+                               num_ctx_overrides={"tiny": IMAGE_TOKENS + 400})
+        history = [
+            {"role": "user", "content": "first", "images": ["old"]},
+            {"role": "assistant", "content": "a cat"},
+            {"role": "user", "content": "second", "images": ["new"]},
+        ]
+
+        selected = window.fit(history, "tiny")
+
+        self.assertEqual(len(selected), 3)
+        self.assertNotIn("images", selected[0])
+        self.assertEqual(selected[2]["images"], ["new"])
+        # The stored history is never modified
+        self.assertEqual(history[0]["images"], ["old"])
+
+    def test_build_messages_prepends_system(self):
+        """Test build_messages puts the system prompt first"""
+        window = ContextWindow()
+        history = make_history(1)
+
+        payload = window.build_messages("Be brief.", history, "llama2")
+
+        self.assertEqual(payload[0], {"role": "system", "content": "Be brief."})
+        self.assertEqual(payload[1:], history)
+
+    def test_estimates_computed_once_per_message(self):
+        """Test only newly appended messages are estimated"""
+        window = ContextWindow()
+        history = make_history(50)
+        window.fit(history, "llama2")
+
+        history.append({"role": "user", "content": "one more"})
+        with patch("context_window.estimate_tokens", wraps=estimate_tokens) as spy:
+            window.fit(history, "llama2")
+
+        self.assertEqual(spy.call_count, 1)
+
+    def test_edited_history_is_recounted(self):
+        """Test replacing messages in the list resets the cache"""
+        window = ContextWindow(reserve_tokens=0, num_ctx_overrides={"tiny": 100})
+        history = [{"role": "user", "content": "x" * 40}]
+        window.fit(history, "tiny")
+
+        history[0] = {"role": "user", "content": "x" * 4000}
+        history.append({"role": "user", "content": "short"})
+
+        selected = window.fit(history, "tiny")
+
+        self.assertEqual(selected, history[-1:])
+
+    def test_invalidate_releases_history(self):
+        """Test an invalidated history is no longer held by the cache"""
+        window = ContextWindow()
+        kept, closed = make_history(4), make_history(4)
+        window.fit(kept, "llama2")
+        window.fit(closed, "llama2")
+
+        window.invalidate(closed)
+        window.invalidate(make_history(2))   # never fitted: nothing to drop
+
+        self.assertEqual(len(window.histories), 1)
+        self.assertIs(next(iter(window.histories.values())).messages, kept)
+
+
+def suite():
+    """Create test suite"""
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(TestTokenEstimate))
+    suite.addTest(unittest.makeSuite(TestContextWindow))
+    return suite
+
+
+if __name__ == '__main__':
+    print("Running Context Window Tests...")
+    print("=" * 60)
+
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite())
+
+    print("\n" + "=" * 60)
+    print(f"Tests run: {result.testsRun}")
+    print(f"Successes: {result.testsRun - len(result.failures) - len(result.errors)}")
+    print(f"Failures: {len(result.failures)}")
+    print(f"Errors: {len(result.errors)}")
+
+    sys.exit(0 if result.wasSuccessful() else 1)
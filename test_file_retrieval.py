@@ -0,0 +1,152 @@
+"""
+Unit Tests for chunking and retrieving attached files
+"""
+
+import unittest
+import shutil
+import tempfile
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from file_retrieval import FileRetriever, split_text, with_context
+
+WORDS = ["apple", "banana", "cherry", "invoice", "total", "python"]
+
+
+class FakeEmbedClient:
+    """Embeds text as counts of a few known words"""
+
+    def __init__(self):
+        self.calls = []
+
+    def embed(self, model, texts):
+        self.calls.append(list(texts))
+        return [[text.lower().count(w) + 0.01 for w in WORDS] for text in texts]
+
+
+class TestSplitText(unittest.TestCase):
+    """Test chunk boundaries and overlap"""
+
+    def test_short_text_single_chunk(self):
+        """Test text shorter than a chunk is kept whole"""
+        self.assertEqual(split_text("  hello world  ", size=100), ["hello world"])
+
+    def test_empty_text(self):
+        """Test empty files produce no chunks"""
+        self.assertEqual(split_text("   "), [])
+
+    def test_chunks_cover_text_with_overlap(self):
+        """Test chunks respect the size and repeat text from the previous chunk"""
+        text = " ".join(f"word{i}" for i in range(500))
+        chunks = split_text(text, size=200, overlap=50)
+
+        self.assertTrue(all(len(c) <= 200 for c in chunks))
+        self.assertIn("word0", chunks[0])
+        self.assertIn("word499", chunks[-1])
+        for previous, current in zip(chunks, chunks[1:]):
+            self.assertIn(current.split()[1], previous)
+
+    def test_prefers_paragraph_breaks(self):
+        """Test cuts fall on a paragraph break when one is near the end"""
+        text = "a" * 170 + "\n\n" + "b" * 100
+        self.assertEqual(split_text(text, size=200, overlap=0)[0], "a" * 170)
+
+
+class TestFileRetriever(unittest.TestCase):
+    """Test indexing and retrieving chunks per chat"""
+
+    def setUp(self):
+        self.client = FakeEmbedClient()
+        self.retriever = FileRetriever(self.client, chunk_size=60, overlap=0, top_k=2, batch_size=3)
+
+    def add_fruit_file(self):
+        paragraphs = ["apple apple apple pie", "banana bread banana", "cherry cherry tart",
+                      "invoice total due", "python code sample"]
+        return self.retriever.add_file("chat1", "notes.txt", "\n\n".join(p.ljust(50) for p in paragraphs))
+
+    def test_add_file_embeds_in_batches(self):
+        """Test chunks are embedded in batches of batch_size"""
+        count = self.add_fruit_file()
+
+        self.assertEqual(count, 5)
+        self.assertEqual([len(batch) for batch in self.client.calls], [3, 2])
+
+    def test_retrieve_most_relevant(self):
+        """Test the best matching chunks are returned first"""
+        self.add_fruit_file()
+        chunks = self.retriever.retrieve("chat1", "What was the invoice total?")
+
+        self.assertEqual(len(chunks), 2)
+        self.assertIn("invoice", chunks[0]["text"])
+        self.assertEqual(chunks[0]["name"], "notes.txt")
+
+    def test_small_index_skips_query_embedding(self):
+        """Test all chunks are used without embedding the question when they fit"""
+        self.retriever.add_file("chat1", "a.txt", "apple pie")
+        calls = len(self.client.calls)
+
+        self.assertEqual([c["text"] for c in self.retriever.retrieve("chat1", "apple?")], ["apple pie"])
+        self.assertEqual(len(self.client.calls), calls)
+
+    def test_chats_are_separate(self):
+        """Test files attached to one chat are not retrieved in another"""
+        self.add_fruit_file()
+
+        self.assertTrue(self.retriever.has_files("chat1"))
+        self.assertFalse(self.retriever.has_files("chat2"))
+        self.assertEqual(self.retriever.retrieve("chat2", "apple"), [])
+
+        self.retriever.discard("chat1")
+        self.assertFalse(self.retriever.has_files("chat1"))
+
+    def test_saved_index_reopened(self):
+        """Test a chat's files are found again by a new retriever on the same root"""
+        tmpdir = tempfile.mkdtemp()
+        try:
+            retriever = FileRetriever(self.client, root=tmpdir, chunk_size=60, overlap=0, top_k=2)
+            retriever.add_file("chat1", "fruit.txt", "cherry cherry tart".ljust(50) + "\n\n" + "apple pie")
+            retriever.close()
+
+            reopened = FileRetriever(self.client, root=tmpdir, top_k=1)
+            self.assertTrue(reopened.has_files("chat1"))
+            self.assertEqual(reopened.retrieve("chat1", "apple")[0]["text"], "apple pie")
+
+            reopened.discard("chat1")
+            self.assertFalse(os.path.exists(os.path.join(tmpdir, "chat1")))
+            self.assertFalse(FileRetriever(self.client, root=tmpdir).has_files("chat1"))
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_with_context(self):
+        """Test excerpts are appended to the system prompt"""
+        prompt = with_context("Be helpful.", [{"name": "a.txt", "text": "apple pie"}])
+
+        self.assertTrue(prompt.startswith("Be helpful."))
+        self.assertIn("--- a.txt ---\napple pie", prompt)
+        self.assertEqual(with_context("Be helpful.", []), "Be helpful.")
+
+
+def suite():
+    """Create test suite"""
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(TestSplitText))
+    suite.addTest(unittest.makeSuite(TestFileRetriever))
+    return suite
+
+
+if __name__ == '__main__':
+    print("Running File Retrieval Tests...")
+    print("=" * 60)
+
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite())
+
+    print("\n" + "=" * 60)
+    print(f"Tests run: {result.testsRun}")
+    print(f"Successes: {result.testsRun - len(result.failures) - len(result.errors)}")
+    print(f"Failures: {len(result.failures)}")
+    print(f"Errors: {len(result.errors)}")
+
+    sys.exit(0 if result.wasSuccessful() else 1)
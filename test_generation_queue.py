@@ -0,0 +1,228 @@
+"""
+Unit Tests for the per-chat generation queue
+"""
+
+import unittest
+import threading
+import sys
+import os
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from generation_queue import GenerationScheduler, ollama_num_parallel
+
+
+class Recorder:
+    """Jobs that log when they start and block until released"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = []
+        self.finished = []
+        self.release = {}
+        self.running = 0
+        self.peak = 0
+
+    def job(self, name, cancel=None):
+        with self.lock:
+            self.started.append(name)
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+            event = self.release.setdefault(name, threading.Event())
+        while not event.wait(0.01):
+            if cancel.cancelled:
+                break
+        with self.lock:
+            self.running -= 1
+            self.finished.append(name)
+
+    def let(self, *names):
+        with self.lock:
+            for name in names:
+                self.release.setdefault(name, threading.Event()).set()
+
+    def wait_started(self, count):
+        for _ in range(500):
+            with self.lock:
+                if len(self.started) >= count:
+                    return True
+            threading.Event().wait(0.01)
+        return False
+
+
+class TestGenerationScheduler(unittest.TestCase):
+    """Test ordering, concurrency limits and cancellation"""
+
+    def setUp(self):
+        self.recorder = Recorder()
+
+    def make(self, limit):
+        scheduler = GenerationScheduler(max_concurrent=limit)
+        self.addCleanup(scheduler.shutdown)
+        return scheduler
+
+    def drain(self, scheduler, *keys):
+        for _ in range(500):
+            if not any(scheduler.busy(key) for key in keys):
+                return
+            threading.Event().wait(0.01)
+        self.fail("jobs did not finish")
+
+    def test_one_job_per_chat_in_order(self):
+        """Test a chat's jobs run one at a time in the order sent"""
+        scheduler = self.make(4)
+        for name in ("a1", "a2", "a3"):
+            scheduler.submit("a", self.recorder.job, name)
+
+        self.assertTrue(self.recorder.wait_started(1))
+        self.assertEqual(scheduler.queued("a"), 2)
+        self.recorder.let("a1", "a2", "a3")
+        self.drain(scheduler, "a")
+
+        self.assertEqual(self.recorder.finished, ["a1", "a2", "a3"])
+        self.assertEqual(self.recorder.peak, 1)
+
+    def test_global_limit(self):
+        """Test no more than max_concurrent chats generate at once"""
+        scheduler = self.make(2)
+        for key in "abc":
+            scheduler.submit(key, self.recorder.job, key)
+
+        self.assertTrue(self.recorder.wait_started(2))
+        self.assertEqual(scheduler.counts(), (2, 1))
+        self.recorder.let("a", "b", "c")
+        self.drain(scheduler, *"abc")
+
+        self.assertEqual(self.recorder.peak, 2)
+        self.assertEqual(sorted(self.recorder.finished), ["a", "b", "c"])
+
+    def test_chats_served_in_arrival_order(self):
+        """Test a waiting chat is not overtaken by a busy chat's follow-ups"""
+        scheduler = self.make(1)
+        scheduler.submit("a", self.recorder.job, "a1")
+        scheduler.submit("a", self.recorder.job, "a2")
+        scheduler.submit("b", self.recorder.job, "b1")
+        self.recorder.let("a1", "a2", "b1")
+        self.drain(scheduler, "a", "b")
+
+        self.assertEqual(self.recorder.started, ["a1", "b1", "a2"])
+
+    def test_cancel_drops_queued_and_stops_running(self):
+        """Test cancel stops the running job and removes the queued ones"""
+        scheduler = self.make(1)
+        for name in ("a1", "a2", "a3"):
+            scheduler.submit("a", self.recorder.job, name)
+        self.assertTrue(self.recorder.wait_started(1))
+
+        dropped = scheduler.cancel("a")
+        self.drain(scheduler, "a")
+
+        self.assertEqual(len(dropped), 2)
+        self.assertEqual(self.recorder.started, ["a1"])
+
+    def test_stopping_until_job_returns(self):
+        """Test a cancelled job counts as stopping until its function returns"""
+        scheduler = self.make(1)
+        done = threading.Event()
+        returned = threading.Event()
+
+        def slow_stop(cancel=None):
+            cancel.event.wait(5)
+            done.wait(5)   # e.g. still recording the partial answer
+            returned.set()
+
+        scheduler.submit("a", slow_stop)
+        self.assertFalse(scheduler.stopping("a"))
+        scheduler.cancel("a")
+
+        self.assertTrue(scheduler.stopping("a"))
+        self.assertTrue(scheduler.busy("a"))
+        done.set()
+        self.drain(scheduler, "a")
+        self.assertTrue(returned.is_set())
+        self.assertFalse(scheduler.stopping("a"))
+
+    def test_chat_job_preempts_background(self):
+        """Test a chat job waiting for the slot cancels background work, which runs again later"""
+        scheduler = self.make(1)
+        runs = []
+
+        def background(cancel=None):
+            runs.append(cancel)
+            self.recorder.job("bg", cancel)
+
+        scheduler.submit_background(background)
+        self.assertTrue(self.recorder.wait_started(1))
+        scheduler.submit("a", self.recorder.job, "a1")
+        self.assertTrue(self.recorder.wait_started(2))
+
+        self.assertTrue(runs[0].cancelled)
+        self.assertEqual(self.recorder.started, ["bg", "a1"])
+        self.recorder.let("a1", "bg")
+        self.drain(scheduler, "a")
+        for _ in range(500):
+            if len(self.recorder.finished) == 3:
+                break
+            threading.Event().wait(0.01)
+
+        self.assertEqual(self.recorder.started, ["bg", "a1", "bg"])
+        self.assertFalse(runs[1].cancelled)
+
+    def test_failing_job_frees_slot(self):
+        """Test an exception in a job does not block the chat's next job"""
+        scheduler = self.make(1)
+
+        def fail(cancel=None):
+            raise RuntimeError("boom")
+
+        with patch("traceback.print_exc"):
+            scheduler.submit("a", fail)
+            scheduler.submit("a", self.recorder.job, "a2")
+            self.recorder.let("a2")
+            self.drain(scheduler, "a")
+
+        self.assertEqual(self.recorder.finished, ["a2"])
+
+    def test_on_change_reports_counts(self):
+        """Test on_change sees the queue grow and empty again"""
+        seen = []
+        scheduler = GenerationScheduler(max_concurrent=1, on_change=lambda *counts: seen.append(counts))
+        self.addCleanup(scheduler.shutdown)
+        scheduler.submit("a", self.recorder.job, "a1")
+        scheduler.submit("a", self.recorder.job, "a2")
+        self.recorder.let("a1", "a2")
+        self.drain(scheduler, "a")
+
+        self.assertIn((1, 1), seen)
+        self.assertEqual(seen[-1], (0, 0))
+
+    def test_num_parallel_from_environment(self):
+        """Test the default limit follows OLLAMA_NUM_PARALLEL"""
+        with patch.dict(os.environ, {"OLLAMA_NUM_PARALLEL": "3"}):
+            self.assertEqual(ollama_num_parallel(), 3)
+        with patch.dict(os.environ, {"OLLAMA_NUM_PARALLEL": "lots"}):
+            self.assertEqual(ollama_num_parallel(), 1)
+
+
+def suite():
+    """Create test suite"""
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(TestGenerationScheduler))
+    return suite
+
+
+if __name__ == '__main__':
+    print("Running Generation Queue Tests...")
+    print("=" * 60)
+
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite())
+
+    print("\n" + "=" * 60)
+    print(f"Tests run: {result.testsRun}")
+    print(f"Successes: {result.testsRun - len(result.failures) - len(result.errors)}")
+    print(f"Failures: {len(result.failures)}")
+    print(f"Errors: {len(result.errors)}")
+
+    sys.exit(0 if result.wasSuccessful() else 1)
@@ -0,0 +1,237 @@
+"""
+Unit Tests for spreading requests over several Ollama hosts
+"""
+
+import unittest
+import json
+import socket
+import threading
+import time
+import sys
+import os
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import Mock, patch
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import host_pool
+from host_pool import OllamaHostPool, configured_hosts
+from ollama_client import OllamaError
+
+
+class HostHandler(BaseHTTPRequestHandler):
+    """Answers /api/tags, /api/chat and /api/generate with the serving port"""
+
+    protocol_version = "HTTP/1.1"
+
+    def send_json(self, data):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.send_json({"models": [{"name": f"model-{self.server.server_port}"}]})
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_json({
+            "message": {"role": "assistant", "content": str(self.server.server_port)},
+            "load_duration": 5e8,
+            "done": True,
+        })
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(port=0):
+    server = ThreadingHTTPServer(("127.0.0.1", port), HostHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def free_port():
+    """A local port with nothing listening on it"""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def served_by(response):
+    return int(response.json()["message"]["content"])
+
+
+class TestHostPool(unittest.TestCase):
+    """Test host selection, affinity, ejection and re-admission"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.servers = [start_server(), start_server()]
+        cls.ports = [s.server_port for s in cls.servers]
+
+    @classmethod
+    def tearDownClass(cls):
+        for server in cls.servers:
+            server.shutdown()
+            server.server_close()
+
+    def make_pool(self, ports, **kwargs):
+        pool = OllamaHostPool([f"127.0.0.1:{port}" for port in ports], **kwargs)
+        self.addCleanup(pool.close)
+        return pool
+
+    def test_configured_hosts(self):
+        """Test hosts come from the argument, then OLLAMA_HOSTS, then OLLAMA_HOST"""
+        self.assertEqual(configured_hosts("a:1, b:2,a:1"), ["http://a:1", "http://b:2"])
+        with patch.dict(os.environ, {"OLLAMA_HOSTS": "c:3,d:4"}):
+            self.assertEqual(configured_hosts(), ["http://c:3", "http://d:4"])
+        with patch.dict(os.environ, {"OLLAMA_HOSTS": "", "OLLAMA_HOST": "e:5"}):
+            self.assertEqual(configured_hosts(), ["http://e:5"])
+
+    def test_least_outstanding(self):
+        """Test a new request goes to the host with fewer requests in flight"""
+        pool = self.make_pool(self.ports)
+        with pool.lease() as busy:
+            response = pool.chat({"model": "m", "messages": []})
+
+        self.assertNotEqual(served_by(response), int(busy.base_url.rsplit(":", 1)[1]))
+
+    def test_requests_spread_over_hosts(self):
+        """Test chats without history are spread evenly"""
+        pool = self.make_pool(self.ports)
+        counts = {port: 0 for port in self.ports}
+        for i in range(6):
+            with pool.request("chat", {"model": "m"}, affinity=f"chat-{i}") as response:
+                counts[served_by(response)] += 1
+
+        self.assertEqual(list(counts.values()), [3, 3])
+
+    def test_affinity_sticks(self):
+        """Test a chat keeps using its host even when the other one is idle"""
+        pool = self.make_pool(self.ports)
+        first = served_by(pool.chat({"model": "m"}, affinity="chat"))
+        with pool.request("chat", {"model": "m"}, affinity="chat"):
+            second = served_by(pool.chat({"model": "m"}, affinity="chat"))
+
+        self.assertEqual(first, second)
+
+    def test_failover_and_ejection(self):
+        """Test an unreachable host is skipped, then ejected after repeated failures"""
+        dead = free_port()
+        pool = self.make_pool([dead, self.ports[0]], retry_interval=60)
+        for i in range(3):
+            self.assertEqual(served_by(pool.chat({"model": "m"}, affinity=f"c{i}")), self.ports[0])
+
+        self.assertEqual(pool.healthy_count(), 1)
+        self.assertFalse(pool.nodes[0].healthy)
+
+    def test_affinity_moves_off_ejected_host(self):
+        """Test a chat bound to an ejected host moves to a healthy one"""
+        dead = free_port()
+        pool = self.make_pool([dead, self.ports[0]], max_failures=1, retry_interval=60)
+        pool.affinity["chat"] = pool.nodes[0]
+
+        self.assertEqual(served_by(pool.chat({"model": "m"}, affinity="chat")), self.ports[0])
+        self.assertIs(pool.affinity["chat"], pool.nodes[1])
+
+    def test_readmitted_after_recovery(self):
+        """Test an ejected host is probed and re-admitted once it answers"""
+        port = free_port()
+        pool = self.make_pool([port, self.ports[0]], max_failures=1, retry_interval=0)
+        pool.check_health()
+        self.assertFalse(pool.nodes[0].healthy)
+
+        server = start_server(port)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        for _ in range(200):
+            pool.chat({"model": "m"})   # selecting a host schedules the probe
+            if pool.nodes[0].healthy:
+                break
+            time.sleep(0.01)
+
+        self.assertTrue(pool.nodes[0].healthy)
+
+    def test_all_hosts_down_raises(self):
+        """Test a request fails once every host was tried"""
+        pool = self.make_pool([free_port(), free_port()])
+
+        with self.assertRaises(requests.ConnectionError):
+            pool.chat({"model": "m"})
+
+    def test_load_model_on_every_host(self):
+        """Test warming a model loads it on each healthy host"""
+        pool = self.make_pool(self.ports)
+
+        self.assertEqual(pool.load_model("m"), 0.5)
+        self.assertEqual(pool.pool_stats()["requests"], 2)
+
+    def test_load_model_skips_failing_hosts(self):
+        """Test a host that errors or cannot be reached does not stop the others loading"""
+        pool = self.make_pool([free_port(), self.ports[0], self.ports[1]])
+        pool.nodes[1].client.load_model = Mock(side_effect=OllamaError("model not found"))
+
+        with patch("builtins.print") as log:
+            self.assertEqual(pool.load_model("m"), 0.5)
+
+        logged = " ".join(str(call.args[0]) for call in log.call_args_list)
+        self.assertIn(pool.nodes[0].base_url, logged)
+        self.assertIn(pool.nodes[1].base_url, logged)
+        self.assertEqual(pool.nodes[0].failures, 1)
+        self.assertEqual(pool.nodes[1].failures, 0)
+
+        pool.nodes[2].client.load_model = Mock(side_effect=requests.HTTPError("503"))
+        with patch("builtins.print"), self.assertRaises(OllamaError) as raised:
+            pool.load_model("m")
+        self.assertIn(pool.nodes[2].base_url, str(raised.exception))
+
+    def test_list_models_merged(self):
+        """Test models from all hosts are listed once"""
+        pool = self.make_pool(self.ports)
+
+        self.assertEqual(pool.list_models(), [f"model-{port}" for port in self.ports])
+
+    def test_keep_alive_applies_to_all_hosts(self):
+        """Test setting keep_alive on the pool reaches every host client"""
+        pool = self.make_pool(self.ports)
+        pool.keep_alive = "2h"
+
+        self.assertEqual([n.client.keep_alive for n in pool.nodes], ["2h", "2h"])
+
+    def test_affinities_bounded(self):
+        """Test old chat bindings are dropped past MAX_AFFINITIES"""
+        pool = self.make_pool(self.ports)
+        with patch.object(host_pool, "MAX_AFFINITIES", 2):
+            for chat in ("a", "b", "c"):
+                with pool.lock:
+                    pool.pick(chat)
+
+        self.assertEqual(list(pool.affinity), ["b", "c"])
+
+
+def suite():
+    """Create test suite"""
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(TestHostPool))
+    return suite
+
+
+if __name__ == '__main__':
+    print("Running Host Pool Tests...")
+    print("=" * 60)
+
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite())
+
+    print("\n" + "=" * 60)
+    print(f"Tests run: {result.testsRun}")
+    print(f"Successes: {result.testsRun - len(result.failures) - len(result.errors)}")
+    print(f"Failures: {len(result.failures)}")
+    print(f"Errors: {len(result.errors)}")
+
+    sys.exit(0 if result.wasSuccessful() else 1)
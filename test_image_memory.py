@@ -0,0 +1,225 @@
+"""
+Unit Tests for dropping and describing images from older turns
+"""
+
+import unittest
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from unittest.mock import Mock
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from generation_queue import GenerationScheduler
+from image_memory import ImageDescriber, ImagePolicy, image_key
+from session_store import SessionStore
+
+
+def turns(*images):
+    """One user turn per entry (a list of images or None), each followed by a reply"""
+    messages = []
+    for i, imgs in enumerate(images):
+        message = {"role": "user", "content": f"question {i}"}
+        if imgs:
+            message["images"] = list(imgs)
+        messages.append(message)
+        messages.append({"role": "assistant", "content": f"answer {i}"})
+    return messages
+
+
+class TestImagePolicy(unittest.TestCase):
+    """Test which turns keep their images"""
+
+    def test_recent_turns_keep_images(self):
+        """Test images in the last keep_turns user turns are sent unchanged"""
+        messages = turns(["a"], ["b"], ["c"])
+        payload = ImagePolicy(keep_turns=2).apply(messages)
+
+        self.assertNotIn("images", payload[0])
+        self.assertEqual(payload[2]["images"], ["b"])
+        self.assertEqual(payload[4]["images"], ["c"])
+
+    def test_old_images_replaced_by_description(self):
+        """Test a dropped image leaves its cached description in the text"""
+        policy = ImagePolicy(keep_turns=1, describe={"a": "A red bicycle."}.get)
+        payload = policy.apply(turns(["a", "z"], ["b"]))
+
+        self.assertEqual(
+            payload[0]["content"],
+            "question 0\n\n[Earlier image: A red bicycle.]\n\n[Earlier image omitted]",
+        )
+        self.assertEqual(payload[2]["images"], ["b"])
+
+    def test_history_not_modified(self):
+        """Test apply never changes the stored messages"""
+        messages = turns(["a"], ["b"])
+        ImagePolicy(keep_turns=1).apply(messages)
+
+        self.assertEqual(messages[0], {"role": "user", "content": "question 0", "images": ["a"]})
+
+    def test_short_history_kept(self):
+        """Test nothing is dropped while there are fewer user turns than keep_turns"""
+        messages = [{"role": "system", "content": "sys"}] + turns(["a"])
+        self.assertEqual(ImagePolicy(keep_turns=3).apply(messages), messages)
+
+    def test_zero_keeps_no_images(self):
+        """Test keep_turns=0 drops every image"""
+        payload = ImagePolicy(keep_turns=0).apply(turns(["a"]))
+        self.assertNotIn("images", payload[0])
+
+
+class TestImageDescriber(unittest.TestCase):
+    """Test descriptions are requested once and cached"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.client = Mock()
+        self.client.generate.return_value.json.return_value = {"response": " A  cat\non a mat. "}
+        self.scheduler = GenerationScheduler(max_concurrent=1)
+
+    def tearDown(self):
+        self.scheduler.shutdown()
+        shutil.rmtree(self.tmpdir)
+
+    def describer(self, **kwargs):
+        return ImageDescriber(self.client, scheduler=self.scheduler, **kwargs)
+
+    def wait_described(self, describer):
+        for _ in range(500):
+            with describer.lock:
+                if not describer.pending:
+                    return
+            threading.Event().wait(0.01)
+        self.fail("descriptions did not finish")
+
+    def test_describe_caches_result(self):
+        """Test a description is requested from the model and cached by image"""
+        describer = ImageDescriber(self.client, resolve=lambda ref: "BASE64")
+
+        self.assertIsNone(describer.get("sha256:abc"))
+        self.assertEqual(describer.describe("sha256:abc", "llava"), "A cat on a mat.")
+        self.assertEqual(describer.get("sha256:abc"), "A cat on a mat.")
+
+        payload = self.client.generate.call_args[0][0]
+        self.assertEqual(payload["model"], "llava")
+        self.assertEqual(payload["images"], ["BASE64"])
+        self.assertFalse(payload["stream"])
+
+    def test_describe_later_runs_once_per_image(self):
+        """Test queued descriptions skip images already described"""
+        describer = self.describer(keep_turns=1)
+
+        describer.describe_later(turns(["img"]), "llava")
+        self.wait_described(describer)
+        describer.describe_later(turns(["a"], ["img"]), "llava")
+        self.wait_described(describer)
+
+        self.assertEqual(self.client.generate.call_count, 1)
+        self.assertEqual(describer.get("img"), "A cat on a mat.")
+
+    def test_only_leaving_turn_described(self):
+        """Test only the images about to drop out of keep_turns are described"""
+        describer = self.describer(keep_turns=2)
+
+        describer.describe_later(turns(["old"], ["leaving"], ["kept"]), "llava")
+        self.wait_described(describer)
+        describer.describe_later(turns(["first"]), "llava")
+        self.wait_described(describer)
+
+        self.assertEqual(self.client.generate.call_count, 1)
+        self.assertEqual(describer.get("leaving"), "A cat on a mat.")
+        self.assertIsNone(describer.get("kept"))
+        self.assertIsNone(describer.get("old"))
+
+    def test_text_models_not_asked_to_describe(self):
+        """Test a turn answered by a text-only model is described by the vision model"""
+        describer = self.describer(keep_turns=1)
+
+        describer.describe_later(turns(["img"]), "llama2")
+        self.wait_described(describer)
+
+        self.assertEqual(self.client.generate.call_args[0][0]["model"], "llava")
+
+        describer = self.describer(keep_turns=1, model="moondream")
+        describer.describe_later(turns(["other"]), "llava:13b")
+        self.wait_described(describer)
+
+        self.assertEqual(self.client.generate.call_args[0][0]["model"], "llava:13b")
+
+    def test_failed_description_not_retried(self):
+        """Test an image whose description failed is not requested after every reply"""
+        self.client.generate.side_effect = ConnectionError("model not found")
+        describer = self.describer(keep_turns=1)
+
+        describer.describe_later(turns(["img"]), "llava")
+        self.wait_described(describer)
+        describer.describe_later(turns(["img"]), "llava")
+        self.wait_described(describer)
+
+        self.assertEqual(self.client.generate.call_count, 1)
+        self.assertIsNone(describer.get("img"))
+
+    def test_descriptions_wait_for_chat_turns(self):
+        """Test a description does not start while a chat's answer waits for the slot"""
+        chat_running = threading.Event()
+        release = threading.Event()
+        order = []
+
+        def answer(name, cancel=None):
+            order.append(name)
+            chat_running.set()
+            release.wait(5)
+
+        self.client.generate.side_effect = lambda *args, **kwargs: order.append("describe") or Mock(
+            json=Mock(return_value={"response": "A cat."})
+        )
+        describer = self.describer(keep_turns=1)
+        self.scheduler.submit("chat", answer, "first")
+        self.assertTrue(chat_running.wait(5))
+        describer.describe_later(turns(["img"]), "llava")
+        self.scheduler.submit("chat", answer, "second")
+        release.set()
+        self.wait_described(describer)
+
+        self.assertEqual(order, ["first", "second", "describe"])
+
+    def test_descriptions_persist_in_store(self):
+        """Test descriptions saved in the session store survive a restart"""
+        store = SessionStore(os.path.join(self.tmpdir, "chat.db"))
+        try:
+            ImageDescriber(self.client, store=store).describe("sha256:abc", "llava")
+            self.assertEqual(ImageDescriber(Mock(), store=store).get("sha256:abc"), "A cat on a mat.")
+        finally:
+            store.close()
+
+    def test_inline_images_keyed_by_hash(self):
+        """Test inline base64 images get a stable key"""
+        self.assertEqual(image_key("sha256:abc"), "sha256:abc")
+        self.assertEqual(image_key("QUJD"), image_key("QUJD"))
+        self.assertNotEqual(image_key("QUJD"), image_key("QUJE"))
+
+
+def suite():
+    """Create test suite"""
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(TestImagePolicy))
+    suite.addTest(unittest.makeSuite(TestImageDescriber))
+    return suite
+
+
+if __name__ == '__main__':
+    print("Running Image Memory Tests...")
+    print("=" * 60)
+
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite())
+
+    print("\n" + "=" * 60)
+    print(f"Tests run: {result.testsRun}")
+    print(f"Successes: {result.testsRun - len(result.failures) - len(result.errors)}")
+    print(f"Failures: {len(result.failures)}")
+    print(f"Errors: {len(result.errors)}")
+
+    sys.exit(0 if result.wasSuccessful() else 1)
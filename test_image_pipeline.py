@@ -0,0 +1,164 @@
+"""
+Unit Tests for the image preprocessing pipeline
+"""
+
+import unittest
+import base64
+import io
+import shutil
+import tempfile
+import sys
+import os
+
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from image_pipeline import (
+    prepare_image, image_size_for, savings_text, ImagePreprocessor, DEFAULT_IMAGE_SIZE,
+)
+
+
+def image_bytes(size=(3000, 2000), mode="RGB", fmt="JPEG", **save_args):
+    img = Image.new(mode, size, "red" if mode == "RGB" else (255, 0, 0, 128))
+    out = io.BytesIO()
+    img.save(out, format=fmt, **save_args)
+    return out.getvalue()
+
+
+def decode(prepared):
+    return Image.open(io.BytesIO(base64.b64decode(prepared["data"])))
+
+
+class TestPrepareImage(unittest.TestCase):
+    """Test resizing, metadata stripping and re-encoding"""
+
+    def test_downscales_to_model_size(self):
+        """Test the longest side is reduced and the aspect ratio kept"""
+        prepared = prepare_image(image_bytes((3000, 2000)), max_side=672)
+
+        self.assertEqual((prepared["width"], prepared["height"]), (672, 448))
+        self.assertEqual(decode(prepared).size, (672, 448))
+        self.assertLess(prepared["encoded_bytes"], prepared["original_bytes"])
+
+    def test_strips_exif(self):
+        """Test EXIF metadata is not sent to the model"""
+        exif = Image.Exif()
+        exif[0x010F] = "PhoneMaker"   # Make
+        raw = image_bytes((400, 300), exif=exif.tobytes())
+
+        prepared = prepare_image(raw, max_side=672)
+
+        self.assertNotIn("exif", decode(prepared).info)
+
+    def test_applies_exif_orientation(self):
+        """Test rotated phone photos come out upright"""
+        exif = Image.Exif()
+        exif[0x0112] = 6   # rotate 90 degrees clockwise
+        raw = image_bytes((400, 200), exif=exif.tobytes())
+
+        prepared = prepare_image(raw, max_side=672)
+
+        self.assertEqual((prepared["width"], prepared["height"]), (200, 400))
+
+    def test_transparency_kept_as_png(self):
+        """Test images with alpha are re-encoded as PNG"""
+        prepared = prepare_image(image_bytes((1000, 1000), mode="RGBA", fmt="PNG"), max_side=500)
+
+        img = decode(prepared)
+        self.assertEqual(img.format, "PNG")
+        self.assertEqual(img.mode, "RGBA")
+
+    def test_quality_is_configurable(self):
+        """Test lower quality gives smaller output"""
+        noise = Image.effect_noise((800, 800), 64).convert("RGB")
+        out = io.BytesIO()
+        noise.save(out, format="JPEG", quality=95)
+
+        high = prepare_image(out.getvalue(), max_side=800, quality=90)
+        low = prepare_image(out.getvalue(), max_side=800, quality=30)
+
+        self.assertLess(low["encoded_bytes"], high["encoded_bytes"])
+
+    def test_small_image_not_inflated(self):
+        """Test small images without metadata are passed through when smaller"""
+        raw = image_bytes((64, 64), fmt="PNG")
+
+        prepared = prepare_image(raw, max_side=672)
+
+        self.assertEqual(prepared["encoded_bytes"], len(raw))
+
+    def test_reads_path(self):
+        """Test images can be prepared from a file path"""
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, "photo.jpg")
+            with open(path, "wb") as f:
+                f.write(image_bytes())
+
+            prepared = prepare_image(path)
+
+            self.assertEqual(prepared["name"], "photo.jpg")
+            self.assertEqual(max(prepared["width"], prepared["height"]), DEFAULT_IMAGE_SIZE)
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_not_an_image(self):
+        """Test unreadable data raises"""
+        with self.assertRaises(Exception):
+            prepare_image(b"not an image")
+
+    def test_model_sizes_and_savings_text(self):
+        """Test per-model sizes and the savings summary"""
+        self.assertEqual(image_size_for("bakllava:7b"), 336)
+        self.assertEqual(image_size_for("unknown"), DEFAULT_IMAGE_SIZE)
+        self.assertEqual(image_size_for("llava", {"llava": 448}), 448)
+        self.assertEqual(
+            savings_text({"original_bytes": 5 * 1024 * 1024, "encoded_bytes": 2048}),
+            "5.0 MB → 2.0 KB",
+        )
+
+
+class TestImagePreprocessor(unittest.TestCase):
+    """Test the background worker pool"""
+
+    def test_callback_receives_result(self):
+        """Test the callback is called with the finished future"""
+        tmpdir = tempfile.mkdtemp()
+        path = os.path.join(tmpdir, "photo.jpg")
+        with open(path, "wb") as f:
+            f.write(image_bytes((2000, 1000)))
+        done = []
+        preprocessor = ImagePreprocessor(quality=70)
+
+        future = preprocessor.submit(path, "bakllava", done.append)
+        result = future.result(timeout=10)
+        preprocessor.executor.shutdown(wait=True)
+        shutil.rmtree(tmpdir)
+
+        self.assertEqual(done, [future])
+        self.assertEqual(result["width"], 336)
+
+
+def suite():
+    """Create test suite"""
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(TestPrepareImage))
+    suite.addTest(unittest.makeSuite(TestImagePreprocessor))
+    return suite
+
+
+if __name__ == '__main__':
+    print("Running Image Pipeline Tests...")
+    print("=" * 60)
+
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite())
+
+    print("\n" + "=" * 60)
+    print(f"Tests run: {result.testsRun}")
+    print(f"Successes: {result.testsRun - len(result.failures) - len(result.errors)}")
+    print(f"Failures: {len(result.failures)}")
+    print(f"Errors: {len(result.errors)}")
+
+    sys.exit(0 if result.wasSuccessful() else 1)
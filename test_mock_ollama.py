@@ -0,0 +1,283 @@
+"""
+Unit Tests for the mock Ollama server
+Exercises it through the real client over HTTP, the way the app uses it
+"""
+
+import unittest
+import json
+import shutil
+import tempfile
+import threading
+import time
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from batch_chat import BatchRunner
+from chat_engine import ChatEngine, DONE, ERROR, STOPPED
+from host_pool import OllamaHostPool
+from mock_ollama import MockOllamaServer, fake_embedding
+from model_warmup import ModelWarmer
+from ollama_client import OllamaClient, OllamaError, CancelToken, iter_chat_stream, chunk_text
+
+
+class TestMockOllama(unittest.TestCase):
+    """Test the mock answers like Ollama and honours its settings"""
+
+    def setUp(self):
+        self.server = MockOllamaServer(token_rate=0, first_token_delay=0).start()
+        self.addCleanup(self.server.stop)
+        self.client = OllamaClient(self.server.url)
+        self.addCleanup(self.client.close)
+
+    def chat(self, stream=True, **extra):
+        payload = {"model": "llama2", "messages": [{"role": "user", "content": "Hello there"}], "stream": stream}
+        payload.update(extra)
+        return self.client.chat(payload, stream=stream)
+
+    def test_tags(self):
+        """Test /api/tags lists the configured models"""
+        self.assertIn("llama2", self.client.list_models())
+
+    def test_streamed_chat(self):
+        """Test a streamed answer ends with a done chunk carrying stats"""
+        self.server.config.tokens = 5
+        chunks = list(iter_chat_stream(self.chat()))
+
+        self.assertEqual(len(chunks), 6)
+        self.assertTrue(chunks[-1]["done"])
+        self.assertEqual(chunks[-1]["eval_count"], 5)
+        self.assertGreater(chunks[-1]["prompt_eval_count"], 0)
+        self.assertTrue("".join(chunk_text(c) for c in chunks).endswith("."))
+
+    def test_whole_chat(self):
+        """Test a non-streamed answer comes as one JSON body"""
+        body = self.chat(stream=False).json()
+
+        self.assertTrue(body["done"])
+        self.assertEqual(body["eval_count"], self.server.config.tokens)
+        self.assertTrue(body["message"]["content"])
+
+    def test_num_predict(self):
+        """Test options.num_predict limits the answer length"""
+        body = self.chat(stream=False, options={"num_predict": 3}).json()
+
+        self.assertEqual(body["eval_count"], 3)
+
+    def test_custom_reply(self):
+        """Test reply() replaces the synthetic answer"""
+        self.server.config.reply = lambda messages: messages[-1]["content"].upper()
+
+        result = ChatEngine(self.client).ask([], "echo me", "llama2")
+
+        self.assertEqual((result.outcome, result.text), (DONE, "ECHO ME"))
+
+    def test_timing(self):
+        """Test the first-token delay and token rate shape the stream"""
+        self.server.config.first_token_delay = 0.1
+        self.server.config.token_rate = 100
+        self.server.config.tokens = 10
+        started = time.perf_counter()
+        response = self.chat()
+        first = None
+        for chunk in iter_chat_stream(response):
+            if first is None:
+                first = time.perf_counter() - started
+        total = time.perf_counter() - started
+
+        self.assertGreaterEqual(first, 0.1)
+        self.assertGreaterEqual(total, 0.19)
+        self.assertLess(total, 1.0)
+
+    def test_embeddings(self):
+        """Test both embedding endpoints return deterministic vectors"""
+        vectors = self.client.embed("nomic-embed-text", ["a", "b", "a"])
+        single = self.client.post("embeddings", {"model": "nomic-embed-text", "prompt": "a"}).json()
+
+        self.assertEqual(len(vectors[0]), 384)
+        self.assertEqual(vectors[0], vectors[2])
+        self.assertNotEqual(vectors[0], vectors[1])
+        self.assertEqual(single["embedding"], fake_embedding("a", 384))
+
+    def test_load_delay(self):
+        """Test a model is loaded once, then answers without load time"""
+        self.server.config.load_delay = 0.05
+
+        self.assertAlmostEqual(self.client.load_model("mistral"), 0.05)
+        self.assertEqual(self.client.load_model("mistral"), 0.0)
+
+    def test_warm_up_matches_chat_num_ctx(self):
+        """Test the warm-up loads the model with the num_ctx chats send, so Ollama need not reload it"""
+        engine = ChatEngine(self.client)
+        engine.context_window.model_num_ctx["llama2"] = 8192
+        finished = threading.Event()
+        ModelWarmer(self.client, on_done=lambda *result: finished.set(), options=engine.options).warm("llama2")
+        self.assertTrue(finished.wait(5))
+
+        engine.ask([], "hi", "llama2")
+
+        warm_up, chat = self.server.payloads[0], self.server.payloads[-1]
+        self.assertNotIn("prompt", warm_up)
+        self.assertEqual(warm_up["options"]["num_ctx"], 8192)
+        self.assertEqual(warm_up["options"]["num_ctx"], chat["options"]["num_ctx"])
+
+    def test_unknown_model(self):
+        """Test an unknown model is a 404 like a model that was never pulled"""
+        response = self.client.chat({"model": "nope", "messages": []})
+
+        self.assertEqual(response.status_code, 404)
+        self.assertIn("not found", response.json()["error"])
+
+    def test_injected_errors(self):
+        """Test fail_next fails that many requests, then recovers"""
+        self.server.config.fail_next = 2
+        statuses = [self.chat(stream=False).status_code for _ in range(3)]
+
+        self.assertEqual(statuses, [500, 500, 200])
+
+    def test_error_rate_reaches_engine(self):
+        """Test injected errors surface as failed turns"""
+        self.server.config.error_rate = 1.0
+
+        result = ChatEngine(self.client).ask([], "hi", "llama2")
+
+        self.assertEqual(result.outcome, ERROR)
+
+    def test_stream_error(self):
+        """Test a stream broken mid-answer raises OllamaError"""
+        self.server.config.stream_error_after = 2
+
+        with self.assertRaises(OllamaError):
+            list(iter_chat_stream(self.chat()))
+
+    def test_slots_queue_requests(self):
+        """Test requests beyond the slots wait instead of running in parallel"""
+        self.server.config.slots = 1
+        self.server.config.first_token_delay = 0.05
+        threads = [threading.Thread(target=lambda: self.chat(stream=False)) for _ in range(3)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(5)
+
+        self.assertEqual(self.server.peak_active, 1)
+        self.assertGreaterEqual(self.server.queued_peak, 1)
+
+        self.server.reset_stats()
+        self.server.config.slots = 3
+        threads = [threading.Thread(target=lambda: self.chat(stream=False)) for _ in range(3)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(5)
+
+        self.assertEqual(self.server.peak_active, 3)
+
+    def test_cancel_disconnects(self):
+        """Test stopping a stream drops the connection and frees the slot"""
+        self.server.config.token_rate = 20
+        self.server.config.tokens = 200
+        cancel = CancelToken()
+        response = self.chat()
+        cancel.attach(response)
+        for i, _ in enumerate(iter_chat_stream(response, cancel)):
+            if i == 2:
+                cancel.cancel()
+
+        for _ in range(100):
+            if self.server.active == 0:
+                break
+            time.sleep(0.02)
+        self.assertEqual(self.server.active, 0)
+        self.assertEqual(self.server.disconnects, 1)
+
+    def stop_during_prompt_evaluation(self, client):
+        """Cancel a turn 0.3 s into a 3 s first-token delay; returns (result, seconds from cancel to return)"""
+        self.server.config.first_token_delay = 3.0
+        cancel = CancelToken()
+        cancelled_at = []
+
+        def stop():
+            cancelled_at.append(time.perf_counter())
+            cancel.cancel()
+
+        timer = threading.Timer(0.3, stop)
+        timer.start()
+        self.addCleanup(timer.cancel)
+        history = [{"role": "user", "content": "Hello there"}]
+        result = ChatEngine(client).run_turn(history, "llama2", "", 0.7, "Hello there", cancel=cancel)
+        return result, time.perf_counter() - cancelled_at[0]
+
+    def test_cancel_before_first_token(self):
+        """Test Stop aborts a request still waiting for its first token"""
+        result, latency = self.stop_during_prompt_evaluation(self.client)
+
+        self.assertEqual(result.outcome, STOPPED)
+        self.assertLess(latency, 0.1)
+
+    def test_cancel_before_first_token_through_host_pool(self):
+        """Test a stopped request is not failed over or counted against its host"""
+        pool = OllamaHostPool([self.server.url])
+        self.addCleanup(pool.close)
+
+        result, latency = self.stop_during_prompt_evaluation(pool)
+
+        self.assertEqual(result.outcome, STOPPED)
+        self.assertLess(latency, 0.1)
+        self.assertEqual(self.server.requests["/api/chat"], 1)
+        self.assertEqual(pool.nodes[0].failures, 0)
+
+    def test_batch_through_host_pool(self):
+        """Test a batch run over a host pool gets answers with timings"""
+        self.server.config.slots = 2
+        self.server.config.first_token_delay = 0.02
+        folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, folder, ignore_errors=True)
+        prompts = os.path.join(folder, "prompts.jsonl")
+        results = os.path.join(folder, "results.jsonl")
+        with open(prompts, "w", encoding="utf-8") as f:
+            for i in range(6):
+                f.write(json.dumps({"prompt": f"question {i}"}) + "\n")
+
+        pool = OllamaHostPool([self.server.url])
+        self.addCleanup(pool.close)
+        counts = BatchRunner(ChatEngine(pool), concurrency=4).run(prompts, results)
+
+        with open(results, encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual(counts["done"], 6)
+        self.assertEqual(self.server.peak_active, 2)
+        self.assertTrue(all(r["ttft_s"] >= 0.02 and r["completion_tokens"] for r in records))
+
+    def test_request_counters(self):
+        """Test requests are counted per path and payloads kept"""
+        self.chat(stream=False)
+        self.client.tags()
+
+        self.assertEqual(self.server.requests["/api/chat"], 1)
+        self.assertEqual(self.server.requests["/api/tags"], 1)
+        self.assertEqual(self.server.payloads[-1]["model"], "llama2")
+
+
+def suite():
+    """Create test suite"""
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(TestMockOllama))
+    return suite
+
+
+if __name__ == '__main__':
+    print("Running Mock Ollama Tests...")
+    print("=" * 60)
+
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite())
+
+    print("\n" + "=" * 60)
+    print(f"Tests run: {result.testsRun}")
+    print(f"Successes: {result.testsRun - len(result.failures) - len(result.errors)}")
+    print(f"Failures: {len(result.failures)}")
+    print(f"Errors: {len(result.errors)}")
+
+    sys.exit(0 if result.wasSuccessful() else 1)
@@ -0,0 +1,110 @@
+"""
+Unit Tests for background model warm-up
+"""
+
+import unittest
+import threading
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from model_warmup import ModelWarmer, KEEP_ALIVE_CHOICES, keep_alive_label
+from ollama_client import OllamaError
+
+
+class BlockingClient:
+    """load_model waits until released, so tests can see warm-ups in flight"""
+
+    def __init__(self, error=None):
+        self.release = threading.Event()
+        self.loaded = []
+        self.error = error
+
+    def load_model(self, model, options=None):
+        self.release.wait(5)
+        self.loaded.append(model)
+        self.options = options
+        if self.error:
+            raise self.error
+        return 0.1
+
+
+class TestModelWarmer(unittest.TestCase):
+    """Test warm-ups run once per model in the background"""
+
+    def run_warmer(self, client, *models):
+        done = []
+        finished = threading.Event()
+
+        def on_done(model, seconds, error):
+            done.append((model, error))
+            if len(done) == len(set(models)):
+                finished.set()
+
+        warmer = ModelWarmer(client, on_done=on_done)
+        started = [warmer.warm(model) for model in models]
+        client.release.set()
+        self.assertTrue(finished.wait(5))
+        return started, done
+
+    def test_duplicate_warm_skipped(self):
+        """Test a model already loading is not requested again"""
+        client = BlockingClient()
+        started, done = self.run_warmer(client, "llama2", "llama2", "llava")
+
+        self.assertEqual(started, [True, False, True])
+        self.assertEqual(sorted(client.loaded), ["llama2", "llava"])
+        self.assertEqual(sorted(model for model, _ in done), ["llama2", "llava"])
+
+    def test_errors_reported(self):
+        """Test a failed load is passed to on_done instead of raised"""
+        client = BlockingClient(error=OllamaError("model not found"))
+        _, done = self.run_warmer(client, "missing")
+
+        self.assertIsInstance(done[0][1], OllamaError)
+
+    def test_load_options(self):
+        """Test the model is loaded with the options chats will use"""
+        client = BlockingClient()
+        client.release.set()
+        finished = threading.Event()
+        warmer = ModelWarmer(client, on_done=lambda *result: finished.set(),
+                             options=lambda model: {"num_ctx": 8192})
+        warmer.warm("llama2")
+
+        self.assertTrue(finished.wait(5))
+        self.assertEqual(client.options, {"num_ctx": 8192})
+
+    def test_empty_model_ignored(self):
+        """Test nothing is loaded when no model is selected"""
+        self.assertFalse(ModelWarmer(BlockingClient()).warm(""))
+
+    def test_keep_alive_labels(self):
+        """Test keep_alive values map back to their labels"""
+        for label, value in KEEP_ALIVE_CHOICES.items():
+            self.assertEqual(keep_alive_label(value), label)
+        self.assertEqual(keep_alive_label("45m"), "45m")
+
+
+def suite():
+    """Create test suite"""
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(TestModelWarmer))
+    return suite
+
+
+if __name__ == '__main__':
+    print("Running Model Warm-up Tests...")
+    print("=" * 60)
+
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite())
+
+    print("\n" + "=" * 60)
+    print(f"Tests run: {result.testsRun}")
+    print(f"Successes: {result.testsRun - len(result.failures) - len(result.errors)}")
+    print(f"Failures: {len(result.failures)}")
+    print(f"Errors: {len(result.errors)}")
+
+    sys.exit(0 if result.wasSuccessful() else 1)
@@ -0,0 +1,344 @@
+"""
+Unit Tests for the shared Ollama client helpers
+Tests the pooled HTTP client and NDJSON stream parsing
+"""
+
+import unittest
+from unittest.mock import patch
+import json
+import socket
+import threading
+import time
+import sys
+import os
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ollama_client import (
+    OllamaClient, CancelToken, iter_chat_stream, chunk_text, model_names, resolve_base_url, OllamaError
+)
+
+
+class FakeStreamResponse:
+    """Minimal stand-in for a streaming requests.Response"""
+
+    def __init__(self, lines):
+        self.lines = lines
+
+    def iter_lines(self):
+        for line in self.lines:
+            yield line
+
+
+def ndjson(*chunks):
+    """Encode chunks the way Ollama sends them over the wire"""
+    return [json.dumps(c).encode("utf-8") for c in chunks]
+
+
+class TestChatStream(unittest.TestCase):
+    """Test iter_chat_stream and chunk_text"""
+
+    def test_yields_chunks_in_order(self):
+        """Test content fragments arrive in order"""
+        response = FakeStreamResponse(ndjson(
+            {"message": {"role": "assistant", "content": "Hel"}, "done": False},
+            {"message": {"role": "assistant", "content": "lo"}, "done": False},
+            {"message": {"role": "assistant", "content": ""}, "done": True, "eval_count": 2},
+        ))
+
+        pieces = [chunk_text(c) for c in iter_chat_stream(response)]
+
+        self.assertEqual("".join(pieces), "Hello")
+        self.assertEqual(len(pieces), 3)
+
+    def test_final_chunk_carries_stats(self):
+        """Test the done chunk is yielded with its statistics"""
+        response = FakeStreamResponse(ndjson(
+            {"message": {"content": "Hi"}, "done": False},
+            {"message": {"content": ""}, "done": True, "eval_count": 1},
+        ))
+
+        chunks = list(iter_chat_stream(response))
+
+        self.assertTrue(chunks[-1]["done"])
+        self.assertEqual(chunks[-1]["eval_count"], 1)
+
+    def test_stops_after_done(self):
+        """Test nothing after the done chunk is consumed"""
+        response = FakeStreamResponse(ndjson(
+            {"message": {"content": "A"}, "done": True},
+            {"message": {"content": "B"}, "done": False},
+        ))
+
+        pieces = [chunk_text(c) for c in iter_chat_stream(response)]
+
+        self.assertEqual(pieces, ["A"])
+
+    def test_skips_keepalive_blank_lines(self):
+        """Test empty lines between chunks are ignored"""
+        lines = ndjson({"message": {"content": "A"}, "done": False})
+        lines += [b""]
+        lines += ndjson({"message": {"content": "B"}, "done": True})
+
+        pieces = [chunk_text(c) for c in iter_chat_stream(FakeStreamResponse(lines))]
+
+        self.assertEqual(pieces, ["A", "B"])
+
+    def test_accepts_text_lines(self):
+        """Test already-decoded lines are parsed too"""
+        response = FakeStreamResponse([json.dumps({"message": {"content": "ok"}, "done": True})])
+
+        pieces = [chunk_text(c) for c in iter_chat_stream(response)]
+
+        self.assertEqual(pieces, ["ok"])
+
+    def test_error_chunk_raises(self):
+        """Test an error reported mid-stream raises OllamaError"""
+        response = FakeStreamResponse(ndjson(
+            {"message": {"content": "par"}, "done": False},
+            {"error": "model not found"},
+        ))
+
+        with self.assertRaises(OllamaError):
+            list(iter_chat_stream(response))
+
+    def test_chunk_text_missing_message(self):
+        """Test chunk_text tolerates chunks without a message"""
+        self.assertEqual(chunk_text({"done": True}), "")
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    """Tiny HTTP/1.1 handler answering /api/tags, /api/chat and /api/embed"""
+
+    protocol_version = "HTTP/1.1"
+    last_payload = None
+
+    def send_json(self, data):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.send_json({"models": [{"name": "llama2"}, {"name": "llava"}]})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length))
+        KeepAliveHandler.last_payload = payload
+        if self.path == "/api/generate":
+            self.send_json({"model": payload["model"], "response": "", "done": True, "load_duration": 1500000000})
+            return
+        if self.path == "/api/embed":
+            self.send_json({"embeddings": [[float(len(text)), 1.0] for text in payload["input"]]})
+            return
+        self.send_json({"message": {"role": "assistant", "content": payload["model"]}, "done": True})
+
+    def log_message(self, *args):
+        pass
+
+
+class TestOllamaClient(unittest.TestCase):
+    """Test the pooled OllamaClient against a local HTTP server"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.client = OllamaClient(self.base_url)
+
+    def tearDown(self):
+        self.client.close()
+
+    def test_urls_and_timeouts(self):
+        """Test endpoint URLs and per-endpoint timeouts"""
+        self.assertEqual(self.client.chat_url, f"{self.base_url}/api/chat")
+        self.assertEqual(self.client.timeout("tags"), 2)
+        self.assertEqual(self.client.timeout("chat"), (5, 120))
+        self.assertEqual(self.client.timeout("unknown"), self.client.timeouts["default"])
+
+    def test_custom_timeouts(self):
+        """Test timeouts can be overridden per endpoint"""
+        client = OllamaClient(self.base_url, timeouts={"chat": 30})
+        self.assertEqual(client.timeout("chat"), 30)
+        self.assertEqual(client.timeout("tags"), 2)
+
+    def test_resolve_base_url(self):
+        """Test OLLAMA_HOST is honoured and normalised"""
+        with patch.dict(os.environ, {"OLLAMA_HOST": "10.0.0.5:11434"}):
+            self.assertEqual(resolve_base_url(), "http://10.0.0.5:11434")
+        with patch.dict(os.environ, {}, clear=True):
+            self.assertEqual(resolve_base_url(), "http://localhost:11434")
+        self.assertEqual(resolve_base_url("http://host:1/"), "http://host:1")
+
+    def test_connections_are_reused(self):
+        """Test repeated calls share one keep-alive connection"""
+        for _ in range(5):
+            self.assertTrue(self.client.is_available())
+        self.client.chat({"model": "llama2", "messages": []})
+
+        stats = self.client.pool_stats()
+
+        self.assertEqual(stats["requests"], 6)
+        self.assertEqual(stats["connections_opened"], 1)
+
+    def test_chat_round_trip(self):
+        """Test chat posts JSON to /api/chat"""
+        response = self.client.chat({"model": "mistral", "messages": []})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["message"]["content"], "mistral")
+
+    def test_embed(self):
+        """Test embed returns one vector per input text"""
+        self.assertEqual(self.client.embed("nomic-embed-text", ["ab", "abcd"]), [[2.0, 1.0], [4.0, 1.0]])
+
+    def test_keep_alive_added(self):
+        """Test chat requests carry the client's keep_alive unless they set one"""
+        client = OllamaClient(self.base_url, keep_alive="2h")
+        client.chat({"model": "llama2", "messages": []})
+        self.assertEqual(KeepAliveHandler.last_payload["keep_alive"], "2h")
+
+        client.chat({"model": "llama2", "messages": [], "keep_alive": 0})
+        self.assertEqual(KeepAliveHandler.last_payload["keep_alive"], 0)
+
+        OllamaClient(self.base_url, keep_alive=None).chat({"model": "llama2", "messages": []})
+        self.assertNotIn("keep_alive", KeepAliveHandler.last_payload)
+
+    def test_load_model(self):
+        """Test load_model sends an empty generate request and reports the load time"""
+        self.assertEqual(self.client.load_model("llama2"), 1.5)
+        self.assertEqual(KeepAliveHandler.last_payload, {"model": "llama2", "keep_alive": "30m"})
+
+    def test_list_models(self):
+        """Test installed model names are listed"""
+        self.assertEqual(self.client.list_models(), ["llama2", "llava"])
+
+    def test_model_names_tolerates_bad_body(self):
+        """Test model_names returns [] for unreadable responses"""
+        class BadResponse:
+            def json(self):
+                raise ValueError("not json")
+
+        self.assertEqual(model_names(BadResponse()), [])
+
+    def test_unreachable_server(self):
+        """Test is_available is False when nothing listens"""
+        sock = socket.socket()
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+        sock.close()
+
+        client = OllamaClient(f"http://127.0.0.1:{port}")
+        self.assertFalse(client.is_available())
+
+
+class SlowStreamHandler(BaseHTTPRequestHandler):
+    """Streams one chat chunk per second, like a slow model on CPU"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for i in range(30):
+                line = (json.dumps({"message": {"content": f"t{i} "}, "done": False}) + "\n").encode()
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+                self.wfile.flush()
+                time.sleep(1)
+        except OSError:
+            pass   # client went away
+
+    def log_message(self, *args):
+        pass
+
+
+class TestCancellation(unittest.TestCase):
+    """Test stopping a streaming answer from another thread"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), SlowStreamHandler)
+        cls.server.daemon_threads = True
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.client = OllamaClient(f"http://127.0.0.1:{cls.server.server_address[1]}")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.client.close()
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def test_cancel_wakes_blocked_reader(self):
+        """Test cancel ends a stream blocked waiting for the next chunk within 100 ms"""
+        cancel = CancelToken()
+        response = self.client.chat({"model": "llama2", "messages": []}, stream=True)
+        cancel.attach(response)
+        received, ended = [], threading.Event()
+
+        def read():
+            for chunk in iter_chat_stream(response, cancel):
+                received.append(chunk_text(chunk))
+            ended.set()
+
+        threading.Thread(target=read, daemon=True).start()
+        deadline = time.time() + 5
+        while not received and time.time() < deadline:
+            time.sleep(0.01)
+
+        started = time.perf_counter()
+        cancel.cancel()
+        self.assertTrue(ended.wait(1))
+        self.assertLess(time.perf_counter() - started, 0.1)
+        self.assertEqual(received, ["t0 "])
+
+    def test_cancel_before_attach(self):
+        """Test a response attached after cancel is aborted straight away"""
+        cancel = CancelToken()
+        cancel.cancel()
+        response = self.client.chat({"model": "llama2", "messages": []}, stream=True)
+        cancel.attach(response)
+
+        self.assertTrue(cancel.cancelled)
+        self.assertEqual(list(iter_chat_stream(response, cancel)), [])
+
+
+def suite():
+    """Create test suite"""
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(TestChatStream))
+    suite.addTest(unittest.makeSuite(TestOllamaClient))
+    suite.addTest(unittest.makeSuite(TestCancellation))
+    return suite
+
+
+if __name__ == '__main__':
+    print("Running Ollama Client Tests...")
+    print("=" * 60)
+
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite())
+
+    print("\n" + "=" * 60)
+    print(f"Tests run: {result.testsRun}")
+    print(f"Successes: {result.testsRun - len(result.failures) - len(result.errors)}")
+    print(f"Failures: {len(result.failures)}")
+    print(f"Errors: {len(result.errors)}")
+
+    sys.exit(0 if result.wasSuccessful() else 1)
@@ -0,0 +1,132 @@
+"""
+Unit Tests for the response cache
+"""
+
+import unittest
+import shutil
+import tempfile
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from response_cache import ResponseCache, cache_key
+
+MESSAGES = [
+    {"role": "system", "content": "You are a helpful AI assistant."},
+    {"role": "user", "content": "What is WAL mode?"},
+]
+
+
+class TestCacheKey(unittest.TestCase):
+    """Test which differences change the cache key"""
+
+    def test_stable_and_normalized(self):
+        """Test formatting-only differences give the same key"""
+        reordered = {"num_ctx": 4096, "temperature": 0}
+        messy = [dict(MESSAGES[0]), {"content": "  What is WAL mode?\r\n", "role": "user"}]
+
+        self.assertEqual(
+            cache_key("llama3", MESSAGES, {"temperature": 0, "num_ctx": 4096}),
+            cache_key("llama3", messy, reordered),
+        )
+
+    def test_inputs_change_key(self):
+        """Test model, messages, system prompt and options are all part of the key"""
+        base = cache_key("llama3", MESSAGES, {"temperature": 0})
+        other_system = [{"role": "system", "content": "Be terse."}, MESSAGES[1]]
+
+        self.assertNotEqual(base, cache_key("mistral", MESSAGES, {"temperature": 0}))
+        self.assertNotEqual(base, cache_key("llama3", MESSAGES[1:], {"temperature": 0}))
+        self.assertNotEqual(base, cache_key("llama3", other_system, {"temperature": 0}))
+        self.assertNotEqual(base, cache_key("llama3", MESSAGES, {"temperature": 0, "seed": 1}))
+
+    def test_images_part_of_key(self):
+        """Test messages with different images get different keys"""
+        first = [{"role": "user", "content": "What is this?", "images": ["sha256:aa"]}]
+        second = [{"role": "user", "content": "What is this?", "images": ["sha256:bb"]}]
+        self.assertNotEqual(cache_key("llava", first), cache_key("llava", second))
+
+
+class TestResponseCache(unittest.TestCase):
+    """Test lookups, bounds and persistence"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "cache.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_hits_and_misses(self):
+        """Test lookups are counted and answered from the cache"""
+        cache = ResponseCache(self.path)
+        self.assertIsNone(cache.get("k"))
+        cache.put("k", "llama3", "answer")
+
+        self.assertEqual(cache.get("k"), "answer")
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual(cache.stats_text(), "⚡ Cache: 1 hit / 1 miss")
+        cache.close()
+
+    def test_only_deterministic_by_default(self):
+        """Test sampled requests are cached only when allowed"""
+        self.assertTrue(ResponseCache(None).cacheable({"temperature": 0}))
+        self.assertFalse(ResponseCache(None).cacheable({"temperature": 0.7}))
+        self.assertFalse(ResponseCache(None).cacheable({}))
+        self.assertTrue(ResponseCache(None, allow_sampled=True).cacheable({"temperature": 0.7}))
+
+    def test_persists_across_restart(self):
+        """Test answers are read back from disk by a new cache"""
+        cache = ResponseCache(self.path)
+        cache.put("k", "llama3", "answer")
+        cache.close()
+
+        reopened = ResponseCache(self.path)
+        self.assertEqual(reopened.get("k"), "answer")
+        reopened.close()
+
+    def test_bounded(self):
+        """Test memory and disk keep only the most recently used answers"""
+        cache = ResponseCache(self.path, memory_entries=2, disk_entries=3)
+        for i in range(5):
+            cache.put(f"k{i}", "llama3", f"answer {i}")
+
+        self.assertEqual(list(cache.entries), ["k3", "k4"])
+        count = cache.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        self.assertEqual(count, 3)
+        self.assertIsNone(cache.get("k0"))
+        self.assertEqual(cache.get("k2"), "answer 2")
+        cache.close()
+
+    def test_clear(self):
+        """Test clear empties memory and disk"""
+        cache = ResponseCache(self.path)
+        cache.put("k", "llama3", "answer")
+        cache.clear()
+        self.assertIsNone(cache.get("k"))
+        cache.close()
+
+
+def suite():
+    """Create test suite"""
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(TestCacheKey))
+    suite.addTest(unittest.makeSuite(TestResponseCache))
+    return suite
+
+
+if __name__ == '__main__':
+    print("Running Response Cache Tests...")
+    print("=" * 60)
+
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite())
+
+    print("\n" + "=" * 60)
+    print(f"Tests run: {result.testsRun}")
+    print(f"Successes: {result.testsRun - len(result.failures) - len(result.errors)}")
+    print(f"Failures: {len(result.failures)}")
+    print(f"Errors: {len(result.errors)}")
+
+    sys.exit(0 if result.wasSuccessful() else 1)
@@ -0,0 +1,359 @@
+"""
+Unit Tests for the SQLite session store
+Tests per-message persistence and the one-time pickle migration
+"""
+
+import unittest
+from unittest.mock import patch
+import pickle
+import shutil
+import tempfile
+import sys
+import os
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from session_store import SessionStore, SessionCache
+
+
+class PickledSession:
+    """Shape of the ChatSession objects written by older versions"""
+
+    def __init__(self, chat_id, name, messages):
+        self.id = chat_id
+        self.name = name
+        self.messages = messages
+        self.created_at = datetime(2024, 1, 1, 12, 0, 0)
+        self.updated_at = datetime(2024, 1, 1, 12, 5, 0)
+
+
+# Pickles written by `python chatbot_v3.py` reference __main__.ChatSession
+PickledSession.__module__ = "__main__"
+PickledSession.__qualname__ = PickledSession.__name__ = "ChatSession"
+
+
+class TestSessionStore(unittest.TestCase):
+    """Test sessions and messages round-trip through SQLite"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "sessions.db")
+        self.store = SessionStore(self.path)
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.tmpdir)
+
+    def make_session(self, chat_id, name="Chat"):
+        session = PickledSession(chat_id, name, [])
+        self.store.create_session(session)
+        return session
+
+    def test_append_and_load_messages(self):
+        """Test messages come back in the order they were appended"""
+        self.make_session("s1")
+        self.store.append_message("s1", {"role": "user", "content": "hi"})
+        self.store.append_message("s1", {"role": "assistant", "content": "hello"})
+
+        self.assertEqual(self.store.load_messages("s1"), [
+            {"role": "user", "content": "hi"},
+            {"role": "assistant", "content": "hello"},
+        ])
+
+    def test_images_round_trip(self):
+        """Test image attachments keep their order and stay on their message"""
+        self.make_session("s1")
+        self.store.append_message("s1", {"role": "user", "content": "look", "images": ["aaa", "bbb"]})
+        self.store.append_message("s1", {"role": "assistant", "content": "two images"})
+
+        messages = self.store.load_messages("s1")
+
+        self.assertEqual(messages[0]["images"], ["aaa", "bbb"])
+        self.assertNotIn("images", messages[1])
+
+    def test_sessions_are_isolated(self):
+        """Test loading one session does not return another's messages"""
+        self.make_session("s1")
+        self.make_session("s2")
+        self.store.append_message("s1", {"role": "user", "content": "one"})
+        self.store.append_message("s2", {"role": "user", "content": "two"})
+
+        self.assertEqual([m["content"] for m in self.store.load_messages("s2")], ["two"])
+
+    def test_list_sessions_in_creation_order(self):
+        """Test sessions are listed oldest first"""
+        self.make_session("a", "First")
+        self.make_session("b", "Second")
+
+        self.assertEqual([s["name"] for s in self.store.list_sessions()], ["First", "Second"])
+
+    def test_list_sessions_counts_messages(self):
+        """Test the metadata listing carries message counts"""
+        self.make_session("a")
+        self.make_session("b")
+        for text in ("one", "two", "three"):
+            self.store.append_message("a", {"role": "user", "content": text})
+
+        counts = {s["id"]: s["message_count"] for s in self.store.list_sessions()}
+
+        self.assertEqual(counts, {"a": 3, "b": 0})
+
+    def test_rename_and_delete(self):
+        """Test renaming a session and deleting it with its messages"""
+        self.make_session("s1")
+        self.store.append_message("s1", {"role": "user", "content": "hi", "images": ["x"]})
+
+        self.store.rename_session("s1", "Renamed")
+        self.assertEqual(self.store.list_sessions()[0]["name"], "Renamed")
+
+        self.store.delete_session("s1")
+        self.assertEqual(self.store.list_sessions(), [])
+        self.assertEqual(self.store.load_messages("s1"), [])
+
+    def test_externalize_images(self):
+        """Test inline images are swapped for blob references"""
+        self.make_session("s1")
+        self.store.append_message("s1", {"role": "user", "content": "look", "images": ["aaa", "sha256:kept"]})
+        stored = []
+
+        def put(data):
+            stored.append(data)
+            return f"sha256:{data}"
+
+        self.assertEqual(self.store.externalize_images(put), 1)
+        self.assertEqual(self.store.externalize_images(put), 0)
+
+        self.assertEqual(stored, ["aaa"])
+        self.assertEqual(self.store.load_messages("s1")[0]["images"], ["sha256:aaa", "sha256:kept"])
+
+    def test_persists_across_reopen(self):
+        """Test data is still there after the store is reopened"""
+        self.make_session("s1", "Kept")
+        self.store.append_message("s1", {"role": "user", "content": "remember me"})
+        self.store.close()
+
+        self.store = SessionStore(self.path)
+
+        self.assertEqual(self.store.list_sessions()[0]["name"], "Kept")
+        self.assertEqual(self.store.load_messages("s1")[0]["content"], "remember me")
+
+
+class TestSearch(unittest.TestCase):
+    """Test full-text search across sessions"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "sessions.db")
+        self.store = SessionStore(self.path)
+        for chat_id, name in (("s1", "Cooking"), ("s2", "Travel")):
+            self.store.create_session(PickledSession(chat_id, name, []))
+        self.store.append_message("s1", {"role": "user", "content": "How long do I bake sourdough bread?"})
+        self.store.append_message("s1", {"role": "assistant", "content": "Bake the bread for 45 minutes."})
+        self.store.append_message("s2", {"role": "user", "content": "Best time to visit Lisbon?"})
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.tmpdir)
+
+    def test_finds_messages_across_sessions(self):
+        """Test hits carry the session and message position"""
+        hits = self.store.search("lisbon")
+
+        self.assertEqual(len(hits), 1)
+        self.assertEqual(hits[0]["session_id"], "s2")
+        self.assertEqual(hits[0]["session_name"], "Travel")
+        self.assertEqual(hits[0]["seq"], 0)
+        self.assertIn("Lisbon", hits[0]["snippet"])
+
+    def test_all_words_must_match(self):
+        """Test multi-word queries narrow the results"""
+        self.assertEqual(len(self.store.search("bread")), 2)
+        self.assertEqual([h["seq"] for h in self.store.search("bake sourdough")], [0])
+
+    def test_last_word_is_prefix(self):
+        """Test results appear while the last word is still being typed"""
+        self.assertEqual(len(self.store.search("sourd")), 1)
+
+    def test_new_messages_are_indexed(self):
+        """Test appended messages are searchable straight away"""
+        self.store.append_message("s2", {"role": "assistant", "content": "Spring is lovely in Portugal."})
+
+        self.assertEqual(self.store.search("portugal")[0]["seq"], 1)
+
+    def test_deleted_sessions_leave_index(self):
+        """Test deleting a session removes its messages from search"""
+        self.store.delete_session("s1")
+
+        self.assertEqual(self.store.search("bread"), [])
+
+    def test_query_syntax_is_escaped(self):
+        """Test quotes and operators in the query do not raise"""
+        self.assertEqual(self.store.search('"bread OR ('), [])
+        self.assertEqual(self.store.search("   "), [])
+
+    def test_existing_messages_indexed_on_upgrade(self):
+        """Test a database created before the index existed is backfilled"""
+        self.store.conn.executescript(
+            "DROP TABLE messages_fts; DROP TRIGGER messages_fts_insert; "
+            "DROP TRIGGER messages_fts_delete; DELETE FROM meta WHERE key = 'fts_built';"
+        )
+        self.store.close()
+
+        self.store = SessionStore(self.path)
+
+        self.assertEqual(len(self.store.search("bread")), 2)
+
+
+class TestSessionCache(unittest.TestCase):
+    """Test the LRU of sessions kept in memory"""
+
+    def setUp(self):
+        self.loads = []
+        self.cache = SessionCache(self.load, capacity=2)
+
+    def load(self, session_id):
+        self.loads.append(session_id)
+        if session_id == "missing":
+            return None
+        return PickledSession(session_id, session_id, [])
+
+    def test_loads_on_miss_only(self):
+        """Test a session is read once and then served from memory"""
+        first = self.cache.get("a")
+        second = self.cache.get("a")
+
+        self.assertIs(first, second)
+        self.assertEqual(self.loads, ["a"])
+
+    def test_evicts_least_recently_used(self):
+        """Test the oldest untouched session is dropped at capacity"""
+        self.cache.get("a")
+        self.cache.get("b")
+        self.cache.get("a")
+        self.cache.get("c")
+
+        self.assertIn("a", self.cache)
+        self.assertNotIn("b", self.cache)
+        self.assertEqual(len(self.cache), 2)
+
+    def test_pinned_sessions_not_evicted(self):
+        """Test a session with an answer still running stays cached past capacity"""
+        busy = {"a"}
+        cache = SessionCache(self.load, capacity=2, pinned=lambda sid: sid in busy)
+        cache.get("a")
+        cache.get("b")
+        cache.get("c")
+
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+
+        busy.clear()
+        cache.get("d")
+        self.assertNotIn("a", cache)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(self.loads.count("a"), 1)
+
+    def test_on_evict_called(self):
+        """Test evicted and discarded sessions are reported"""
+        evicted = []
+        cache = SessionCache(self.load, capacity=2, on_evict=lambda session: evicted.append(session.id))
+        cache.get("a")
+        cache.get("b")
+        cache.get("c")
+        cache.discard("b")
+        cache.discard("missing")
+
+        self.assertEqual(evicted, ["a", "b"])
+
+    def test_missing_session_not_cached(self):
+        """Test unknown ids return None and are not stored"""
+        self.assertIsNone(self.cache.get("missing"))
+        self.assertEqual(len(self.cache), 0)
+
+
+class TestPickleMigration(unittest.TestCase):
+    """Test importing the legacy chat_sessions.pkl"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.store = SessionStore(os.path.join(self.tmpdir, "sessions.db"))
+        self.pickle_path = os.path.join(self.tmpdir, "chat_sessions.pkl")
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.tmpdir)
+
+    def write_pickle(self, sessions):
+        with patch.object(sys.modules["__main__"], "ChatSession", PickledSession, create=True):
+            with open(self.pickle_path, "wb") as f:
+                pickle.dump(sessions, f)
+
+    def test_migrates_main_module_sessions(self):
+        """Test sessions pickled from __main__ are imported with their messages"""
+        self.write_pickle([
+            PickledSession("c1", "Chat 1", [
+                {"role": "user", "content": "q", "images": ["img"]},
+                {"role": "assistant", "content": "a"},
+            ]),
+            PickledSession("c2", "Chat 2", []),
+        ])
+
+        self.assertEqual(self.store.migrate_pickle(self.pickle_path), 2)
+
+        sessions = self.store.list_sessions()
+        self.assertEqual([s["name"] for s in sessions], ["Chat 1", "Chat 2"])
+        self.assertEqual(sessions[0]["created_at"], datetime(2024, 1, 1, 12, 0, 0))
+        messages = self.store.load_messages("c1")
+        self.assertEqual(messages[0]["images"], ["img"])
+        self.assertEqual(messages[1]["content"], "a")
+
+    def test_migrates_only_once(self):
+        """Test a second start does not import the pickle again"""
+        self.write_pickle([PickledSession("c1", "Chat 1", [{"role": "user", "content": "q"}])])
+
+        self.store.migrate_pickle(self.pickle_path)
+        self.assertEqual(self.store.migrate_pickle(self.pickle_path), 0)
+
+        self.assertEqual(len(self.store.load_messages("c1")), 1)
+        self.assertTrue(os.path.exists(self.pickle_path))
+
+    def test_missing_pickle(self):
+        """Test nothing happens when there is no legacy file"""
+        self.assertEqual(self.store.migrate_pickle(self.pickle_path), 0)
+
+    def test_corrupted_pickle_raises(self):
+        """Test a corrupted pickle raises and leaves the store empty"""
+        with open(self.pickle_path, "w") as f:
+            f.write("corrupted data")
+
+        with self.assertRaises(Exception):
+            self.store.migrate_pickle(self.pickle_path)
+
+        self.assertEqual(self.store.list_sessions(), [])
+
+
+def suite():
+    """Create test suite"""
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(TestSessionStore))
+    suite.addTest(unittest.makeSuite(TestSearch))
+    suite.addTest(unittest.makeSuite(TestSessionCache))
+    suite.addTest(unittest.makeSuite(TestPickleMigration))
+    return suite
+
+
+if __name__ == '__main__':
+    print("Running Session Store Tests...")
+    print("=" * 60)
+
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite())
+
+    print("\n" + "=" * 60)
+    print(f"Tests run: {result.testsRun}")
+    print(f"Successes: {result.testsRun - len(result.failures) - len(result.errors)}")
+    print(f"Failures: {len(result.failures)}")
+    print(f"Errors: {len(result.errors)}")
+
+    sys.exit(0 if result.wasSuccessful() else 1)
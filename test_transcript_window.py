@@ -0,0 +1,135 @@
+"""
+Unit Tests for the windowed transcript bookkeeping
+"""
+
+import unittest
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from transcript_window import TranscriptWindow
+
+
+class TestTranscriptWindow(unittest.TestCase):
+    """Test which slice of a history is rendered"""
+
+    def test_reset_shows_newest_page(self):
+        """Test switching to a long chat renders only the last page"""
+        window = TranscriptWindow(page_size=50, max_rendered=200)
+
+        self.assertEqual(window.reset(10000), (9950, 10000))
+        self.assertTrue(window.at_tail)
+        self.assertEqual(len(window), 50)
+
+    def test_reset_short_history(self):
+        """Test short chats are rendered completely"""
+        window = TranscriptWindow(page_size=50)
+
+        self.assertEqual(window.reset(7), (0, 7))
+        self.assertFalse(window.has_older())
+
+    def test_older_page_prepends(self):
+        """Test scrolling up renders the previous page"""
+        window = TranscriptWindow(page_size=50, max_rendered=200)
+        window.reset(1000)
+
+        self.assertEqual(window.older_page(), (900, 950, None))
+        self.assertEqual((window.start, window.end), (900, 1000))
+        self.assertTrue(window.at_tail)
+
+    def test_older_pages_trim_bottom(self):
+        """Test the rendered slice never exceeds max_rendered"""
+        window = TranscriptWindow(page_size=50, max_rendered=100)
+        window.reset(1000)
+        window.older_page()
+
+        first, last, trim_from = window.older_page()
+
+        self.assertEqual((first, last), (850, 900))
+        self.assertEqual(trim_from, 950)
+        self.assertEqual(len(window), 100)
+        self.assertFalse(window.at_tail)
+
+    def test_older_page_stops_at_first_message(self):
+        """Test nothing is loaded above the first message"""
+        window = TranscriptWindow(page_size=50)
+        window.reset(60)
+
+        self.assertEqual(window.older_page(), (0, 10, None))
+        self.assertIsNone(window.older_page())
+
+    def test_newer_page_returns_to_tail(self):
+        """Test scrolling back down appends pages and trims the top"""
+        window = TranscriptWindow(page_size=50, max_rendered=100)
+        window.reset(1000)
+        for _ in range(3):
+            window.older_page()
+        self.assertEqual((window.start, window.end), (800, 900))
+
+        first, last, trim_to = window.newer_page(1000)
+        self.assertEqual((first, last, trim_to), (900, 950, 850))
+        self.assertFalse(window.at_tail)
+
+        window.newer_page(1000)
+        self.assertTrue(window.at_tail)
+        self.assertIsNone(window.newer_page(1000))
+
+    def test_reset_around_message(self):
+        """Test jumping to a message renders the page around it"""
+        window = TranscriptWindow(page_size=50)
+
+        self.assertEqual(window.reset_around(1000, 300), (275, 325))
+        self.assertFalse(window.at_tail)
+        self.assertEqual(window.reset_around(1000, 990), (950, 1000))
+        self.assertTrue(window.at_tail)
+        self.assertEqual(window.reset_around(30, 2), (0, 30))
+
+    def test_sync_tail_counts_live_messages(self):
+        """Test live messages extend the window only while at the tail"""
+        window = TranscriptWindow(page_size=10, max_rendered=20)
+        window.reset(10)
+        window.sync_tail(12)
+        self.assertEqual(window.end, 12)
+
+        window.at_tail = False
+        window.sync_tail(15)
+        self.assertEqual(window.end, 12)
+
+    def test_live_messages_overflow(self):
+        """Test live appends past max_rendered drop the oldest page"""
+        window = TranscriptWindow(page_size=10, max_rendered=20)
+        window.reset(100)
+        self.assertIsNone(window.overflow(110))
+        self.assertEqual(window.end, 110)
+
+        self.assertEqual(window.overflow(111), 100)
+        window.start = 100
+        self.assertIsNone(window.overflow(112))
+        self.assertEqual(window.overflow(200), 180)
+
+        window.at_tail = False
+        self.assertIsNone(window.overflow(300))
+
+
+def suite():
+    """Create test suite"""
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(TestTranscriptWindow))
+    return suite
+
+
+if __name__ == '__main__':
+    print("Running Transcript Window Tests...")
+    print("=" * 60)
+
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite())
+
+    print("\n" + "=" * 60)
+    print(f"Tests run: {result.testsRun}")
+    print(f"Successes: {result.testsRun - len(result.failures) - len(result.errors)}")
+    print(f"Failures: {len(result.failures)}")
+    print(f"Errors: {len(result.errors)}")
+
+    sys.exit(0 if result.wasSuccessful() else 1)
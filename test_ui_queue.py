@@ -0,0 +1,167 @@
+"""
+Unit Tests for the frame-coalesced UI update queue
+"""
+
+import unittest
+from unittest.mock import patch
+import threading
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ui_queue import UIUpdateQueue
+
+
+class FakeScheduler:
+    """Records after() calls instead of running a Tk loop"""
+
+    def __init__(self):
+        self.scheduled = []
+        self.cancelled = []
+
+    def after(self, ms, func):
+        self.scheduled.append((ms, func))
+        return f"after#{len(self.scheduled)}"
+
+    def after_cancel(self, after_id):
+        self.cancelled.append(after_id)
+
+    def run_next(self):
+        ms, func = self.scheduled.pop(0)
+        func()
+
+
+class TestUIUpdateQueue(unittest.TestCase):
+    """Test UIUpdateQueue ordering, merging and scheduling"""
+
+    def setUp(self):
+        self.scheduler = FakeScheduler()
+        self.queue = UIUpdateQueue(self.scheduler.after, self.scheduler.after_cancel, interval_ms=16)
+
+    def test_post_runs_in_order(self):
+        """Test posted callbacks run in FIFO order on drain"""
+        calls = []
+        self.queue.post(calls.append, 1)
+        self.queue.post(calls.append, 2)
+        self.queue.post(calls.append, 3)
+
+        ran = self.queue.drain()
+
+        self.assertEqual(calls, [1, 2, 3])
+        self.assertEqual(ran, 3)
+        self.assertEqual(self.queue.pending_count(), 0)
+
+    def test_text_appends_are_merged(self):
+        """Test consecutive appends to one sink become a single call"""
+        received = []
+        for token in ["Hel", "lo", ", ", "world"]:
+            self.queue.append_text(received.append, token)
+
+        self.assertEqual(self.queue.pending_count(), 1)
+        self.queue.drain()
+
+        self.assertEqual(received, ["Hello, world"])
+
+    def test_merging_preserves_order_around_posts(self):
+        """Test appends separated by another update are not merged across it"""
+        events = []
+        sink = lambda text: events.append(("text", text))
+        self.queue.append_text(sink, "a")
+        self.queue.append_text(sink, "b")
+        self.queue.post(events.append, ("marker",))
+        self.queue.append_text(sink, "c")
+
+        self.queue.drain()
+
+        self.assertEqual(events, [("text", "ab"), ("marker",), ("text", "c")])
+
+    def test_different_sinks_not_merged(self):
+        """Test appends to different sinks stay separate"""
+        first, second = [], []
+        self.queue.append_text(first.append, "x")
+        self.queue.append_text(second.append, "y")
+        self.queue.append_text(first.append, "z")
+
+        self.queue.drain()
+
+        self.assertEqual(first, ["x", "z"])
+        self.assertEqual(second, ["y"])
+
+    def test_failing_update_does_not_block_others(self):
+        """Test an exception in one update still lets the rest run"""
+        calls = []
+
+        def boom():
+            raise ValueError("widget gone")
+
+        self.queue.post(boom)
+        self.queue.post(calls.append, "after")
+
+        with patch("traceback.print_exc"):
+            self.queue.drain()
+
+        self.assertEqual(calls, ["after"])
+
+    def test_start_schedules_frames(self):
+        """Test start() schedules a tick and each tick reschedules"""
+        calls = []
+        self.queue.start()
+        self.assertEqual(len(self.scheduler.scheduled), 1)
+        self.assertEqual(self.scheduler.scheduled[0][0], 16)
+
+        self.queue.post(calls.append, "x")
+        self.scheduler.run_next()
+
+        self.assertEqual(calls, ["x"])
+        self.assertEqual(len(self.scheduler.scheduled), 1)
+
+    def test_stop_cancels_pending_frame(self):
+        """Test stop() cancels the scheduled tick"""
+        self.queue.start()
+        self.queue.stop()
+
+        self.assertEqual(self.scheduler.cancelled, ["after#1"])
+        self.assertFalse(self.queue.running)
+
+    def test_concurrent_producers(self):
+        """Test many threads appending never lose text"""
+        received = []
+
+        def produce():
+            for _ in range(500):
+                self.queue.append_text(received.append, "t")
+
+        threads = [threading.Thread(target=produce) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.queue.drain()
+
+        self.assertEqual(len("".join(received)), 8 * 500)
+        self.assertEqual(len(received), 1)
+
+
+def suite():
+    """Create test suite"""
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(TestUIUpdateQueue))
+    return suite
+
+
+if __name__ == '__main__':
+    print("Running UI Update Queue Tests...")
+    print("=" * 60)
+
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite())
+
+    print("\n" + "=" * 60)
+    print(f"Tests run: {result.testsRun}")
+    print(f"Successes: {result.testsRun - len(result.failures) - len(result.errors)}")
+    print(f"Failures: {len(result.failures)}")
+    print(f"Errors: {len(result.errors)}")
+
+    sys.exit(0 if result.wasSuccessful() else 1)
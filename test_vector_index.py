@@ -0,0 +1,186 @@
+"""
+Unit Tests for the NumPy vector index
+"""
+
+import unittest
+from unittest.mock import patch
+import shutil
+import tempfile
+import sys
+import os
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import vector_index
+from vector_index import VectorIndex
+
+
+def random_vectors(n, dim=16, seed=0):
+    return np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+
+
+def brute_force(vectors, query, k):
+    vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = vectors @ (query / np.linalg.norm(query))
+    return list(np.argsort(-scores)[:k])
+
+
+class TestVectorIndex(unittest.TestCase):
+    """Test adding, searching and deleting in memory"""
+
+    def test_search_matches_brute_force(self):
+        """Test top-k results equal an exhaustive search"""
+        vectors = random_vectors(500)
+        index = VectorIndex(capacity=16)
+        ids = index.add(vectors)
+        query = random_vectors(1, seed=1)[0]
+
+        results = index.search(query, k=5)
+
+        self.assertEqual([r[0] for r in results], [ids[i] for i in brute_force(vectors, query, 5)])
+        scores = [r[1] for r in results]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        self.assertAlmostEqual(index.search(vectors[7], k=1)[0][1], 1.0, places=5)
+
+    def test_incremental_add_and_payloads(self):
+        """Test appends grow the matrix and keep ids and payloads in step"""
+        index = VectorIndex(capacity=2)
+        first = index.add([[1, 0], [0, 1]], payloads=["x", "y"])
+        second = index.add([[1, 1]], payloads=["xy"])
+
+        self.assertEqual(first + second, [0, 1, 2])
+        self.assertEqual(len(index), 3)
+        self.assertGreaterEqual(index.capacity, 3)
+        self.assertEqual(index.search([1, 0.9], k=1)[0][2], "xy")
+        self.assertEqual(index.payload(1), "y")
+
+    def test_dimension_checked(self):
+        """Test vectors of the wrong dimension are rejected"""
+        index = VectorIndex()
+        index.add([[1, 0, 0]])
+        with self.assertRaises(ValueError):
+            index.add([[1, 0]])
+
+    def test_delete_tombstones(self):
+        """Test deleted vectors are never returned"""
+        index = VectorIndex()
+        ids = index.add([[1, 0], [0.9, 0.1], [0, 1]])
+
+        self.assertEqual(index.delete([ids[0], 99]), 1)
+
+        self.assertEqual(len(index), 2)
+        self.assertEqual(index.search([1, 0], k=3)[0][0], ids[1])
+        self.assertEqual(len(index.search([1, 0], k=3)), 2)
+        self.assertIsNone(index.payload(ids[0]))
+
+    def test_compact(self):
+        """Test compaction drops deleted rows and keeps ids"""
+        vectors = random_vectors(100)
+        index = VectorIndex()
+        ids = index.add(vectors, payloads=list(range(100)))
+        index.delete(ids[:50])
+        index.compact()
+
+        self.assertEqual(index.count, 50)
+        self.assertEqual(index.deleted_count, 0)
+        result = index.search(vectors[60], k=1)[0]
+        self.assertEqual((result[0], result[2]), (ids[60], 60))
+
+    def test_search_batch(self):
+        """Test several queries are answered in one call"""
+        vectors = random_vectors(50)
+        index = VectorIndex()
+        ids = index.add(vectors)
+
+        results = index.search_batch(vectors[:3], k=2)
+
+        self.assertEqual([r[0][0] for r in results], ids[:3])
+
+    def test_empty_index(self):
+        """Test searching an empty index returns nothing"""
+        self.assertEqual(VectorIndex().search([1, 0], k=3), [])
+
+
+class TestPersistentVectorIndex(unittest.TestCase):
+    """Test the memory-mapped on-disk index"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "index")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_reopen(self):
+        """Test vectors, payloads and deletes survive reopening"""
+        vectors = random_vectors(300)
+        index = VectorIndex(self.path, capacity=8)
+        ids = index.add(vectors[:200], payloads=[{"n": i} for i in range(200)])
+        ids += index.add(vectors[200:], payloads=[{"n": i} for i in range(200, 300)])
+        index.delete([ids[5]])
+        index.close()
+
+        reopened = VectorIndex(self.path)
+
+        self.assertIsInstance(reopened.matrix, np.memmap)
+        self.assertEqual(len(reopened), 299)
+        self.assertEqual(reopened.search(vectors[250], k=1)[0][2], {"n": 250})
+        self.assertNotEqual(reopened.search(vectors[5], k=1)[0][0], ids[5])
+        self.assertEqual(reopened.add(vectors[:1]), [300])
+
+    def test_compaction_persists(self):
+        """Test automatic compaction rewrites the files on disk"""
+        vectors = random_vectors(40)
+        with patch.object(vector_index, "COMPACT_MIN_ROWS", 4):
+            index = VectorIndex(self.path)
+            ids = index.add(vectors, payloads=list(range(40)))
+            index.delete(ids[:20])
+        self.assertEqual(index.count, 20)
+        index.close()
+
+        reopened = VectorIndex(self.path)
+        self.assertEqual(len(reopened), 20)
+        self.assertEqual(reopened.search(vectors[30], k=1)[0][2], 30)
+
+    def test_torn_log_line_ignored(self):
+        """Test a half-written last log line after a crash is skipped"""
+        index = VectorIndex(self.path)
+        index.add([[1, 0], [0, 1]], payloads=["a", "b"])
+        index.close()
+        with open(os.path.join(self.path, vector_index.LOG_FILE), "a") as f:
+            f.write('{"id": 2, "pay')
+
+        self.assertEqual(len(VectorIndex(self.path)), 2)
+
+    def test_destroy(self):
+        """Test destroy removes the index directory"""
+        index = VectorIndex(self.path)
+        index.add([[1, 0]])
+        index.destroy()
+        self.assertFalse(os.path.exists(self.path))
+
+
+def suite():
+    """Create test suite"""
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(TestVectorIndex))
+    suite.addTest(unittest.makeSuite(TestPersistentVectorIndex))
+    return suite
+
+
+if __name__ == '__main__':
+    print("Running Vector Index Tests...")
+    print("=" * 60)
+
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite())
+
+    print("\n" + "=" * 60)
+    print(f"Tests run: {result.testsRun}")
+    print(f"Successes: {result.testsRun - len(result.failures) - len(result.errors)}")
+    print(f"Failures: {len(result.failures)}")
+    print(f"Errors: {len(result.errors)}")
+
+    sys.exit(0 if result.wasSuccessful() else 1)
@@ -0,0 +1,104 @@
+"""
+Transcript Window
+Tracks which slice of a long chat history is rendered in the chat display.
+"""
+
+PAGE_SIZE = 50        # messages rendered per page when scrolling
+MAX_RENDERED = 200    # messages kept in the Text widget at once
+
+
+class TranscriptWindow:
+    """The range [start, end) of history messages currently materialized.
+
+    Switching chats renders only the newest page. Scrolling to the top
+    prepends the previous page and scrolling to the bottom appends the next
+    one; whenever more than max_rendered messages would be shown, messages
+    are dropped from the opposite end. at_tail is True while the newest
+    message is rendered, so live messages can be appended directly; they
+    count towards max_rendered as well (see overflow()).
+
+    The methods only do the bookkeeping and return what the caller has to
+    insert or delete; they never touch a widget.
+    """
+
+    def __init__(self, page_size=PAGE_SIZE, max_rendered=MAX_RENDERED):
+        self.page_size = max(1, page_size)
+        self.max_rendered = max(self.page_size, max_rendered)
+        self.start = 0
+        self.end = 0
+        self.at_tail = True
+
+    def __len__(self):
+        return self.end - self.start
+
+    def reset(self, total):
+        """Show the newest page of a history with total messages; returns (start, end)"""
+        self.start = max(0, total - self.page_size)
+        self.end = total
+        self.at_tail = True
+        return self.start, self.end
+
+    def reset_around(self, total, index):
+        """Show the page centred on message index; returns (start, end)"""
+        self.start = max(0, min(index - self.page_size // 2, total - self.page_size))
+        self.end = min(total, self.start + self.page_size)
+        self.at_tail = self.end == total
+        return self.start, self.end
+
+    def sync_tail(self, total):
+        """Count live messages appended below the window while it was at the tail"""
+        if self.at_tail:
+            self.end = total
+
+    def overflow(self, total):
+        """Count live messages at the tail; returns where the window should now start, or None.
+
+        Called before another live message is appended. Once more than
+        max_rendered messages are shown, the caller should drop at least the
+        oldest page, i.e. every rendered message before the returned index,
+        and then set start to it.
+        """
+        self.sync_tail(total)
+        if not self.at_tail or self.end - self.start <= self.max_rendered:
+            return None
+        return max(self.start + self.page_size, self.end - self.max_rendered)
+
+    def has_older(self):
+        return self.start > 0
+
+    def has_newer(self, total):
+        return self.end < total
+
+    def older_page(self):
+        """Move the window up one page.
+
+        Returns (first, last, trim_from): render messages [first, last) above
+        the current top, then drop every rendered message from index
+        trim_from onwards (None when nothing has to be dropped).
+        """
+        if not self.has_older():
+            return None
+        first, last = max(0, self.start - self.page_size), self.start
+        self.start = first
+        trim_from = None
+        if self.end - self.start > self.max_rendered:
+            trim_from = self.end = self.start + self.max_rendered
+            self.at_tail = False
+        return first, last, trim_from
+
+    def newer_page(self, total):
+        """Move the window down one page.
+
+        Returns (first, last, trim_to): render messages [first, last) below
+        the current bottom, then drop every rendered message before index
+        trim_to (None when nothing has to be dropped).
+        """
+        if not self.has_newer(total):
+            return None
+        first, last = self.end, min(total, self.end + self.page_size)
+        self.end = last
+        self.at_tail = last == total
+        trim_to = None
+        if self.end - self.start > self.max_rendered:
+            trim_to = self.start = self.end - self.max_rendered
+        return first, last, trim_to
@@ -0,0 +1,94 @@
+"""
+UI Update Queue
+Thread-safe hand-off from worker threads to the Tk main loop, drained once per frame.
+"""
+
+import threading
+import traceback
+from collections import deque
+
+# Roughly 60 frames per second
+FRAME_INTERVAL_MS = 16
+
+
+class UIUpdateQueue:
+    """Collect UI updates from any thread and apply them on the Tk loop.
+
+    Worker threads call post() for arbitrary callbacks and append_text() for
+    streamed text. The Tk loop drains everything queued so far every
+    interval_ms, merging consecutive appends aimed at the same sink so a
+    burst of tokens costs a single widget insert per frame instead of one
+    after() callback per token.
+    """
+
+    def __init__(self, schedule, cancel=None, interval_ms=FRAME_INTERVAL_MS):
+        self.schedule = schedule
+        self.cancel = cancel
+        self.interval_ms = interval_ms
+        self.lock = threading.Lock()
+        self.pending = deque()
+        self.after_id = None
+        self.running = False
+
+    def start(self):
+        """Start draining the queue on the Tk loop"""
+        if not self.running:
+            self.running = True
+            self.after_id = self.schedule(self.interval_ms, self.tick)
+
+    def stop(self):
+        """Stop draining; anything still queued stays queued"""
+        self.running = False
+        if self.after_id is not None and self.cancel is not None:
+            try:
+                self.cancel(self.after_id)
+            except Exception:
+                pass
+        self.after_id = None
+
+    def post(self, func, *args):
+        """Queue func(*args) to run on the Tk loop"""
+        with self.lock:
+            self.pending.append((func, args, False))
+
+    def append_text(self, sink, text):
+        """Queue text for sink(text), merged with adjacent appends to the same sink"""
+        with self.lock:
+            if self.pending:
+                last_sink, parts, mergeable = self.pending[-1]
+                if mergeable and last_sink == sink:
+                    parts.append(text)
+                    return
+            self.pending.append((sink, [text], True))
+
+    def pending_count(self):
+        """Return the number of queued (already merged) updates"""
+        with self.lock:
+            return len(self.pending)
+
+    def drain(self):
+        """Run every queued update in order and return how many ran"""
+        with self.lock:
+            batch = list(self.pending)
+            self.pending.clear()
+
+        for func, args, mergeable in batch:
+            try:
+                if mergeable:
+                    func("".join(args))
+                else:
+                    func(*args)
+            except Exception:
+                traceback.print_exc()
+        return len(batch)
+
+    def tick(self):
+        """Drain once and schedule the next frame"""
+        self.after_id = None
+        self.drain()
+        if self.running:
+            try:
+                self.after_id = self.schedule(self.interval_ms, self.tick)
+            except Exception:
+                # The window was destroyed between frames
+                self.running = False
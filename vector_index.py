@@ -0,0 +1,291 @@
+"""
+Vector Index
+Embedding storage with brute-force cosine search on a contiguous float32
+matrix, optionally persisted to disk and memory-mapped.
+"""
+
+import json
+import os
+import shutil
+
+import numpy as np
+
+INITIAL_CAPACITY = 1024
+COMPACT_RATIO = 0.25     # compact once this share of rows is deleted
+COMPACT_MIN_ROWS = 256   # ...and at least this many rows are deleted
+
+VECTORS_FILE = "vectors.f32"
+LOG_FILE = "rows.jsonl"
+META_FILE = "meta.json"
+
+
+def normalize_rows(vectors):
+    """Return vectors as a 2-D float32 array of unit-length rows"""
+    matrix = np.array(vectors, dtype=np.float32, ndmin=2)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class VectorIndex:
+    """Unit-length vectors in one float32 matrix, with an id and payload per row.
+
+    Rows are appended in place; the matrix grows by doubling, so adding is
+    amortised O(1) per vector. search() scores every live row with a single
+    matrix product and takes the top k with argpartition. A query has to
+    read the whole matrix, so its cost is bound by memory bandwidth;
+    search_batch() answers many queries for the price of one pass.
+
+    delete() only marks rows as tombstones; the matrix is rewritten without
+    them once enough rows are deleted (see COMPACT_RATIO), or on compact().
+
+    With a path, the matrix lives in path/vectors.f32 and is memory-mapped,
+    so opening a large index does not read it into memory. Ids and payloads
+    are kept in an append-only log (path/rows.jsonl) that also records
+    deletes. Payloads must be JSON serialisable.
+    """
+
+    def __init__(self, path=None, dim=None, capacity=INITIAL_CAPACITY):
+        self.path = path
+        self.dim = dim
+        self.count = 0                                   # rows used, live or deleted
+        self.ids = np.empty(0, dtype=np.int64)           # ascending, so rows are found by bisection
+        self.deleted = np.zeros(0, dtype=bool)
+        self.deleted_count = 0
+        self.payloads = []
+        self.next_id = 0
+        self.matrix = None
+        self.initial_capacity = max(1, capacity)
+        if path:
+            os.makedirs(path, exist_ok=True)
+            self.load()
+
+    def __len__(self):
+        return self.count - self.deleted_count
+
+    @property
+    def capacity(self):
+        return 0 if self.matrix is None else self.matrix.shape[0]
+
+    # ======================================
+    # Storage
+    # ======================================
+    def file(self, name):
+        return os.path.join(self.path, name)
+
+    def grow(self, needed):
+        """Make room for at least needed rows"""
+        capacity = max(self.initial_capacity, self.capacity)
+        while capacity < needed:
+            capacity *= 2
+        if capacity == self.capacity:
+            return
+        if self.path:
+            # Extend the file in place and map it again at the new size
+            if self.matrix is not None:
+                self.matrix.flush()
+                del self.matrix
+            with open(self.file(VECTORS_FILE), "ab") as f:
+                f.truncate(capacity * self.dim * 4)
+            self.matrix = np.memmap(self.file(VECTORS_FILE), dtype=np.float32, mode="r+",
+                                    shape=(capacity, self.dim))
+        else:
+            matrix = np.zeros((capacity, self.dim), dtype=np.float32)
+            if self.matrix is not None:
+                matrix[:self.count] = self.matrix[:self.count]
+            self.matrix = matrix
+        ids = np.empty(capacity, dtype=np.int64)
+        ids[:self.count] = self.ids[:self.count]
+        deleted = np.zeros(capacity, dtype=bool)
+        deleted[:self.count] = self.deleted[:self.count]
+        self.ids, self.deleted = ids, deleted
+
+    def load(self):
+        """Open an index saved under path; an empty directory starts a new index"""
+        meta_file = self.file(META_FILE)
+        if not os.path.exists(meta_file):
+            return
+        with open(meta_file) as f:
+            meta = json.load(f)
+        if self.dim is not None and self.dim != meta["dim"]:
+            raise ValueError(f"Index at {self.path} has dimension {meta['dim']}, not {self.dim}")
+        self.dim = meta["dim"]
+
+        ids, payloads, deleted_ids = [], [], set()
+        if os.path.exists(self.file(LOG_FILE)):
+            with open(self.file(LOG_FILE)) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break   # torn last line after a crash
+                    if "delete" in entry:
+                        deleted_ids.update(entry["delete"])
+                    else:
+                        ids.append(entry["id"])
+                        payloads.append(entry.get("payload"))
+
+        # Vectors are written before their log line, so the log decides how
+        # many rows are valid
+        rows = os.path.getsize(self.file(VECTORS_FILE)) // (self.dim * 4)
+        count = min(len(ids), rows)
+        self.matrix = np.memmap(self.file(VECTORS_FILE), dtype=np.float32, mode="r+",
+                                shape=(rows, self.dim)) if rows else None
+        self.ids = np.zeros(rows, dtype=np.int64)
+        self.ids[:count] = ids[:count]
+        self.deleted = np.zeros(rows, dtype=bool)
+        self.deleted[:count] = np.isin(self.ids[:count], list(deleted_ids))
+        self.payloads = payloads[:count]
+        self.count = count
+        self.deleted_count = int(self.deleted[:count].sum())
+        self.next_id = int(meta.get("next_id", 0))
+        if count:
+            self.next_id = max(self.next_id, int(self.ids[count - 1]) + 1)
+
+    def write_meta(self):
+        tmp = self.file(META_FILE + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump({"dim": self.dim, "next_id": self.next_id}, f)
+        os.replace(tmp, self.file(META_FILE))
+
+    def append_log(self, entries):
+        with open(self.file(LOG_FILE), "a") as f:
+            f.write("".join(json.dumps(entry) + "\n" for entry in entries))
+
+    def flush(self):
+        if self.path and self.matrix is not None:
+            self.matrix.flush()
+
+    def close(self):
+        self.flush()
+        self.matrix = None
+
+    def destroy(self):
+        """Close the index and delete its files"""
+        self.close()
+        if self.path:
+            shutil.rmtree(self.path, ignore_errors=True)
+
+    # ======================================
+    # Updates
+    # ======================================
+    def add(self, vectors, payloads=None):
+        """Append vectors (one per row); returns their ids"""
+        matrix = normalize_rows(vectors)
+        if self.dim is None:
+            self.dim = matrix.shape[1]
+        elif matrix.shape[1] != self.dim:
+            raise ValueError(f"Expected vectors of dimension {self.dim}, got {matrix.shape[1]}")
+        n = matrix.shape[0]
+        payloads = list(payloads) if payloads is not None else [None] * n
+        if len(payloads) != n:
+            raise ValueError("Need one payload per vector")
+
+        self.grow(self.count + n)
+        start, end = self.count, self.count + n
+        ids = np.arange(self.next_id, self.next_id + n, dtype=np.int64)
+        self.matrix[start:end] = matrix
+        self.ids[start:end] = ids
+        if self.path:
+            self.matrix.flush()
+            self.append_log({"id": int(i), "payload": p} for i, p in zip(ids, payloads))
+        self.payloads.extend(payloads)
+        self.count = end
+        self.next_id += n
+        if self.path:
+            self.write_meta()
+        return ids.tolist()
+
+    def rows_for(self, ids):
+        """Row numbers of the given ids that exist and are not deleted"""
+        ids = np.asarray(list(ids), dtype=np.int64)
+        rows = np.searchsorted(self.ids[:self.count], ids)
+        found = rows < self.count
+        rows = rows[found]
+        rows = rows[(self.ids[rows] == ids[found]) & ~self.deleted[rows]]
+        return rows
+
+    def delete(self, ids):
+        """Mark ids as deleted; returns how many were live"""
+        rows = self.rows_for(ids)
+        if not len(rows):
+            return 0
+        self.deleted[rows] = True
+        self.deleted_count += len(rows)
+        if self.path:
+            self.append_log([{"delete": self.ids[rows].tolist()}])
+        if self.deleted_count >= COMPACT_MIN_ROWS and self.deleted_count >= COMPACT_RATIO * self.count:
+            self.compact()
+        return len(rows)
+
+    def compact(self):
+        """Rewrite the matrix and log without deleted rows"""
+        if not self.deleted_count:
+            return
+        live = np.flatnonzero(~self.deleted[:self.count])
+        payloads = [self.payloads[i] for i in live]
+        ids = self.ids[live]
+        capacity = max(self.initial_capacity, len(live))
+        if self.path:
+            tmp = self.file(VECTORS_FILE + ".tmp")
+            matrix = np.memmap(tmp, dtype=np.float32, mode="w+", shape=(capacity, self.dim))
+            matrix[:len(live)] = self.matrix[live]
+            matrix.flush()
+            del matrix
+            log_tmp = self.file(LOG_FILE + ".tmp")
+            with open(log_tmp, "w") as f:
+                f.write("".join(json.dumps({"id": int(i), "payload": p}) + "\n" for i, p in zip(ids, payloads)))
+            self.matrix = None
+            os.replace(tmp, self.file(VECTORS_FILE))
+            os.replace(log_tmp, self.file(LOG_FILE))
+            self.matrix = np.memmap(self.file(VECTORS_FILE), dtype=np.float32, mode="r+",
+                                    shape=(capacity, self.dim))
+        else:
+            matrix = np.zeros((capacity, self.dim), dtype=np.float32)
+            matrix[:len(live)] = self.matrix[live]
+            self.matrix = matrix
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.ids[:len(live)] = ids
+        self.deleted = np.zeros(capacity, dtype=bool)
+        self.payloads = payloads
+        self.count = len(live)
+        self.deleted_count = 0
+
+    # ======================================
+    # Queries
+    # ======================================
+    def payload(self, item_id):
+        rows = self.rows_for([item_id])
+        return self.payloads[rows[0]] if len(rows) else None
+
+    def live_payloads(self, limit=None):
+        """Payloads of the rows not deleted, oldest first"""
+        rows = np.flatnonzero(~self.deleted[:self.count])[:limit]
+        return [self.payloads[r] for r in rows]
+
+    def search(self, query, k=5):
+        """Return up to k (id, score, payload) tuples, best match first"""
+        return self.search_batch([query], k)[0]
+
+    def search_batch(self, queries, k=5):
+        """Search several queries with one matrix product; returns one result list per query"""
+        queries = normalize_rows(queries)
+        if not len(self) or k <= 0:
+            return [[] for _ in range(len(queries))]
+        if queries.shape[1] != self.dim:
+            raise ValueError(f"Expected queries of dimension {self.dim}, got {queries.shape[1]}")
+        scores = queries @ self.matrix[:self.count].T
+        if self.deleted_count:
+            scores[:, self.deleted[:self.count]] = -np.inf
+        k = min(k, len(self))
+        if k < self.count:
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            top = np.tile(np.arange(self.count), (len(queries), 1))
+        results = []
+        for q, rows in enumerate(top):
+            rows = rows[np.argsort(-scores[q, rows], kind="stable")][:k]
+            results.append([
+                (int(self.ids[r]), float(scores[q, r]), self.payloads[r]) for r in rows
+            ])
+        return results